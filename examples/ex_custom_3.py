@@ -0,0 +1,24 @@
+from gitevo import GitEvo, ParsedCommit
+
+remote = 'https://github.com/pallets/flask'
+evo = GitEvo(repo=remote, extension='.py')
+
+@evo.metric('Async functions')
+def async_functions(commit: ParsedCommit):
+    return len(commit.query('(function_definition "async") @function'))
+
+@evo.metric('@pytest decorated functions')
+def decorated_functions(commit: ParsedCommit):
+    query = '''
+    (decorated_definition
+        . (decorator) @decorator (#match? @decorator "^@pytest")
+        definition: (function_definition))
+    '''
+    return len(commit.query(query))
+
+@evo.metric('Most called functions', categorical=True, top_n=5)
+def called_functions(commit: ParsedCommit):
+    calls = commit.captures('(call function: (identifier) @name)')
+    return [name.text.decode() for name in calls.get('name', [])]
+
+evo.run()
@@ -1,2 +1,3 @@
 from .application import GitEvo as GitEvo
-from .application import ParsedCommit as ParsedCommit
\ No newline at end of file
+from .application import ParsedCommit as ParsedCommit
+from .info import MetricSet as MetricSet
@@ -1,18 +1,36 @@
 import os
+import heapq
+import asyncio
+import threading
+import contextlib
 import pathlib
+import multiprocessing
+import multiprocessing.connection
 
+from typing import Any, AsyncIterator, Callable, Hashable, Iterator
 from datetime import date, datetime
+from itertools import repeat
+from operator import itemgetter
 from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 
-from tree_sitter import Node
-from treeminer.repo import TreeMinerRepo, Commit
+from tree_sitter import Node, Tree, QueryCursor
 from treeminer.miners import BaseMiner
 
 from gitevo.model import GitEvoResult, ProjectResult, CommitResult, MetricResult
-from gitevo.info import MetricInfo
+from gitevo.info import MetricInfo, resolve_ref
 from gitevo.report_html import HtmlReport
 from gitevo.report_csv import TableReport
-from gitevo.utils import is_git_dir, stdout_msg, stdout_link, as_str, aggregate_stat, ensure_file_extension
+from gitevo.repository import GitRepository, GitFile, SelectedCommit
+from gitevo.parser import CodeParser, tree_nodes, select_nodes, compile_query
+from gitevo.nodes import NodeTable, TableNode
+from gitevo.traversal import iter_descendants, first_descendant, descendant_by_field_name
+from gitevo.parse_cache import ParseCache
+from gitevo.checkpoint import Checkpoint
+from gitevo.result_store import ResultStore
+from gitevo.shard import parse_shard, write_shard, read_shard, group_shards, METRIC_OPTIONS
+from gitevo.columns import NodeColumns, np
+from gitevo.utils import is_git_dir, stdout_msg, stdout_link, aggregate_stat, percentile_of, ensure_file_extension, Distribution, SpaceSaving, LRUCache
 from gitevo.exceptions import *
 
 """
@@ -66,10 +84,22 @@ class GitEvo:
         export_csv (bool): Whether to export CSV report (default: True)
         report_filename (str | None): Custom report filename (default: None)
         report_title (str | None): Custom report title (default: None)
+        jobs (int): Number of processes to analyze dates in parallel (default: 1)
+        repo_jobs (int): Number of repositories to analyze in parallel, when repo is a directory with multiple repositories (default: 1)
+        cache_dir (str | None): Directory of the persistent parse cache, reused across runs (default: None, no cache)
+        columnar (bool): Whether to store the nodes of each commit in NumPy columns, which requires numpy (default: False)
+        resume (bool): Whether to save a checkpoint next to the reports, and resume an interrupted analysis from it, skipping the dates already analyzed (default: False)
+        result_store (str | None): SQLite file storing the metric values across runs, so that reruns only compute the missing ones (default: None, no store)
+        shard (str | None): Shard i/n of the dates of each repository, eg, '2/4', written to a partial result file to be merged (default: None, all dates)
+        memory_cache (int): Megabytes of source of the parsed files kept in memory for later dates, besides the files of the previous date (default: 16)
     Raises:
         BadGitRepo: If the repository is invalid
         BadDateUnit: If the date_unit is invalid
         BadYearRange: If from_year is greater than to_year
+        BadJobs: If jobs or repo_jobs is smaller than 1
+        MissingDependency: If columnar is True and numpy is not installed
+        BadShard: If shard is not i/n, with 1 <= i <= n
+        BadMemoryCache: If memory_cache is smaller than 0
     """
 
     def __init__(self,
@@ -84,7 +114,16 @@ class GitEvo:
                 export_html: bool = True,
                 export_csv: bool = True,
                 report_filename: str | None = None,
-                report_title: str | None = None):
+                report_title: str | None = None,
+                
+                jobs: int = 1,
+                repo_jobs: int = 1,
+                cache_dir: str | None = None,
+                columnar: bool = False,
+                resume: bool = False,
+                result_store: str | None = None,
+                shard: str | None = None,
+                memory_cache: int = 16):
         
         self.git_repos = self._ensure_git_repos(repo)
         
@@ -99,6 +138,18 @@ class GitEvo:
 
         if from_year > to_year:
             raise BadYearRange(f'from_year must be equal or smaller than to_year')
+        
+        if not isinstance(jobs, int) or jobs < 1:
+            raise BadJobs(f'jobs must be equal or greater than 1')
+
+        if not isinstance(repo_jobs, int) or repo_jobs < 1:
+            raise BadJobs(f'repo_jobs must be equal or greater than 1')
+
+        if not isinstance(memory_cache, int) or memory_cache < 0:
+            raise BadMemoryCache(f'memory_cache must be equal or greater than 0')
+
+        if columnar and np is None:
+            raise MissingDependency(f'columnar requires numpy, install it with: pip install numpy')
 
         self.global_file_extension = ensure_file_extension(extension)
         self.date_unit = date_unit
@@ -114,9 +165,19 @@ class GitEvo:
         
         self.export_html_report = export_html
         self.export_csv_report = export_csv
+        self.jobs = jobs
+        self.repo_jobs = repo_jobs
+        self.cache_dir = cache_dir
+        self.columnar = columnar
+        self.resume = resume
+        self.result_store = result_store
+        self.shard = parse_shard(shard) if shard is not None else None
+        self.memory_cache = memory_cache
 
         self.registered_metrics: list[MetricInfo] = []
         self._analyzed_commits: list[str] = []
+        # Repositories that failed in the last run, with their error messages
+        self.failed_repos: dict[str, str] = {}
 
     # metric decorator
     def metric(self, name: str = None,
@@ -126,22 +187,66 @@ class GitEvo:
                group: str | None = None,
                version_chart_type: str = 'bar',
                show_version_chart: bool = True,
-               top_n: int | None = None):
+               top_n: int | None = None,
+               node_types: str | list[str] | None = None,
+               heavy_hitters: int | None = None):
+        """
+        Registers a metric, computed by the decorated function for each date.
+
+        Args:
+            name (str | None): Metric name (default: the function name)
+            extension (str | None): File extension of the metric, overriding the global one
+            categorical (bool): Whether the function returns categories (list[str], Counter, or dict[str, int]) instead of a number
+            group (str | None): Chart of the metric (default: the metric name)
+            version_chart_type (str): Chart of the last version, either 'donut', 'pie', 'bar', or 'hbar' (default: 'bar')
+            show_version_chart (bool): Whether to show the chart of the last version (default: True)
+            top_n (int | None): Number of categories to show (default: None, all)
+            node_types (str | list[str] | None): Node types the metric looks up, eg, with find_nodes_by_type or count_node_types.
+                The nodes of the types declared by all metrics are selected in a single walk over each file.
+            heavy_hitters (int | None): Number of categories tracked by a Space-Saving sketch, in categorical metrics with top_n.
+                Only the categories that may reach the top_n are kept, and the others are summed into '<name>: other' (default: None, all)
+        """
         
         def decorator(func):
-            self.registered_metrics.append(
-                MetricInfo(name=name, 
-                           callback=func,
-                           file_extension=ensure_file_extension(extension),
-                           categorical=categorical,
-                           group=group,
-                           version_chart_type=version_chart_type,
-                           show_version_chart=show_version_chart,
-                           top_n=top_n))
+            self.add_metric(func, name, extension=extension, categorical=categorical, group=group,
+                            version_chart_type=version_chart_type, show_version_chart=show_version_chart,
+                            top_n=top_n, node_types=node_types, heavy_hitters=heavy_hitters)
             return func
         
         return decorator
 
+    def add_metric(self, callback: Callable[['ParsedCommit'], Any] | str, name: str = None,
+                   *,
+                   extension: str | None = None, 
+                   categorical: bool = False, 
+                   group: str | None = None,
+                   version_chart_type: str = 'bar',
+                   show_version_chart: bool = True,
+                   top_n: int | None = None,
+                   node_types: str | list[str] | None = None,
+                   heavy_hitters: int | None = None):
+        """
+        Registers a metric, with the same options as the metric decorator.
+        The callback may be a reference to a module-level function, eg, 'mypackage.metrics:loops'.
+        Metrics with module-level functions can be sent to worker processes, by reference.
+
+        Raises:
+            BadMetricReference: If the callback reference cannot be imported
+        """
+        if isinstance(callback, str):
+            callback = resolve_ref(callback)
+        self.registered_metrics.append(
+            MetricInfo(name=name, 
+                       callback=callback,
+                       file_extension=ensure_file_extension(extension),
+                       categorical=categorical,
+                       group=group,
+                       version_chart_type=version_chart_type,
+                       show_version_chart=show_version_chart,
+                       top_n=top_n,
+                       node_types=_as_node_types(node_types) if node_types is not None else [],
+                       heavy_hitters=heavy_hitters))
+
     # def add_language(self, extension: str, tree_sitter_language: object):
     #     miner = GenericMiner
     #     miner.extension = extension
@@ -158,108 +263,364 @@ class GitEvo:
         """
 
         print(f'Running GitEvo...')
+        self._prepare_registered_metrics()
+        self.failed_repos = {}
+
+        if self.repo_jobs > 1 and len(self.git_repos) > 1:
+            context = self._parallel_context()
+            if context is not None:
+                return self._run_in_parallel(context)
+            print(_SEQUENTIAL_MSG)
+
         results = []
         for git_repo in self.git_repos:
             print('Processing repository:', git_repo)
             try:
                 result = self._process_repository(git_repo)
                 results.append(result)
-            except (FileExtensionNotFound, BadReturnType, BadDateUnit, BadYearRange, BadLOCAggregate, BadVersionChart) as e:
+            except _USER_ERRORS as e:
                 raise
             except Exception as e:
                 print(f'Error processing {git_repo}: {e}')
+                self.failed_repos[git_repo] = str(e)
                 continue
         return results
+
+    def _run_in_parallel(self, context) -> list[GitEvoResult]:
+        # Each repository runs in its own process, so that a crash (eg, in a parser)
+        # only fails that repository. At most repo_jobs processes run at a time.
+        pending = list(self.git_repos)
+        running: dict[str, tuple] = {}
+        results: dict[str, GitEvoResult] = {}
+        try:
+            while pending or running:
+                while pending and len(running) < self.repo_jobs:
+                    git_repo = pending.pop(0)
+                    print('Processing repository:', git_repo)
+                    receiver, sender = context.Pipe(duplex=False)
+                    process = context.Process(target=_process_repository_in_worker, args=(self, git_repo, sender))
+                    process.start()
+                    sender.close()
+                    running[git_repo] = (process, receiver)
+
+                ready = multiprocessing.connection.wait([receiver for _, receiver in running.values()])
+                for git_repo in [repo for repo, (_, receiver) in running.items() if receiver in ready]:
+                    process, receiver = running.pop(git_repo)
+                    try:
+                        result, error = receiver.recv()
+                    except EOFError:
+                        result, error = None, f'worker exited with code {process.exitcode}'
+                    receiver.close()
+                    process.join()
+
+                    if isinstance(error, _USER_ERRORS):
+                        raise error
+                    if error is not None:
+                        print(f'Error processing {git_repo}: {error}')
+                        self.failed_repos[git_repo] = error
+                        continue
+                    # Metric callbacks are not sent back by the workers
+                    result.registered_metrics = self.registered_metrics
+                    results[git_repo] = result
+        finally:
+            for process, receiver in running.values():
+                process.terminate()
+                process.join()
+                receiver.close()
+
+        return [results[git_repo] for git_repo in self.git_repos if git_repo in results]
     
+    async def run_async(self, executor: Executor | None = None) -> list[GitEvoResult]:
+        """
+        Run GitEvo analysis like run, without blocking the event loop.
+        Git subprocesses (clone and log) run through asyncio, and the parsing and metrics of each repository run in the executor.
+        Up to repo_jobs repositories are analyzed at a time.
+
+        Args:
+            executor (Executor | None): Executor of the parsing and metrics (default: None, a thread pool of repo_jobs threads)
+
+        Returns:
+            list[GitEvoResult]: The analysis results, in the order of the repositories.
+
+        Raises:
+            BadExecutor: If executor is a process pool, use jobs to parse the dates in processes
+        """
+        results = {git_repo: result async for git_repo, result in self._results_async(executor)}
+        return [results[git_repo] for git_repo in self.git_repos if git_repo in results]
+
+    async def iter_results_async(self, executor: Executor | None = None) -> AsyncIterator[GitEvoResult]:
+        """
+        Run GitEvo analysis like run_async, yielding the result of each repository as soon as it is done.
+        """
+        async for _, result in self._results_async(executor):
+            yield result
+
+    async def _results_async(self, executor: Executor | None) -> AsyncIterator[tuple[str, GitEvoResult]]:
+        # The analysis shares the opened repository and the metric callbacks, which are not sent to other processes
+        if isinstance(executor, ProcessPoolExecutor):
+            raise BadExecutor('executor must run in this process (eg, a ThreadPoolExecutor), use jobs to parse the dates in processes')
+
+        print(f'Running GitEvo...')
+        self._prepare_registered_metrics()
+        self.failed_repos = {}
+
+        own_executor = executor is None
+        if own_executor:
+            executor = ThreadPoolExecutor(self.repo_jobs)
+        semaphore = asyncio.Semaphore(self.repo_jobs)
+        tasks = [asyncio.ensure_future(self._process_repository_async(git_repo, executor, semaphore)) for git_repo in self.git_repos]
+        try:
+            for task in asyncio.as_completed(tasks):
+                git_repo, result = await task
+                if result is not None:
+                    yield git_repo, result
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if own_executor:
+                executor.shutdown(wait=True)
+
+    async def _process_repository_async(self, git_repo: str, executor: Executor, semaphore: asyncio.Semaphore) -> tuple[str, GitEvoResult | None]:
+        loop = asyncio.get_running_loop()
+        async with semaphore:
+            print('Processing repository:', git_repo)
+            try:
+                repository = await GitRepository.open_async(git_repo)
+                try:
+                    selected_commits = await repository.select_commits_async(self.from_year, self.to_year, self.date_unit)
+                    future = loop.run_in_executor(executor, self._process_commits, repository, selected_commits)
+                    try:
+                        result = await asyncio.shield(future)
+                    except asyncio.CancelledError:
+                        # The executor cannot stop the analysis, the repository is closed once it is done
+                        await asyncio.wait([future])
+                        raise
+                finally:
+                    await asyncio.to_thread(repository.close)
+            except _USER_ERRORS:
+                raise
+            except Exception as e:
+                print(f'Error processing {git_repo}: {e}')
+                self.failed_repos[git_repo] = str(e)
+                return git_repo, None
+        return git_repo, result
+
     def _process_repository(self, git_repo: str) -> GitEvoResult:
-        result = self._compute_metrics(git_repo)
-        self._export_html(result)
-        self._export_csv(result)
+        with GitRepository(git_repo) as repository:
+            # Resolve one commit per year or month up front, instead of walking the whole history
+            selected_commits = repository.select_commits(self.from_year, self.to_year, self.date_unit)
+            return self._process_commits(repository, selected_commits)
+
+    def _process_commits(self, repository: GitRepository, selected_commits: list[SelectedCommit], 
+                         parsed_file_cache: '_ParsedFileCache | None' = None) -> GitEvoResult:
+        result = self._compute_metrics(repository, selected_commits, parsed_file_cache)
+        # Shards are partial results, whose reports are exported when they are merged
+        if self.shard is None:
+            self._export_html(result)
+            self._export_csv(result)
         return result
-    
-    def _compute_metrics(self, git_repo: str) -> GitEvoResult:
 
-        mine_repo = TreeMinerRepo(git_repo)
-        gitevo_result = GitEvoResult(self.report_title, self.report_filename, self.date_unit, self.registered_metrics)
-        
+    def _prepare_registered_metrics(self):
         for metric_info in self.registered_metrics:
             # Sanity checks on registered_metrics
             self._check_registered_metrics(metric_info)
             if metric_info.file_extension is None:
                 metric_info.file_extension = self.global_file_extension
-            # Real names of the categorical metrics are known only at runtime, thus, now register None
-            gitevo_result.add_metric_group(metric_info.name_or_none_for_categorical, metric_info.group)
 
-        project_result = ProjectResult()
-        gitevo_result.project_result = project_result
+    def _declared_node_types(self) -> frozenset[str]:
+        # Node types declared by the metrics, selected together in a single walk over each file
+        return frozenset(node_type for metric_info in self.registered_metrics for node_type in metric_info.node_types)
+    
+    def _compute_metrics(self, repository: GitRepository, selected_commits: list[SelectedCommit], 
+                         parsed_file_cache: '_ParsedFileCache | None' = None) -> GitEvoResult:
 
-        project_name = None
-        project_commits = set()
+        gitevo_result = GitEvoResult(self.report_title, self.report_filename, self.date_unit, self.registered_metrics)
 
-        for commit in mine_repo.commits:
+        with self._open_result_store() as store:
 
-            if project_name is None:
-                project_name = commit.project_name
-                project_result.name = project_name
+            project_result = ProjectResult(repository.name, self.date_unit)
+            gitevo_result.project_result = project_result
 
-            # Skip commit based on from and to year 
-            if commit.committer_date.year < self.from_year:
-                continue
-            if commit.committer_date.year > self.to_year:
-                continue
-            
-            # Skip commit if year or month is already analyzed
-            commit_year = commit.committer_date.year
-            selected_date = (commit_year, commit.committer_date.month) if self.date_unit == 'month' else commit_year
-            if selected_date in project_commits:
-                continue
+            selected_commits = self._shard_commits(selected_commits)
 
-            project_commits.add(selected_date)
+            # Dates analyzed so far, saved periodically in a checkpoint when resume is enabled
+            checkpoint = Checkpoint(self._checkpoint_path(repository), self._checkpoint_key(repository)) if self.resume else None
+            state = self._load_checkpoint(checkpoint, selected_commits)
+            if state is not None:
+                print(f'Resuming from checkpoint: {len(state["finished"])} dates already analyzed')
+            builder = _ResultBuilder(gitevo_result, self.registered_metrics, state, keep_values=self.shard is not None)
+            selected_commits = [selected_commit for selected_commit in selected_commits 
+                                if builder.state['finished'].get(selected_commit.bucket) != selected_commit.hash]
 
-            # Chache parsed commits for each file extension, eg, .py, .js, .java, etc
-            parsed_commits = _ParsedCommitCache(commit, self._all_file_extensions())
-            print(f'- Date: {selected_date}, commit: {commit.hash[0:10]}, files: {parsed_commits.file_stats()}')
+            # Metric values already in the result store, only the missing ones are computed
+            metrics = [(metric_info.name, metric_info.fingerprint) for metric_info in self.registered_metrics] if store else []
+            stored_values = [self._stored_values(store, repository, selected_commit, metrics) for selected_commit in selected_commits]
+            metric_indexes = [[index for index in range(len(self.registered_metrics)) if index not in values] for values in stored_values]
+            computed = self._compute_commit_results(repository, 
+                                                    [selected_commit for selected_commit, indexes in zip(selected_commits, metric_indexes) if indexes],
+                                                    [indexes for indexes in metric_indexes if indexes],
+                                                    parsed_file_cache)
 
-            # Iterate on each metric
-            commit_result = CommitResult(commit.hash, commit.committer_date.date())
-            for metric_info in self.registered_metrics:
-                
-                # Get parsed_commit and run the metric callback
-                parsed_commit = parsed_commits.get_parsed_commit_for(metric_info.file_extension)
-                metric_value = metric_info.callback(parsed_commit)
+            try:
+                # Results arrive in date order, even when computed in parallel
+                for selected_commit, metric_values, indexes in zip(selected_commits, stored_values, metric_indexes):
+                    if indexes:
+                        _, file_stats, computed_values = next(computed)
+                        self._store_values(store, repository, selected_commit, metrics, computed_values)
+                        metric_values.update(computed_values)
+                        print(f'- Date: {selected_commit.bucket}, commit: {selected_commit.hash[0:10]}, files: {file_stats}')
+                    else:
+                        print(f'- Date: {selected_commit.bucket}, commit: {selected_commit.hash[0:10]}, stored results')
+
+                    builder.add(selected_commit, metric_values)
+                    if checkpoint is not None:
+                        checkpoint.save(builder.state)
+            except BaseException:
+                if checkpoint is not None and builder.state['finished']:
+                    checkpoint.save(builder.state, force=True)
+                    print(f'Checkpoint saved, rerun with resume to continue: {checkpoint.path}')
+                raise
+            finally:
+                computed.close()
 
-                # Process categorical metrics
-                if metric_info.categorical: 
+            builder.finish()
+            if checkpoint is not None:
+                checkpoint.remove()
 
-                    if not isinstance(metric_value, list):
-                        raise BadReturnType(f'categorical metric {metric_info.name} should return list[str]')
+            if self.shard is not None:
+                path = write_shard(self._shard_path(repository), self.shard, repository, gitevo_result, builder.values, self.from_year, self.to_year)
+                print(f'Shard {self.shard[0]}/{self.shard[1]}: {path}')
+        
+        return gitevo_result
 
-                    if not metric_value:
-                        continue
+    def _open_result_store(self) -> ResultStore | contextlib.nullcontext:
+        if self.result_store is None:
+            return contextlib.nullcontext()
+        return ResultStore(self.result_store)
 
-                    for real_name, value in Counter(metric_value).most_common():
-                        assert isinstance(real_name, str), f'categorical metric {metric_info.name} should return list[str]'
-                        metric_result = MetricResult(name=real_name, value=value, date=commit_result.date)
-                        commit_result.add_metric_result(metric_result)
-                        
-                        # Register the real name of the categorical metric
-                        gitevo_result.add_metric_name(real_name)
-                        gitevo_result.add_metric_group(real_name, metric_info.group)
-                
-                # Process numerical metrics
-                else:
+    def _stored_values(self, store: ResultStore | None, repository: GitRepository, selected_commit: SelectedCommit, metrics: list[tuple[str, str]]) -> dict:
+        if store is None:
+            return {}
+        return store.get(repository.location, selected_commit.bucket, selected_commit.hash, metrics)
 
-                    if not isinstance(metric_value, (int, float)):
-                        raise BadReturnType(f'numerical metric {metric_info.name} should return int or float')
+    def _store_values(self, store: ResultStore | None, repository: GitRepository, selected_commit: SelectedCommit, metrics: list[tuple[str, str]], metric_values: dict):
+        if store is None:
+            return
+        values = [(*metrics[index], value) for index, value in metric_values.items()]
+        store.put(repository.location, selected_commit.bucket, selected_commit.hash, values)
+
+    def _report_path(self, repository: GitRepository, suffix: str) -> str:
+        # Next to the reports, see HtmlReport and TableReport
+        filename = self.report_filename if self.report_filename else f'report_{repository.name}'
+        return os.path.join(os.getcwd(), f'{filename}{suffix}')
+
+    def _checkpoint_path(self, repository: GitRepository) -> str:
+        if self.shard is not None:
+            return self._report_path(repository, f'.shard-{self.shard[0]}-of-{self.shard[1]}.checkpoint')
+        return self._report_path(repository, '.checkpoint')
+
+    def _checkpoint_key(self, repository: GitRepository) -> tuple:
+        metrics = tuple((metric_info.name, metric_info.file_extension, metric_info.categorical, metric_info.heavy_hitters) 
+                        for metric_info in self.registered_metrics)
+        return (repository.name, self.date_unit, self.from_year, self.to_year, self.shard, metrics)
+
+    def _shard_path(self, repository: GitRepository) -> str:
+        return self._report_path(repository, f'.shard-{self.shard[0]}-of-{self.shard[1]}.pickle')
+
+    def _shard_commits(self, selected_commits: list[SelectedCommit]) -> list[SelectedCommit]:
+        if self.shard is None:
+            return selected_commits
+        # Contiguous dates, so that each shard reuses the files parsed for the previous date
+        index, count = self.shard
+        size = len(selected_commits)
+        return selected_commits[size * (index - 1) // count: size * index // count]
+
+    def _load_checkpoint(self, checkpoint: Checkpoint | None, selected_commits: list[SelectedCommit]) -> dict | None:
+        if checkpoint is None:
+            return None
+        state = checkpoint.load()
+        if state is None:
+            return None
+        # Dates whose commits changed since the checkpoint (eg, rewritten history) are not resumed
+        selected_hashes = {selected_commit.bucket: selected_commit.hash for selected_commit in selected_commits}
+        if any(selected_hashes.get(bucket) != hash for bucket, hash in state['finished'].items()):
+            print('Checkpoint does not match the repository, starting again')
+            return None
+        return state
+
+    def _compute_commit_results(self, repository: GitRepository, selected_commits: list[SelectedCommit], metric_indexes: list[list[int]],
+                                parsed_file_cache: '_ParsedFileCache | None' = None):
+        if self.jobs > 1 and len(selected_commits) > 1:
+            context = self._parallel_context()
+            if context is not None:
+                yield from self._compute_commit_results_in_parallel(context, repository.path, selected_commits, metric_indexes)
+                return
+            print(_SEQUENTIAL_MSG)
+
+        # A parsed file cache may be kept across runs on the same repository (eg, by gitevo serve)
+        if parsed_file_cache is None:
+            parsed_file_cache = self._parsed_file_cache(repository)
+        for selected_commit, indexes in zip(selected_commits, metric_indexes):
+            yield self._compute_selected_commit(parsed_file_cache, selected_commit, indexes)
+
+    def _compute_commit_results_in_parallel(self, context, repository_path: str, selected_commits: list[SelectedCommit], metric_indexes: list[list[int]]):
+        jobs = min(self.jobs, len(selected_commits))
+        # Contiguous chunks of dates keep the parsed file cache of each worker warm
+        chunksize = max(1, len(selected_commits) // (jobs * 4))
+        with ProcessPoolExecutor(jobs, mp_context=context, initializer=_init_worker, initargs=(self, repository_path)) as executor:
+            yield from executor.map(_compute_selected_commit_in_worker, selected_commits, metric_indexes, chunksize=chunksize)
+
+    def _parallel_context(self):
+        # Forked workers inherit the metric callbacks, spawned workers import them by reference.
+        # Forking a process with other threads (eg, run_async or gitevo serve) may copy locks held by them.
+        start_methods = multiprocessing.get_all_start_methods()
+        if 'fork' in start_methods and threading.active_count() == 1:
+            return multiprocessing.get_context('fork')
+        if 'spawn' in start_methods and all(metric_info.is_importable for metric_info in self.registered_metrics):
+            return multiprocessing.get_context('spawn')
+        return None
 
-                    metric_result = MetricResult(name=metric_info.name, value=metric_value, date=commit_result.date)
-                    commit_result.add_metric_result(metric_result)
-                    gitevo_result.add_metric_name(metric_info.name)
+    def _parsed_file_cache(self, repository: GitRepository) -> '_ParsedFileCache':
+        return _ParsedFileCache(repository, self.cache_dir, self.columnar, self._declared_node_types(), self.memory_cache * 1024 * 1024)
+
+    def _compute_selected_commit(self, parsed_file_cache: '_ParsedFileCache', selected_commit: SelectedCommit, metric_indexes: list[int]):
+        # Chache parsed commits for each file extension, eg, .py, .js, .java, etc
+        parsed_commits = _ParsedCommitCache(selected_commit, self._all_file_extensions(), parsed_file_cache, self.columnar)
+        metric_values = self._compute_metric_values(parsed_commits, metric_indexes)
+        return selected_commit, parsed_commits.file_stats(), metric_values
+
+    def _compute_metric_values(self, parsed_commits: '_ParsedCommitCache', metric_indexes: list[int]) -> dict[int, int | float | list[tuple[str, int]]]:
+        # Values of the metrics by index: numbers, or the counts of the categories of categorical metrics
+        metric_values = {}
+        for index in metric_indexes:
+            metric_info = self.registered_metrics[index]
+            
+            # Get parsed_commit and run the metric callback
+            parsed_commit = parsed_commits.get_parsed_commit_for(metric_info.file_extension)
+            metric_value = metric_info.callback(parsed_commit)
+
+            # Process categorical metrics
+            if metric_info.categorical: 
+
+                if not isinstance(metric_value, (list, dict)):
+                    raise BadReturnType(f'categorical metric {metric_info.name} should return list[str], Counter, or dict[str, int]')
+
+                # Counts (Counter or dict) are taken as they are, lists are counted
+                counts = Counter(metric_value).most_common()
+                for real_name, _ in counts:
+                    assert isinstance(real_name, str), f'categorical metric {metric_info.name} should return list[str], Counter, or dict[str, int]'
+                metric_values[index] = counts
+            
+            # Process numerical metrics
+            else:
+
+                if not isinstance(metric_value, (int, float)):
+                    raise BadReturnType(f'numerical metric {metric_info.name} should return int or float')
+                metric_values[index] = metric_value
+
+        return metric_values
 
-            project_result.add_commit_result(commit_result)
-        
-        return gitevo_result
-    
     def _ensure_git_repos(self, repo: str) -> list[str]:
 
         if not repo or repo is None:
@@ -304,6 +665,12 @@ class GitEvo:
             
         if metric_info.version_chart_type not in ['donut', 'pie', 'bar', 'hbar']:
             raise BadVersionChart(f'version chart in {metric_info.name} should be donut, pie, bar, or hbar, not {metric_info.version_chart_type}')
+
+        if metric_info.heavy_hitters is not None:
+            if not metric_info.categorical or metric_info.top_n is None:
+                raise BadHeavyHitters(f'heavy_hitters in {metric_info.name} requires a categorical metric with top_n')
+            if metric_info.heavy_hitters < metric_info.top_n:
+                raise BadHeavyHitters(f'heavy_hitters in {metric_info.name} should be equal or greater than top_n')
     
     def _is_git_remote(self, repo: str) -> bool:
         return repo.startswith(("git@", "https://", "http://", "git://"))
@@ -311,7 +678,8 @@ class GitEvo:
     def _projects_dir(self, folder_path: str):
         return [str(d.resolve()) for d in pathlib.Path(folder_path).iterdir() if d.is_dir()]
     
-    def _write_msg(self, format: str, path: str) -> str:
+    @staticmethod
+    def _write_msg(format: str, path: str) -> str:
         link = stdout_link(path, f'file://{path}')
         msg =  f'{format} report: {link}'
         return stdout_msg(msg)
@@ -331,32 +699,309 @@ class GitEvo:
         path = TableReport(result).export_csv()
         print(self._write_msg('CSV', path))
     
+def merge_shards(paths: list[str], export_html: bool = True, export_csv: bool = True) -> list[GitEvoResult]:
+    """
+    Merges the partial result files written by shards (see GitEvo shard) into one result per repository,
+    and exports their reports.
+
+    Args:
+        paths (list[str]): Partial result files of the shards
+        export_html (bool): Whether to export HTML report (default: True)
+        export_csv (bool): Whether to export CSV report (default: True)
+
+    Raises:
+        BadShard: If a file is not a shard result file, or if shards of a repository are missing
+    """
+    results = []
+    for shards in group_shards([read_shard(path) for path in paths]):
+        first = shards[0]
+        print('Merging repository:', first['repository_key'])
+
+        registered_metrics = [MetricInfo(callback=None, **{option: metric[option] for option in ['name', 'group'] + METRIC_OPTIONS}) 
+                              for metric in first['metrics']]
+        gitevo_result = GitEvoResult(first['report_title'], first['report_filename'], first['date_unit'], registered_metrics)
+        gitevo_result.project_result = ProjectResult(first['repository'], first['date_unit'])
+
+        # Shards hold contiguous dates, so their values are added in date order
+        builder = _ResultBuilder(gitevo_result, registered_metrics)
+        for shard in shards:
+            for selected_commit, metric_values in shard['values']:
+                builder.add(selected_commit, metric_values)
+        builder.finish()
+
+        if export_html:
+            print(GitEvo._write_msg('HTML', HtmlReport(gitevo_result).export_html()))
+        if export_csv:
+            print(GitEvo._write_msg('CSV', TableReport(gitevo_result).export_csv()))
+        results.append(gitevo_result)
+    return results
+
 class ParsedFile:
 
     """
     Represents a parsed file in a commit, containing its name, path, tree-sitter nodes, and lines of code (LOC).
+    The file is parsed on the first access to its nodes, so metrics that only use LOC or paths never parse it.
+    Nodes of the declared node types (see GitEvo.metric) are selected in a single walk over the file,
+    without creating the list of all its nodes.
     """
 
-    def __init__(self, name: str, path: str, nodes: list[Node], loc: int):
+    def __init__(self, name: str, path: str, nodes: list[Node] | None, loc: int,
+                 parse: Callable[[], list[Node] | NodeTable | Tree] | None = None,
+                 parse_tree: Callable[[], Tree] | None = None,
+                 declared_node_types: frozenset[str] = frozenset()):
         self.name = name
         self.path = path
-        self.nodes = nodes
+        self._nodes = nodes
+        self._parse = parse
+        self._parse_tree = parse_tree
+        self._table = None
+        self._tree = None
+        self._type_index = None
+        self.declared_node_types = declared_node_types
+        self._declared_index = None
+        self._declared_nodes = None
         self.loc = loc
+
+    @property
+    def nodes(self) -> list[Node]:
+        """
+        Returns the list of tree-sitter nodes in the file, parsing it on first access.
+        Returns:
+            list[Node]: The list of nodes.
+        """
+        if self._nodes is None:
+            self._load()
+            if self._table is not None:
+                self._nodes = self._table.nodes()
+            elif self._tree is not None:
+                self._nodes = tree_nodes(self._tree)
+            elif self._nodes is None:
+                self._nodes = []
+        return self._nodes
+
+    @property
+    def tree(self) -> Tree | None:
+        """
+        Returns the tree-sitter tree of the file, parsing it on first access, or None if the file has no grammar.
+        Returns:
+            Tree | None: The tree.
+        """
+        self._load()
+        if self._tree is None and self._parse_tree is not None:
+            # Files loaded from node tables are parsed again, only when a query needs the tree
+            self._tree = self._parse_tree()
+            self._parse_tree = None
+        return self._tree
+
+    @property
+    def table(self) -> NodeTable | None:
+        """
+        Returns the node table of the file, parsing it on first access, or None if the file is not stored in a node table.
+        Returns:
+            NodeTable | None: The node table.
+        """
+        self._load()
+        return self._table
+
+    @property
+    def is_parsed(self) -> bool:
+        return self._parse is None
+
+    def query(self, pattern: str) -> list[dict[str, list[Node]]]:
+        """
+        Runs a tree-sitter query over the file.
+        Returns:
+            list[dict[str, list[Node]]]: The captures of each match, by capture name.
+        """
+        tree = self.tree
+        if tree is None:
+            return []
+        query_cursor = QueryCursor(compile_query(tree.language, pattern))
+        return [captures for _, captures in query_cursor.matches(tree.root_node)]
+
+    def captures(self, pattern: str) -> dict[str, list[Node]]:
+        """
+        Runs a tree-sitter query over the file.
+        Returns:
+            dict[str, list[Node]]: The captured nodes, by capture name.
+        """
+        tree = self.tree
+        if tree is None:
+            return {}
+        query_cursor = QueryCursor(compile_query(tree.language, pattern))
+        return query_cursor.captures(tree.root_node)
+
+    def _load(self):
+        if self._parse is None:
+            return
+        parsed = self._parse()
+        self._parse = None
+        if isinstance(parsed, NodeTable):
+            self._table = parsed
+        elif isinstance(parsed, Tree):
+            self._tree = parsed
+        else:
+            self._nodes = parsed
+
+    def _parsed(self) -> list[Node] | NodeTable | Tree:
+        self._load()
+        if self._table is not None:
+            return self._table
+        if self._nodes is not None:
+            return self._nodes
+        return self._tree
+
+    def count_nodes(self, node_types: str | list[str] | None = None) -> int:
+        """
+        Counts the number of tree-sitter nodes in the file, optionally filtered by node types.
+        Returns:
+            int: The count of nodes.
+        """
+        if node_types is None:
+            return len(self.nodes)
+        node_types = _as_node_types(node_types)
+        type_index = self._get_type_index(node_types)
+        return sum(len(type_index.get(node_type, ())) for node_type in node_types)
+
+    def count_node_types(self, node_types: str | list[str] | None = None) -> Counter:
+        """
+        Counts the tree-sitter nodes in the file by type, optionally filtered by node types.
+        Types are in order of first occurrence, as in Counter(find_node_types()).
+        Returns:
+            Counter: The count of nodes per type.
+        """
+        if node_types is None:
+            return Counter({node_type: len(node_positions) for node_type, node_positions in self._get_type_index().items()})
+        node_types = _as_node_types(node_types)
+        type_index = self._get_type_index(node_types)
+        first_positions = sorted((type_index[node_type][0], node_type) for node_type in node_types if node_type in type_index)
+        return Counter({node_type: len(type_index[node_type]) for _, node_type in first_positions})
+
+    def find_node_types(self, node_types: str | list[str] = None) -> list[str]:
+        """
+        Finds the types of tree-sitter nodes in the file, in pre-order, optionally filtered by node types.
+        Returns:
+            list[str]: The list of node types.
+        """
+        if node_types is None:
+            return [node.type for node in self.nodes]
+        
+        node_types = _as_node_types(node_types)
+        type_index = self._get_type_index(node_types)
+        positions = [(type_index[node_type], node_type) for node_type in node_types if node_type in type_index]
+        if len(positions) == 1:
+            node_positions, node_type = positions[0]
+            return [node_type] * len(node_positions)
+        return [node_type for _, node_type in heapq.merge(*[zip(node_positions, repeat(node_type)) for node_positions, node_type in positions])]
+
+    def node_locs(self, node_types: str | list[str]) -> Iterator[int]:
+        """
+        Yields the lines of code (LOC) of the nodes of the given types, in pre-order.
+        A node spans end_row - start_row + 1 lines, as many as the parts of its text split at newlines.
+        Returns:
+            Iterator[int]: The LOC of each node.
+        """
+        if self._table is not None:
+            start_rows, end_rows = self._table.start_rows, self._table.end_rows
+            for position in self._positions(node_types):
+                yield end_rows[position] - start_rows[position] + 1
+        else:
+            for node in self.find_nodes_by_type(node_types):
+                yield node.end_point[0] - node.start_point[0] + 1
+
+    def find_nodes_by_type(self, node_types: str | list[str]) -> list[Node]:
+        """
+        Finds the tree-sitter nodes in the file by their types, in pre-order.
+        Returns:
+            list[Node]: The list of nodes.
+        """
+        node_types = _as_node_types(node_types)
+        type_index = self._get_type_index(node_types)
+        node_types = [node_type for node_type in node_types if node_type in type_index]
+        if len(node_types) == 1:
+            return list(self._nodes_of_type(node_types[0], type_index[node_types[0]]))
+        return [node for _, node in heapq.merge(*[zip(type_index[node_type], self._nodes_of_type(node_type, type_index[node_type]))
+                                                  for node_type in node_types], key=itemgetter(0))]
+
+    def _nodes_of_type(self, node_type: str, positions: list[int]) -> list[Node]:
+        if self._declared_nodes is not None and node_type in self._declared_nodes:
+            return self._declared_nodes[node_type]
+        if self._table is not None:
+            return [TableNode(self._table, position) for position in positions]
+        nodes = self.nodes
+        return [nodes[position] for position in positions]
+
+    def _positions(self, node_types: str | list[str]) -> list[int]:
+        node_types = _as_node_types(node_types)
+        type_index = self._get_type_index(node_types)
+        positions = [type_index[node_type] for node_type in node_types if node_type in type_index]
+        if len(positions) == 1:
+            return positions[0]
+        return list(heapq.merge(*positions))
+
+    def _get_type_index(self, node_types: list[str] | None = None) -> dict[str, list[int]]:
+        # Lookups of declared node types are served by the index of the declared types, unless all types are indexed
+        if node_types is not None and self._type_index is None and self.declared_node_types.issuperset(node_types):
+            return self._get_declared_index()
+
+        # Positions of the nodes of each type, built in a single walk over the nodes of the file
+        if self._type_index is None:
+            self._load()
+            if self._table is not None:
+                positions_by_kind = [[] for _ in self._table.types]
+                for position, kind in enumerate(self._table.kinds):
+                    positions_by_kind[kind].append(position)
+                self._type_index = dict(zip(self._table.types, positions_by_kind))
+            else:
+                type_index = {}
+                for position, node in enumerate(self.nodes):
+                    node_positions = type_index.get(node.type)
+                    if node_positions is None:
+                        type_index[node.type] = [position]
+                    else:
+                        node_positions.append(position)
+                self._type_index = type_index
+        return self._type_index
+
+    def _get_declared_index(self) -> dict[str, list[int]]:
+        # Positions (and nodes) of the declared node types only, built in a single walk over the file
+        if self._declared_index is None:
+            self._load()
+            declared_node_types = self.declared_node_types
+            if self._table is not None:
+                declared_kinds = {kind: [] for kind, node_type in enumerate(self._table.types) if node_type in declared_node_types}
+                for position, kind in enumerate(self._table.kinds):
+                    if kind in declared_kinds:
+                        declared_kinds[kind].append(position)
+                self._declared_index = {self._table.types[kind]: positions for kind, positions in declared_kinds.items()}
+            elif self._tree is not None and self._nodes is None:
+                self._declared_index, self._declared_nodes = select_nodes(self._tree, declared_node_types)
+            else:
+                declared_index = {}
+                for position, node in enumerate(self.nodes):
+                    if node.type in declared_node_types:
+                        declared_index.setdefault(node.type, []).append(position)
+                self._declared_index = declared_index
+        return self._declared_index
     
 class ParsedCommit:
 
     """
     Represents a parsed commit in a repository, containing its hash, date, file extension, parsed files,
     tree-sitter nodes, and lines of code (LOC).
+    When columnar, node counts, node types, and LOC by type are computed on NumPy columns (see NodeColumns).
     """
 
-    def __init__(self, hash: str, date: datetime, file_extension: str, parsed_files: list[ParsedFile]):
+    def __init__(self, hash: str, date: datetime, file_extension: str, parsed_files: list[ParsedFile], columnar: bool = False):
         self.hash = hash
         self.date = date
         self.file_extension = file_extension
+        self.columnar = columnar
         self._parsed_files = parsed_files
         self._nodes = None
         self._loc = None
+        self._columns = None
+        self._memo = {}
 
     @property
     def parsed_files(self) -> list[ParsedFile]:
@@ -378,6 +1023,39 @@ class ParsedCommit:
             self._nodes = [node for file in self.parsed_files for node in file.nodes]
         return self._nodes
     
+    def memo(self, key: Hashable, factory: Callable[['ParsedCommit'], Any]) -> Any:
+        """
+        Returns a value derived from the commit, computed by factory(commit) on the first call with the key.
+        The value is shared by all metrics of the same date and file extension, so derived views
+        (eg, the endpoints of a web framework) are computed once instead of once per metric.
+        Args:
+            key (Hashable): The key of the value, eg, its name.
+            factory (Callable[[ParsedCommit], Any]): Computes the value from the commit.
+        Returns:
+            Any: The value.
+        """
+        if key not in self._memo:
+            self._memo[key] = factory(self)
+        return self._memo[key]
+
+    @property
+    def columns(self) -> NodeColumns:
+        """
+        Returns the nodes of the commit as NumPy columns, built on first access. Requires a columnar commit.
+        Returns:
+            NodeColumns: The node columns.
+        """
+        if self._columns is None:
+            assert self.columnar, 'node columns require a columnar commit'
+            tables = []
+            for file in self.parsed_files:
+                if file.table is not None:
+                    tables.append(file.table)
+                else:
+                    assert not file.nodes, f'{file.path} is not stored in a node table'
+            self._columns = NodeColumns.from_tables(tables)
+        return self._columns
+
     @property
     def loc(self) -> int:
         """
@@ -402,31 +1080,61 @@ class ParsedCommit:
         Returns:
             int: The count of nodes.
         """
+        if self.columnar:
+            if node_types is None:
+                return len(self.columns)
+            return self.columns.count_nodes(_as_node_types(node_types))
         if node_types is None:
             return len(self.nodes)
-        return len(self.find_nodes_by_type(node_types))
+        return sum(file.count_nodes(node_types) for file in self.parsed_files)
 
     def loc_by_type(self, node_type: str, aggregate: str = 'median') -> int | float:
         """
         Calculates the lines of code (LOC) for nodes of a specific type, using the specified aggregation method.
+        The LOC of each node comes from its start and end rows, so the source code is never decoded.
         Args:
             node_type (str): The type of node to calculate LOC for.
-            aggregate (str): The aggregation method to use ('median', 'mean', 'mode').
+            aggregate (str): The aggregation method to use ('median', 'mean', 'mode', or a percentile, eg, 'p90' or 'p99').
         Returns:
             int | float: The aggregated LOC value.
         Raises:
             BadLOCAggregate: If the aggregate method is invalid.
         """
-        if aggregate is not None and aggregate not in ['median', 'mean', 'mode']:
-            raise BadLOCAggregate(f'LOC aggregate should be median, mean, or mode')
+        if aggregate not in ['median', 'mean', 'mode'] and percentile_of(aggregate) is None:
+            raise BadLOCAggregate(f'LOC aggregate should be median, mean, mode, or a percentile (eg, p90)')
         
-        nodes = self.find_nodes_by_type([node_type])
-        if not nodes:
+        if self.columnar:
+            locs = self.columns.locs([node_type])
+            if len(locs) == 0:
+                return 0
+            return aggregate_stat(locs, aggregate)
+
+        # LOC are counted as they are streamed, in memory bounded by the number of distinct LOC
+        distribution = Distribution()
+        for file in self.parsed_files:
+            distribution.update(file.node_locs(node_type))
+        if not distribution:
             return 0
-
-        locs = [len(as_str(node.text).split('\n')) for node in nodes]
-        return aggregate_stat(locs, aggregate)
+        return round(distribution.aggregate(aggregate), 1)
     
+    def count_node_types(self, node_types: str | list[str] | None = None) -> Counter:
+        """
+        Counts the tree-sitter nodes in the commit by type, optionally filtered by node types.
+        It is equivalent to Counter(find_node_types(node_types)), including the order of the types
+        (first occurrence), without creating a list with one entry per node.
+        Args:
+            node_types (str | list[str], optional): The node types to filter by.
+        Returns:
+            Counter: The count of nodes per type.
+        """
+        if self.columnar:
+            return Counter(self.columns.count_node_types(None if node_types is None else _as_node_types(node_types)))
+
+        counter = Counter()
+        for file in self.parsed_files:
+            counter.update(file.count_node_types(node_types))
+        return counter
+
     def find_node_types(self, node_types: str | list[str] = None) -> list[str]:
         """
         Finds the types of tree-sitter nodes in the commit, optionally filtered by node types.
@@ -435,13 +1143,13 @@ class ParsedCommit:
         Returns:
             list[str]: The list of node types.
         """
+        if self.columnar:
+            return self.columns.find_node_types(None if node_types is None else _as_node_types(node_types))
+
         if node_types is None:
             return [node.type for node in self.nodes]
 
-        if isinstance(node_types, str):
-            node_types = [node_types]    
-    
-        return [node.type for node in self.nodes if node.type in node_types]
+        return [node_type for file in self.parsed_files for node_type in file.find_node_types(node_types)]
     
     def find_nodes_by_type(self, node_types: str | list[str]) -> list[Node]:
         """
@@ -451,11 +1159,45 @@ class ParsedCommit:
         Returns:
             list[Node]: The list of nodes.
         """
-        if isinstance(node_types, str):
-            node_types = [node_types]
-
-        return [node for node in self.nodes if node.type in node_types]
+        if self.columnar:
+            # Only the matching nodes are created, the nodes of the files are never materialized
+            positions = self.columns.positions(_as_node_types(node_types))
+            return [TableNode(table, position) for table, position in self.columns.table_positions(positions)]
+        return [node for file in self.parsed_files for node in file.find_nodes_by_type(node_types)]
     
+    def query(self, pattern: str) -> list[dict[str, list[Node]]]:
+        """
+        Runs a tree-sitter query over the files of the commit.
+        The query is compiled once per grammar and matched natively by tree-sitter.
+
+        See the query syntax at:
+        https://tree-sitter.github.io/tree-sitter/using-parsers/queries
+
+        Args:
+            pattern (str): The query, as tree-sitter S-expressions.
+        Returns:
+            list[dict[str, list[Node]]]: The captures of each match, by capture name, in file order.
+        Raises:
+            BadQuery: If the query is invalid.
+        """
+        return [captures for file in self.parsed_files for captures in file.query(pattern)]
+
+    def captures(self, pattern: str) -> dict[str, list[Node]]:
+        """
+        Runs a tree-sitter query over the files of the commit and groups the captured nodes by capture name.
+        Args:
+            pattern (str): The query, as tree-sitter S-expressions.
+        Returns:
+            dict[str, list[Node]]: The captured nodes, by capture name, in file order.
+        Raises:
+            BadQuery: If the query is invalid.
+        """
+        result = {}
+        for file in self.parsed_files:
+            for name, nodes in file.captures(pattern).items():
+                result.setdefault(name, []).extend(nodes)
+        return result
+
     def named_children_for(self, node: Node) -> list[Node]:
         """
         Returns the named children of a given tree-sitter node.
@@ -466,43 +1208,66 @@ class ParsedCommit:
         """
         return [each for each in node.children if each.is_named]
     
-    def descendant_nodes_for(self, node: Node) -> list[Node]:
+    def descendant_nodes_for(self, node: Node, max_depth: int | None = None) -> list[Node]:
         """
-        Returns the descendant nodes of a given tree-sitter node.
+        Returns the descendant nodes of a given tree-sitter node, including the node itself, in pre-order.
         Args:
             node (Node): The tree-sitter node.
+            max_depth (int | None): The maximum depth to descend, the node is at depth 0 (default: None, no limit).
         Returns:
             list[Node]: The list of descendant nodes.
         """
-        descendants = []
-        def traverse_node(current_node):
-            descendants.append(current_node)
-            for child in current_node.children:
-                traverse_node(child)
+        return list(iter_descendants(node, max_depth))
+
+    def iter_descendant_nodes_for(self, node: Node, max_depth: int | None = None) -> Iterator[Node]:
+        """
+        Iterates over the descendant nodes of a given tree-sitter node, including the node itself, in pre-order.
+        Unlike descendant_nodes_for, nodes are produced on demand, so callers can stop early.
+        Args:
+            node (Node): The tree-sitter node.
+            max_depth (int | None): The maximum depth to descend, the node is at depth 0 (default: None, no limit).
+        Returns:
+            Iterator[Node]: The descendant nodes.
+        """
+        return iter_descendants(node, max_depth)
 
-        traverse_node(node)
-        return descendants
+    def first_descendant_node_for(self, node: Node, predicate: Callable[[Node], bool], max_depth: int | None = None) -> Node | None:
+        """
+        Finds the first descendant node of a given tree-sitter node, in pre-order, that satisfies a predicate.
+        Args:
+            node (Node): The tree-sitter node.
+            predicate (Callable[[Node], bool]): The condition to be satisfied.
+            max_depth (int | None): The maximum depth to descend, the node is at depth 0 (default: None, no limit).
+        Returns:
+            Node | None: The first descendant node satisfying the predicate, or None if not found.
+        """
+        return first_descendant(node, predicate, max_depth)
     
-    def descendant_node_by_field_name(self, node: Node, name: str) -> Node | None:
+    def descendant_node_by_field_name(self, node: Node, name: str, max_depth: int | None = None) -> Node | None:
         """
-        Finds a descendant node of a given tree-sitter node by its field name.
+        Finds a descendant node of a given tree-sitter node by its field name, stopping at the first match.
         Args:
             node (Node): The tree-sitter node.
             name (str): The field name to search for.
+            max_depth (int | None): The maximum depth to descend, the node is at depth 0 (default: None, no limit).
         Returns:
             Node | None: The descendant node with the specified field name, or None if not found.
         """
-        for desc_node in self.descendant_nodes_for(node):
-            target_node = desc_node.child_by_field_name(name)
-            if target_node is not None:
-                return target_node
-        return None
+        return descendant_by_field_name(node, name, max_depth)
+
+def _as_node_types(node_types: str | list[str]) -> list[str]:
+    if isinstance(node_types, str):
+        return [node_types]
+    # Repeated types are matched once, as in a membership test
+    return list(dict.fromkeys(node_types))
 
 class _ParsedCommitCache:
 
-    def __init__(self, commit: Commit, file_extensions: list[str]):
-        self.commit = commit
+    def __init__(self, selected_commit: SelectedCommit, file_extensions: list[str], parsed_file_cache: '_ParsedFileCache', columnar: bool = False):
+        self.commit = selected_commit
         self.file_extensions = file_extensions
+        self.parsed_file_cache = parsed_file_cache
+        self.columnar = columnar
         
         self._parsed_commits: dict[str, ParsedCommit] = {}
         self._create_parsed_commits()
@@ -519,16 +1284,287 @@ class _ParsedCommitCache:
         return ' '.join(file_stats)
     
     def _create_parsed_commits(self):
+        files = self.parsed_file_cache.repository.files(self.commit.hash)
+        self.parsed_file_cache.next_commit()
         for file_extension in self.file_extensions:
-            self._parsed_commits[file_extension] = self._create_parsed_commit(file_extension)
+            self._parsed_commits[file_extension] = self._create_parsed_commit(file_extension, files)
 
-    def _create_parsed_commit(self, file_extension: str) -> ParsedCommit:
+    def _create_parsed_commit(self, file_extension: str, files: list[GitFile]) -> ParsedCommit:
         parsed_files = []
-        for file in self.commit.all_files([file_extension]):
-            file_nodes = [node for node in file.tree_nodes]
-            parsed_file = ParsedFile(file.filename, file.path, file_nodes, file.loc)
+        for file in files:
+            if not file.path.endswith(file_extension):
+                continue
+            parsed_file = self.parsed_file_cache.get_parsed_file_for(file)
             parsed_files.append(parsed_file)
-        return ParsedCommit(self.commit.hash, self.commit.committer_date, file_extension, parsed_files)
+        return ParsedCommit(self.commit.hash, self.commit.committer_date, file_extension, parsed_files, self.columnar)
+
+class _ParsedFileCache:
+
+    # Bound on the source size of the files cached for later dates, their parsed nodes take about 20 times more memory
+    MAX_SOURCE_BYTES = 16 * 1024 * 1024
+
+    def __init__(self, repository: GitRepository, cache_dir: str | None = None, columnar: bool = False,
+                 declared_node_types: frozenset[str] = frozenset(), max_source_bytes: int = MAX_SOURCE_BYTES):
+        self.repository = repository
+        self.declared_node_types = declared_node_types
+        self.code_parser = CodeParser()
+        # Parsed files are also stored on disk as node tables, to be reused by the next runs
+        self.parse_cache = ParseCache(cache_dir) if cache_dir is not None else None
+        # Node tables are the source of the node columns of commits
+        self.use_tables = self.parse_cache is not None or columnar
+        # Files are keyed by blob SHA and grammar, so unchanged files are parsed once across dates.
+        # The files of the current and previous dates are always kept, whatever their size,
+        # and the older ones are kept up to max_source_bytes, as they may come back (eg, reverts)
+        self._current_files: dict[tuple, tuple[ParsedFile, int]] = {}
+        self._previous_files: dict[tuple, tuple[ParsedFile, int]] = {}
+        self._parsed_files = LRUCache(max_source_bytes)
+
+    def __len__(self) -> int:
+        return len(self._current_files) + len(self._previous_files) + len(self._parsed_files)
+
+    def next_commit(self):
+        for key, cached in self._previous_files.items():
+            self._parsed_files.put(key, cached, cached[1] + 1)
+        self._previous_files = self._current_files
+        self._current_files = {}
+
+    def get_parsed_file_for(self, file: GitFile) -> ParsedFile:
+        miner = self.code_parser.miner_for(file.path)
+        if miner is None:
+            return ParsedFile(file.name, file.path, [], 0)
+
+        key = (file.sha, miner.extension)
+        cached = self._current_files.get(key)
+        if cached is None:
+            cached = self._previous_files.pop(key, None) or self._parsed_files.pop(key)
+            if cached is None:
+                parsed_file, size = self._create_parsed_file(file, miner)
+                self._current_files[key] = (parsed_file, size)
+                return parsed_file
+            self._current_files[key] = cached
+
+        parsed_file, _ = cached
+        if parsed_file.path != file.path:
+            # Same content in another path (eg, renamed or copied file), share the parsing with it
+            shared_file = parsed_file
+            parsed_file = ParsedFile(file.name, file.path, None, shared_file.loc,
+                                     parse=shared_file._parsed, parse_tree=lambda: shared_file.tree,
+                                     declared_node_types=self.declared_node_types)
+        return parsed_file
+
+    def _create_parsed_file(self, file: GitFile, miner: BaseMiner) -> tuple[ParsedFile, int]:
+        if self.parse_cache is not None:
+            cached = self.parse_cache.get(file.sha, miner)
+            if cached is not None:
+                table, loc = cached
+                return ParsedFile(file.name, file.path, None, loc, parse=lambda: table,
+                                  parse_tree=lambda: self.code_parser.parse(table.source, miner),
+                                  declared_node_types=self.declared_node_types), len(table.source)
+
+        # Decode and encode back, so that invalid bytes are dropped as in treeminer
+        source_code = self.repository.read_blob(file.sha).decode('utf-8', 'ignore')
+        loc = len(source_code.split('\n'))
+        source_bytes = bytes(source_code, 'utf-8')
+
+        def parse() -> Tree | NodeTable:
+            tree = self.code_parser.parse(source_bytes, miner)
+            if not self.use_tables:
+                return tree
+            # Nodes come from the node table both on cache hits and misses, so metrics see the same nodes
+            table = NodeTable.from_tree(tree, source_bytes)
+            if self.parse_cache is not None:
+                self.parse_cache.put(file.sha, miner, table, loc)
+            return table
+
+        return ParsedFile(file.name, file.path, None, loc, parse=parse,
+                          parse_tree=lambda: self.code_parser.parse(source_bytes, miner),
+                          declared_node_types=self.declared_node_types), len(source_bytes)
+    
+# Errors in the user configuration, which stop the analysis of all repositories
+_USER_ERRORS = (FileExtensionNotFound, BadReturnType, BadDateUnit, BadYearRange, BadLOCAggregate, BadVersionChart, BadQuery, BadMetricReference, BadHeavyHitters, BadShard, BadExecutor)
+
+_SEQUENTIAL_MSG = 'Parallel jobs need module-level metric functions on this platform, running sequentially'
+
+
+def _process_repository_in_worker(evo: GitEvo, git_repo: str, connection):
+    try:
+        result = evo._process_repository(git_repo)
+        connection.send((result, None))
+    except _USER_ERRORS as e:
+        connection.send((None, e))
+    except Exception as e:
+        connection.send((None, str(e)))
+    finally:
+        connection.close()
+
+class _ResultBuilder:
+
+    """
+    Builds the result of a repository from the metric values of its dates, added in date order.
+    Its state is saved in checkpoints, see GitEvo._compute_metrics.
+
+    Args:
+        gitevo_result (GitEvoResult): Result to be built, with an empty project result
+        registered_metrics (list[MetricInfo]): Metrics of the values
+        state (dict | None): State of a checkpoint to resume from (default: None)
+        keep_values (bool): Whether to keep the metric values of each date, eg, to write shards (default: False)
+    """
+
+    def __init__(self, gitevo_result: GitEvoResult, registered_metrics: list[MetricInfo], state: dict | None = None, keep_values: bool = False):
+        self.gitevo_result = gitevo_result
+        self.registered_metrics = registered_metrics
+        if state is None:
+            category_sketches = {index: _CategorySketch(metric_info) for index, metric_info in enumerate(registered_metrics)
+                                 if metric_info.heavy_hitters is not None}
+            state = {'commit_results': [], 'finished': {}, 'metric_names': [], 'category_sketches': category_sketches, 'values': []}
+        self.state = state
+        self.keep_values = keep_values
+
+        for metric_info in registered_metrics:
+            # Real names of the categorical metrics are known only at runtime, thus, now register None
+            gitevo_result.add_metric_group(metric_info.name_or_none_for_categorical, metric_info.group)
+
+        # The commit results are shared with the state
+        gitevo_result.project_result.commit_results = state['commit_results']
+        self._register_metric_names(state['metric_names'])
+
+    @property
+    def values(self) -> list[tuple[SelectedCommit, dict]]:
+        return self.state['values']
+
+    def add(self, selected_commit: SelectedCommit, metric_values: dict):
+        commit_result, metric_names, category_counts = self._build_commit_result(selected_commit, metric_values)
+        self._register_metric_names(metric_names)
+        for index, counts in category_counts.items():
+            self.state['category_sketches'][index].add(commit_result, counts)
+        self.gitevo_result.project_result.add_commit_result(commit_result)
+
+        self.state['metric_names'].extend(metric_names)
+        self.state['finished'][selected_commit.bucket] = selected_commit.hash
+        if self.keep_values:
+            self.state['values'].append((selected_commit, metric_values))
+
+    def finish(self):
+        for category_sketch in self.state['category_sketches'].values():
+            self._register_metric_names(category_sketch.finish())
+
+    def _build_commit_result(self, selected_commit: SelectedCommit, metric_values: dict) -> tuple[CommitResult, list[tuple[str, str | None]], dict[int, list[tuple[str, int]]]]:
+
+        # Iterate on each metric
+        commit_result = CommitResult(selected_commit.hash, selected_commit.committer_date.date())
+        # Metric names to be registered, with the group of categorical metrics
+        metric_names = []
+        # Categories of the metrics with heavy_hitters, by metric index, reduced later in date order
+        category_counts = {}
+        for index, metric_info in enumerate(self.registered_metrics):
+            metric_value = metric_values[index]
+
+            if metric_info.categorical:
+
+                if not metric_value:
+                    continue
+
+                if metric_info.heavy_hitters is not None:
+                    category_counts[index] = metric_value
+                    continue
+
+                for real_name, value in metric_value:
+                    metric_result = MetricResult(name=real_name, value=value, date=commit_result.date)
+                    commit_result.add_metric_result(metric_result)
+                    metric_names.append((real_name, metric_info.group))
+
+            else:
+                metric_result = MetricResult(name=metric_info.name, value=metric_value, date=commit_result.date)
+                commit_result.add_metric_result(metric_result)
+                metric_names.append((metric_info.name, None))
+
+        return commit_result, metric_names, category_counts
+
+    def _register_metric_names(self, metric_names: list[tuple[str, str | None]]):
+        for name, group in metric_names:
+            self.gitevo_result.add_metric_name(name)
+            # Register the real name of the categorical metric
+            if group is not None:
+                self.gitevo_result.add_metric_group(name, group)
+
+class _CategorySketch:
+
+    """
+    Categories of a categorical metric with heavy_hitters, see GitEvo.metric.
+    Categories are counted over all dates in a Space-Saving sketch. Each date keeps the categories tracked by
+    the sketch and its own most common ones (up to heavy_hitters), and the others are summed into '<name>: other'.
+    When all dates are computed, only the categories that may reach the top_n are kept.
+    """
+
+    def __init__(self, metric_info: MetricInfo):
+        self.name = metric_info.name
+        self.group = metric_info.group
+        self.top_n = metric_info.top_n
+        self.other_name = f'{metric_info.name}: other'
+        self.sketch = SpaceSaving(metric_info.heavy_hitters)
+        # Metric results created for each date, with the top_n of the last date
+        self.dates: list[tuple[CommitResult, list[MetricResult]]] = []
+        self.last_top: list[str] = []
+
+    def add(self, commit_result: CommitResult, counts: list[tuple[str, int]]):
+        for name, count in counts:
+            assert isinstance(name, str), f'categorical metric {self.name} should return list[str], Counter, or dict[str, int]'
+            self.sketch.add(name, count)
+
+        self.last_top = [name for name, _ in counts[:self.top_n]]
+        # The most common categories of the date are kept as well, so that their values stay exact
+        top = {name for name, _ in counts[:self.sketch.capacity]}
+        metric_results = []
+        other = 0
+        for name, count in counts:
+            if name in self.sketch or name in top:
+                metric_results.append(MetricResult(name=name, value=count, date=commit_result.date))
+            else:
+                other += count
+        if other:
+            metric_results.append(MetricResult(name=self.other_name, value=other, date=commit_result.date))
+
+        for metric_result in metric_results:
+            commit_result.add_metric_result(metric_result)
+        self.dates.append((commit_result, metric_results))
+
+    def finish(self) -> list[tuple[str, str]]:
+        # Categories that may reach the top_n overall or are in the top_n of the last date
+        kept = set(self.sketch.top(self.top_n)) | set(self.last_top)
+        kept.add(self.other_name)
+
+        names = {}
+        for commit_result, metric_results in self.dates:
+            dropped = [metric_result for metric_result in metric_results if metric_result.name not in kept]
+            if dropped:
+                self._fold_into_other(commit_result, metric_results, dropped)
+            for metric_result in metric_results:
+                names[metric_result.name] = None
+        return [(name, self.group) for name in names]
+
+    def _fold_into_other(self, commit_result: CommitResult, metric_results: list[MetricResult], dropped: list[MetricResult]):
+        dropped_ids = {id(metric_result) for metric_result in dropped}
+        commit_result.metric_results = [metric_result for metric_result in commit_result.metric_results if id(metric_result) not in dropped_ids]
+        metric_results[:] = [metric_result for metric_result in metric_results if id(metric_result) not in dropped_ids]
+
+        value = sum(metric_result.value for metric_result in dropped)
+        other = next((metric_result for metric_result in metric_results if metric_result.name == self.other_name), None)
+        if other is None:
+            other = MetricResult(name=self.other_name, value=0, date=commit_result.date)
+            commit_result.add_metric_result(other)
+            metric_results.append(other)
+        other.value += value
+
+# Worker state of the process pool, see GitEvo._compute_commit_results_in_parallel
+_worker_state = None
+
+def _init_worker(evo: GitEvo, repository_path: str):
+    global _worker_state
+    _worker_state = (evo, evo._parsed_file_cache(GitRepository(repository_path)))
+
+def _compute_selected_commit_in_worker(selected_commit: SelectedCommit, metric_indexes: list[int]):
+    evo, parsed_file_cache = _worker_state
+    return evo._compute_selected_commit(parsed_file_cache, selected_commit, metric_indexes)
     
 class GenericMiner(BaseMiner):
     extension: str = None
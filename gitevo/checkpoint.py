@@ -0,0 +1,53 @@
+import os
+import time
+import pickle
+
+from gitevo.utils import write_file_atomic
+
+
+class Checkpoint:
+
+    """
+    Results of the dates analyzed so far, saved next to the reports, so that an interrupted analysis can be resumed.
+    It is saved at most once per interval and when the analysis fails, and it is removed when the analysis completes.
+
+    Args:
+        path (str): Checkpoint file
+        key (tuple): Settings of the analysis, a checkpoint saved with other settings is not resumed
+        interval (float): Minimum number of seconds between two saves
+    """
+
+    FORMAT_VERSION = 1
+
+    def __init__(self, path: str, key: tuple, interval: float = 60):
+        self.path = path
+        self.key = key
+        self.interval = interval
+        self._saved_at = time.monotonic()
+
+    def load(self) -> dict | None:
+        try:
+            with open(self.path, 'rb') as file:
+                data = file.read()
+        except FileNotFoundError:
+            return None
+        try:
+            version, key, state = pickle.loads(data)
+        except Exception:
+            # Truncated or corrupted checkpoint, the analysis starts again
+            return None
+        if version != self.FORMAT_VERSION or key != self.key:
+            return None
+        return state
+
+    def save(self, state: dict, force: bool = False) -> bool:
+        if not force and time.monotonic() - self._saved_at < self.interval:
+            return False
+        data = pickle.dumps((self.FORMAT_VERSION, self.key, state), protocol=pickle.HIGHEST_PROTOCOL)
+        write_file_atomic(self.path, data)
+        self._saved_at = time.monotonic()
+        return True
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -1,8 +1,10 @@
 import argparse
+import sys
 
 from importlib.metadata import version
 
 from gitevo import GitEvo
+from gitevo.application import merge_shards
 from gitevo.reports import report_mappings
 
 
@@ -48,6 +50,58 @@ def parse_args(args=None):
         help='Set to analyze commits by month.'
     )
 
+    parser.add_argument(
+        '-j',
+        '--jobs',
+        default=1,
+        type=int,
+        help='Number of processes to analyze dates in parallel. Default is 1.'
+    )
+
+    parser.add_argument(
+        '--repo-jobs',
+        default=1,
+        type=int,
+        help='Number of repositories to analyze in parallel, when git_repo is a directory containing multiple Git repositories. Default is 1.'
+    )
+
+    parser.add_argument(
+        '--cache-dir',
+        type=str,
+        help='Directory of the persistent parse cache. Files parsed in previous runs are not parsed again.'
+    )
+
+    parser.add_argument(
+        '--columnar',
+        action='store_true',
+        help='Store the nodes of each commit in NumPy columns, using less memory on large repositories. Requires numpy.'
+    )
+
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='Save a checkpoint of the dates analyzed, and resume an interrupted analysis from it, skipping the dates already analyzed.'
+    )
+
+    parser.add_argument(
+        '--result-store',
+        type=str,
+        help='SQLite file storing the metric values across runs. Reruns only compute the values of new dates or changed metrics.'
+    )
+
+    parser.add_argument(
+        '--memory-cache',
+        default=16,
+        type=int,
+        help='Megabytes of source of the parsed files kept in memory for later dates, besides the files of the previous date. Default is 16.'
+    )
+
+    parser.add_argument(
+        '--shard',
+        type=str,
+        help='Analyze only the shard i/n of the dates, eg, 2/4, writing a partial result file. Partial results are combined with: gitevo merge <files>.'
+    )
+
     parser.add_argument(
         '-v',
         '--version',
@@ -58,6 +112,75 @@ def parse_args(args=None):
 
     return parser.parse_args(args)
 
+def parse_merge_args(args=None):
+
+    parser = argparse.ArgumentParser(prog='gitevo merge', description='Merge the partial result files of gitevo --shard into reports')
+
+    parser.add_argument(
+        'shard_files',
+        nargs='+',
+        type=str,
+        help='Partial result files written by the shards. Example: gitevo merge report_flask.shard-*.pickle'
+    )
+
+    return parser.parse_args(args)
+
+def parse_serve_args(args=None):
+
+    parser = argparse.ArgumentParser(prog='gitevo serve', description='Run GitEvo as a local HTTP service, keeping clones and caches warm across analysis jobs')
+
+    parser.add_argument(
+        '--host',
+        default='127.0.0.1',
+        type=str,
+        help='Host of the service. Default is 127.0.0.1.'
+    )
+
+    parser.add_argument(
+        '--port',
+        default=8765,
+        type=int,
+        help='Port of the service. Default is 8765.'
+    )
+
+    parser.add_argument(
+        '--workdir',
+        default='gitevo-service',
+        type=str,
+        help='Directory of the clones, parse cache, result store, and reports. Default is gitevo-service.'
+    )
+
+    parser.add_argument(
+        '--workers',
+        default=1,
+        type=int,
+        help='Number of analysis jobs running at a time. Default is 1.'
+    )
+
+    parser.add_argument(
+        '--queue-size',
+        default=16,
+        type=int,
+        help='Number of analysis jobs waiting to run. New jobs are rejected when the queue is full. Default is 16.'
+    )
+
+    parser.add_argument(
+        '-j',
+        '--jobs',
+        default=1,
+        type=int,
+        help='Number of processes to analyze the dates of each job in parallel. Default is 1.'
+    )
+
+    parser.add_argument(
+        '--max-repositories',
+        default=8,
+        type=int,
+        help='Number of repositories kept open with their parsed files across jobs. The least recently used are closed. Default is 8.'
+    )
+
+    return parser.parse_args(args)
+
 def gitevo_version():
     try:
         v = version("gitevo")
@@ -75,6 +198,14 @@ class GitEvoCLI:
         self.report = parsed_args.report
         self.from_year = parsed_args.from_year
         self.to_year = parsed_args.to_year
+        self.jobs = parsed_args.jobs
+        self.repo_jobs = parsed_args.repo_jobs
+        self.cache_dir = parsed_args.cache_dir
+        self.columnar = parsed_args.columnar
+        self.resume = parsed_args.resume
+        self.result_store = parsed_args.result_store
+        self.shard = parsed_args.shard
+        self.memory_cache = parsed_args.memory_cache
         
         self.date_unit = 'year'
         if parsed_args.month:
@@ -87,14 +218,68 @@ class GitEvoCLI:
                      extension=report.extension,
                      from_year=self.from_year,
                      to_year=self.to_year,
-                     date_unit=self.date_unit)
+                     date_unit=self.date_unit,
+                     jobs=self.jobs,
+                     repo_jobs=self.repo_jobs,
+                     cache_dir=self.cache_dir,
+                     columnar=self.columnar,
+                     resume=self.resume,
+                     result_store=self.result_store,
+                     shard=self.shard,
+                     memory_cache=self.memory_cache)
         report.metrics(evo)
         evo.run()
         return OK
 
+class MergeCLI:
+
+    def __init__(self, args=None):
+        parsed_args = parse_merge_args(args)
+        self.shard_files = parsed_args.shard_files
+
+    def run(self):
+        merge_shards(self.shard_files)
+        return OK
+
+class ServeCLI:
+
+    def __init__(self, args=None):
+        parsed_args = parse_serve_args(args)
+        self.host = parsed_args.host
+        self.port = parsed_args.port
+        self.workdir = parsed_args.workdir
+        self.workers = parsed_args.workers
+        self.queue_size = parsed_args.queue_size
+        self.jobs = parsed_args.jobs
+        self.max_repositories = parsed_args.max_repositories
+
+    def run(self):
+        # Imported here, the service is not needed by the other commands
+        from gitevo.server import AnalysisService, create_server
+        service = AnalysisService(self.workdir, workers=self.workers, queue_size=self.queue_size, jobs=self.jobs,
+                                  max_repositories=self.max_repositories)
+        server = create_server(service, self.host, self.port)
+        host, port = server.server_address[:2]
+        print(f'GitEvo service: http://{host}:{port}')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            service.close()
+        return OK
+
 def main(args=None):
+    if args is None:
+        args = sys.argv[1:]
     try:
-        status = GitEvoCLI(args).run()
+        if args and args[0] == 'merge':
+            status = MergeCLI(args[1:]).run()
+        elif args and args[0] == 'serve':
+            status = ServeCLI(args[1:]).run()
+        else:
+            status = GitEvoCLI(args).run()
     except Exception as e:
         print(e)
         status = ERR
@@ -0,0 +1,97 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from gitevo.nodes import NodeTable
+
+"""
+This module contains NodeColumns, a columnar representation of the nodes of a commit.
+It requires NumPy, which is an optional dependency of GitEvo (pip install numpy).
+"""
+
+class NodeColumns:
+
+    """
+    Nodes of all the files of a commit in NumPy arrays, in file order and, per file, in pre-order.
+
+    Columns: kind (index into types), start and end byte, start and end row, depth,
+    parent (index into the columns, or -1), and file (index into the files of the commit).
+    Node types are counted once per commit, so counts by type do not scan the columns.
+    """
+
+    def __init__(self, types: list[str], tables: list[NodeTable]):
+        self.types = types
+        self.tables = tables
+
+        type_indexes = {node_type: index for index, node_type in enumerate(types)}
+        sizes = np.array([len(table) for table in tables], dtype=np.int64)
+        self.offsets = np.concatenate(([0], np.cumsum(sizes)))
+
+        # Kinds are per file, they are translated into the kinds of the commit
+        self.kinds = _concatenate([np.array([type_indexes[node_type] for node_type in table.types], dtype=np.int32)[_column(table.kinds)]
+                                   for table in tables], np.int32)
+        self.start_bytes = _concatenate([_column(table.start_bytes) for table in tables], np.uint32)
+        self.end_bytes = _concatenate([_column(table.end_bytes) for table in tables], np.uint32)
+        self.start_rows = _concatenate([_column(table.start_rows) for table in tables], np.uint32)
+        self.end_rows = _concatenate([_column(table.end_rows) for table in tables], np.uint32)
+        self.files = np.repeat(np.arange(len(tables), dtype=np.int32), sizes)
+
+        parents = _concatenate([_column(table.parents) for table in tables], np.int64)
+        self.parents = np.where(parents >= 0, parents + self.offsets[self.files], -1)
+
+        # Nodes are in pre-order, so the depth of a node is the number of earlier nodes whose descendants reach it
+        descendants = _concatenate([_column(table.descendants) for table in tables], np.int64)
+        size = len(self.kinds)
+        delta = np.zeros(size + 1, dtype=np.int64)
+        delta[1:] += 1
+        delta -= np.bincount(np.arange(size) + descendants + 1, minlength=size + 1)
+        self.depths = np.cumsum(delta)[:size].astype(np.int32)
+
+        self.kind_counts = np.bincount(self.kinds, minlength=len(types))
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    @classmethod
+    def from_tables(cls, tables: list[NodeTable]) -> 'NodeColumns':
+        types = list(dict.fromkeys(node_type for table in tables for node_type in table.types))
+        return cls(types, tables)
+
+    def kind_ids(self, node_types: list[str]) -> 'np.ndarray':
+        type_indexes = {node_type: index for index, node_type in enumerate(self.types)}
+        return np.array([type_indexes[node_type] for node_type in node_types if node_type in type_indexes], dtype=np.int32)
+
+    def count_nodes(self, node_types: list[str]) -> int:
+        return int(self.kind_counts[self.kind_ids(node_types)].sum())
+
+    def count_node_types(self, node_types: list[str] | None = None) -> dict[str, int]:
+        # Kinds are numbered in order of first occurrence in the commit
+        kinds = np.arange(len(self.types)) if node_types is None else np.sort(self.kind_ids(node_types))
+        return {self.types[kind]: count for kind, count in zip(kinds.tolist(), self.kind_counts[kinds].tolist()) if count > 0}
+
+    def positions(self, node_types: list[str]) -> 'np.ndarray':
+        return np.flatnonzero(np.isin(self.kinds, self.kind_ids(node_types)))
+
+    def find_node_types(self, node_types: list[str] | None = None) -> list[str]:
+        kinds = self.kinds if node_types is None else self.kinds[self.positions(node_types)]
+        return np.array(self.types, dtype=object)[kinds].tolist()
+
+    def locs(self, node_types: list[str]) -> 'np.ndarray':
+        positions = self.positions(node_types)
+        return self.end_rows[positions].astype(np.int64) - self.start_rows[positions] + 1
+
+    def table_positions(self, positions: 'np.ndarray') -> list[tuple[NodeTable, int]]:
+        """
+        Maps positions in the columns to (node table, position in the table).
+        """
+        files = self.files[positions]
+        return [(self.tables[file], position) for file, position in zip(files.tolist(), (positions - self.offsets[files]).tolist())]
+
+def _column(values) -> 'np.ndarray':
+    return np.frombuffer(values, dtype=values.typecode) if len(values) else np.zeros(0, dtype=values.typecode)
+
+def _concatenate(columns: list['np.ndarray'], dtype) -> 'np.ndarray':
+    if not columns:
+        return np.zeros(0, dtype=dtype)
+    return np.concatenate(columns).astype(dtype, copy=False)
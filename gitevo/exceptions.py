@@ -17,4 +17,35 @@ class BadLOCAggregate(Exception):
     pass
 
 class BadVersionChart(Exception):
+    pass
+
+class BadJobs(Exception):
+    pass
+
+class BadQuery(Exception):
+    pass
+
+class MissingDependency(Exception):
+    pass
+
+class BadMetricReference(Exception):
+    pass
+
+class BadHeavyHitters(Exception):
+    pass
+
+class BadShard(Exception):
+    pass
+
+class BadExecutor(Exception):
+    pass
+
+class BadMemoryCache(Exception):
+    pass
+
+
+class BadAnalysisJob(Exception):
+    pass
+
+class JobQueueFull(Exception):
     pass
\ No newline at end of file
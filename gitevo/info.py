@@ -1,8 +1,24 @@
+import pickle
+import inspect
+import functools
+import hashlib
+import importlib
+import importlib.metadata
+
+from typing import Callable
+
+from tree_sitter import Language
+from treeminer.miners import buildin_miners
+
+from gitevo.parse_cache import grammar_key_for
+from gitevo.exceptions import BadMetricReference
+
+
 class MetricInfo:
     
     def __init__(self, name: str, callback, file_extension: str, categorical: bool,
                  group: str, version_chart_type: str, show_version_chart: bool,
-                 top_n: int):
+                 top_n: int, node_types: list[str] | None = None, heavy_hitters: int | None = None):
         
         self._name = name
         self.callback = callback
@@ -12,6 +28,47 @@ class MetricInfo:
         self.version_chart_type = version_chart_type
         self.show_version_chart = show_version_chart
         self.top_n = top_n
+        self.node_types = node_types if node_types is not None else []
+        self.heavy_hitters = heavy_hitters
+
+    # Callbacks are pickled as references (module:qualname), which workers import again
+    def __getstate__(self):
+        if not self.is_importable:
+            raise pickle.PicklingError(f'metric {self.name} cannot be sent to other processes, '
+                                       f'its callback should be a module-level function')
+        state = self.__dict__.copy()
+        state['callback'] = callback_ref(self.callback)
+        return state
+
+    def __setstate__(self, state):
+        state['callback'] = resolve_ref(state['callback'])
+        self.__dict__.update(state)
+
+    @property
+    def is_importable(self) -> bool:
+        ref = callback_ref(self.callback)
+        if ref is None:
+            return False
+        try:
+            return resolve_ref(ref) is self.callback
+        except BadMetricReference:
+            return False
+
+    @property
+    def fingerprint(self) -> str:
+        # Changes when the code of the callback or of its module (eg, helpers it calls), the options that
+        # affect its values, the grammar of its files, or the GitEvo version change
+        try:
+            code = inspect.getsource(self.callback)
+        except (OSError, TypeError):
+            callback_code = getattr(self.callback, '__code__', None)
+            code = repr((callback_code.co_code, callback_code.co_consts)) if callback_code else repr(self.callback)
+        try:
+            module_code = inspect.getsource(inspect.getmodule(self.callback))
+        except (OSError, TypeError):
+            module_code = ''
+        options = repr((self.name, self.file_extension, self.categorical, _grammar_key(self.file_extension), _gitevo_version()))
+        return hashlib.sha1(f'{options}\n{code}\n{module_code}'.encode('utf-8')).hexdigest()
 
     @property
     def name(self) -> str:
@@ -29,4 +86,78 @@ class MetricInfo:
     def group(self) -> str:
         if self._group is None:
             return self.name
-        return self._group.strip()
\ No newline at end of file
+        return self._group.strip()
+
+class MetricSet:
+
+    """
+    Metrics defined at module level, to be registered in GitEvo later, eg, the built-in reports.
+    Their callbacks are importable functions, so the metrics can be sent to worker processes.
+
+    Example:
+
+        report = MetricSet()
+
+        @report.metric('Lines of code (LOC)')
+        def loc(commit: ParsedCommit):
+            return commit.loc
+
+        evo = GitEvo(repo='https://github.com/pallets/flask', extension='.py')
+        report.register(evo)
+        evo.run()
+    """
+
+    def __init__(self):
+        self.metrics: list[tuple[Callable, dict]] = []
+
+    def metric(self, name: str = None, **options):
+        """
+        Records a metric, with the same options as GitEvo.metric.
+        """
+        def decorator(func):
+            self.metrics.append((func, dict(options, name=name)))
+            return func
+        return decorator
+
+    def register(self, evo):
+        """
+        Registers the metrics in a GitEvo instance.
+        """
+        for func, options in self.metrics:
+            evo.add_metric(func, **options)
+
+@functools.lru_cache
+def _grammar_key(file_extension: str | None) -> str | None:
+    for miner in buildin_miners:
+        if file_extension is not None and file_extension.endswith(miner.extension):
+            return grammar_key_for(Language(miner.tree_sitter_language), miner.extension.lstrip('.'))
+    return None
+
+@functools.lru_cache
+def _gitevo_version() -> str:
+    try:
+        return importlib.metadata.version('gitevo')
+    except importlib.metadata.PackageNotFoundError:
+        return 'dev'
+
+def callback_ref(callback: Callable) -> str | None:
+    # Lambdas and nested functions have no importable reference
+    module = getattr(callback, '__module__', None)
+    qualname = getattr(callback, '__qualname__', None)
+    if module is None or qualname is None or '<' in qualname:
+        return None
+    return f'{module}:{qualname}'
+
+def resolve_ref(ref: str) -> Callable:
+    module_name, separator, qualname = ref.partition(':')
+    if not separator or not module_name or not qualname:
+        raise BadMetricReference(f'metric reference should be module:function, not {ref}')
+    try:
+        callback = importlib.import_module(module_name)
+        for attribute in qualname.split('.'):
+            callback = getattr(callback, attribute)
+    except (ImportError, AttributeError) as e:
+        raise BadMetricReference(f'metric reference {ref} cannot be imported: {e}')
+    if not callable(callback):
+        raise BadMetricReference(f'metric reference {ref} is not callable')
+    return callback
@@ -1,7 +1,15 @@
+import bisect
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 from datetime import date
 
 from gitevo.info import MetricInfo
-from gitevo.utils import aggregate_basic, aggregate_stat, DateUtils
+from gitevo.exceptions import MissingDependency
+from gitevo.utils import DateUtils
 
 class MetricEvolution:
 
@@ -14,6 +22,36 @@ class MetricEvolution:
     def values_as_str(self) -> list[str]:
         return [str(value) for value in self.values]
     
+class EvolutionMatrix:
+
+    """
+    Dense matrix of metric values, with one row per date and one column per metric name.
+    Columns are stored as lists, one per metric, which are shared with the metric evolutions.
+    """
+
+    def __init__(self, dates: list[str], names: list[str], columns: list[list]):
+        self.dates = dates
+        self.names = names
+        self.columns = columns
+
+    def evolutions(self) -> list[MetricEvolution]:
+        return [MetricEvolution(name, self.dates, values) for name, values in zip(self.names, self.columns)]
+
+    def to_numpy(self) -> 'np.ndarray':
+        if np is None:
+            raise MissingDependency('to_numpy requires numpy, install it with: pip install numpy')
+        if not self.columns:
+            return np.zeros((len(self.dates), 0))
+        return np.array(self.columns).T
+
+    def to_pandas(self) -> 'pandas.DataFrame':
+        try:
+            import pandas
+        except ImportError:
+            raise MissingDependency('to_pandas requires pandas, install it with: pip install pandas')
+        index = pandas.Index(self.dates, name='date')
+        return pandas.DataFrame(dict(zip(self.names, self.columns)), index=index, columns=self.names)
+
 class MetricResult:
 
     def __init__(self, name: str, value: int | float, date: date, is_list: bool = False):
@@ -34,48 +72,80 @@ class CommitResult:
 
 class ProjectResult:
 
-    def __init__(self, name: str = ''):
+    def __init__(self, name: str = '', date_unit: str = 'year'):
         self.name = name
+        self.date_unit = date_unit
         self.commit_results: list[CommitResult] = []
+        # Index of the metric results by name, see _index_commit_results
+        self._series: dict[str, MetricSeries] = {}
+        self._indexed_commits = 0
 
     def add_commit_result(self, commit_result: CommitResult):
         self.commit_results.append(commit_result)
 
-    def metric_evolution(self, metric_name: str) -> MetricEvolution:    
-        dates = self.compute_date_steps()
-        values = []
-        
-        metric_results = sorted(self._metric_results(metric_name), key=lambda m: m.date, reverse=True)
-        for date_step in dates:
-            found_date = False
-            for metric_result in metric_results:
-                real_date = date(metric_result.date.year, metric_result.date.month, 1)
-                if date_step >= real_date:
-                    values.append(metric_result.value)
-                    found_date = True
-                    break
-            # Fill the missing metric values, which may happen in categorical metrics
-            if not found_date:
-                values.append(0)
+    def metric_evolution(self, metric_name: str, dates: list[date] | None = None) -> MetricEvolution:
+        if dates is None:
+            dates = self.compute_date_steps()
+        values = self.metric_values(metric_name, dates)
         
         assert len(dates) == len(values), f'{len(dates)} != {len(values)}'
 
-        dates = DateUtils.formatted_dates(dates)
+        dates = DateUtils.formatted_dates(dates, self.date_unit)
         return MetricEvolution(metric_name, dates, values)
+
+    def metric_values(self, metric_name: str, dates: list[date]) -> list:
+        self._index_commit_results()
+        series = self._series.get(metric_name)
+        # Fill the missing metric values, which may happen in categorical metrics
+        if series is None:
+            return [0] * len(dates)
+        return series.values_at(dates)
     
     def compute_date_steps(self) -> list[date]:
         first_commit_date = self.commit_results[0].date
         last_commit_date = self.commit_results[-1].date
         # last_commit_date = date.today()
-        return DateUtils.date_range(first_commit_date, last_commit_date)
+        return DateUtils.date_range(first_commit_date, last_commit_date, self.date_unit)
     
-    def _metric_results(self, metric_name: str) -> list[MetricResult]:
-        metric_results = []
-        for commit_result in self.commit_results:
+    def _index_commit_results(self):
+        # Commit results are indexed once, in a single pass over their metric results
+        for commit_result in self.commit_results[self._indexed_commits:]:
             for metric_result in commit_result.metric_results:
-                if metric_result.name == metric_name:
-                    metric_results.append(metric_result)
-        return metric_results
+                series = self._series.get(metric_result.name)
+                if series is None:
+                    series = self._series[metric_result.name] = MetricSeries()
+                series.add(metric_result.date, metric_result.value)
+        self._indexed_commits = len(self.commit_results)
+
+class MetricSeries:
+
+    """
+    Values of a metric sorted by month, with the value of a date step found by bisection.
+    """
+
+    def __init__(self):
+        self.months: list[date] = []
+        self.values: list = []
+
+    def add(self, result_date: date, value):
+        month = date(result_date.year, result_date.month, 1)
+        # Commits usually arrive in date order, so this is an append
+        position = bisect.bisect_left(self.months, month)
+        # The first value of a month is kept
+        if position < len(self.months) and self.months[position] == month:
+            return
+        self.months.insert(position, month)
+        self.values.insert(position, value)
+
+    def value_at(self, date_step: date):
+        # Latest value on or before the date step, or 0 before the first value
+        position = bisect.bisect_right(self.months, date_step)
+        if position == 0:
+            return 0
+        return self.values[position - 1]
+
+    def values_at(self, date_steps: list[date]) -> list:
+        return [self.value_at(date_step) for date_step in date_steps]
 
 class GitEvoResult:
 
@@ -83,10 +153,21 @@ class GitEvoResult:
         self.report_title = report_title
         self.report_filename = report_filename
         self.registered_metrics = registered_metrics
-        DateUtils.date_unit = date_unit
+        self.date_unit = date_unit
 
         self.project_result = None
         self._metric_data = MetricData()
+        # Built on first use and shared by all exporters, see evolution_matrix
+        self._evolution_matrix = None
+        self._evolution_matrix_key = None
+
+    def __getstate__(self):
+        # Metric callbacks are often closures, which cannot be pickled
+        state = self.__dict__.copy()
+        state['registered_metrics'] = None
+        state['_evolution_matrix'] = None
+        state['_evolution_matrix_key'] = None
+        return state
 
     @property
     def metric_names(self) -> list[str]:
@@ -98,8 +179,16 @@ class GitEvoResult:
     
     @property
     def metric_dates(self) -> list[str]:
-        date_steps = self.project_result.compute_date_steps()
-        return DateUtils.formatted_dates(date_steps)
+        return self.evolution_matrix.dates
+
+    @property
+    def evolution_matrix(self) -> EvolutionMatrix:
+        # Rebuilt only if commits or metric names were added since the last build
+        key = (len(self.project_result.commit_results), len(self._metric_data.names))
+        if self._evolution_matrix is None or self._evolution_matrix_key != key:
+            self._evolution_matrix = self._build_evolution_matrix()
+            self._evolution_matrix_key = key
+        return self._evolution_matrix
     
     @property
     def metric_version_chart_types(self) -> dict[str, str]:
@@ -120,24 +209,39 @@ class GitEvoResult:
         self._metric_data.add_metric_group(name, group)
     
     def metric_evolutions(self) -> list[MetricEvolution]:
-        metric_evolutions = []
-        for metric_name in self._metric_data.names:
-            metric_evo = self.project_result.metric_evolution(metric_name)
-            metric_evolutions.append(metric_evo)
-        return metric_evolutions
+        return self.evolution_matrix.evolutions()
+
+    def to_numpy(self) -> 'np.ndarray':
+        """
+        Metric values as a NumPy array, with one row per date (metric_dates) and one column per metric (metric_names).
+        """
+        return self.evolution_matrix.to_numpy()
+
+    def to_pandas(self) -> 'pandas.DataFrame':
+        """
+        Metric values as a pandas DataFrame, indexed by date and with one column per metric.
+        """
+        return self.evolution_matrix.to_pandas()
+
+    def _build_evolution_matrix(self) -> EvolutionMatrix:
+        date_steps = self.project_result.compute_date_steps()
+        names = self._metric_data.names
+        columns = [self.project_result.metric_values(metric_name, date_steps) for metric_name in names]
+        return EvolutionMatrix(DateUtils.formatted_dates(date_steps, self.project_result.date_unit), names, columns)
 
 class MetricData:
 
     def __init__(self):
-        self._names = []
+        # Names in order of registration, deduplicated as they are added
+        self._names: dict[str, None] = {}
         self.groups_and_names: dict[str, set] = {}
 
     @property
     def names(self) -> list[str]:
-        return list(dict.fromkeys(self._names))
+        return list(self._names)
 
     def add_metric_name(self, name: str):
-        self._names.append(name)
+        self._names[name] = None
 
     def add_metric_group(self, name: str | None, group: str):
         if name is None:
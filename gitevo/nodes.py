@@ -0,0 +1,369 @@
+from array import array
+from collections import namedtuple
+
+from tree_sitter import Tree
+
+"""
+This module contains NodeTable, a compact and picklable representation of a tree-sitter tree,
+and TableNode, a read-only node backed by a NodeTable that mirrors the tree_sitter.Node API
+used by metrics (type, text, children, child_by_field_name, etc).
+"""
+
+Point = namedtuple('Point', ['row', 'column'])
+
+# Node flags
+NAMED, ERROR, MISSING, EXTRA, HAS_ERROR = 1, 2, 4, 8, 16
+
+class NodeTable:
+
+    """
+    Node table of a parsed file: one row per node, in pre-order.
+
+    Columns are stored as arrays: kind (index into types), byte range, start and end points,
+    parent index, number of descendants, field (index into fields, or -1), and flags.
+    """
+
+    def __init__(self, source: bytes, types: list[str], fields: list[str], kinds: array,
+                 start_bytes: array, end_bytes: array, start_rows: array, start_columns: array,
+                 end_rows: array, end_columns: array, parents: array, descendants: array,
+                 field_ids: array, flags: array):
+        self.source = source
+        self.types = types
+        self.fields = fields
+        self.kinds = kinds
+        self.start_bytes = start_bytes
+        self.end_bytes = end_bytes
+        self.start_rows = start_rows
+        self.start_columns = start_columns
+        self.end_rows = end_rows
+        self.end_columns = end_columns
+        self.parents = parents
+        self.descendants = descendants
+        self.field_ids = field_ids
+        self.flags = flags
+        self._field_indexes = {name: index for index, name in enumerate(fields)}
+        self._children: dict[int, list[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_field_indexes']
+        del state['_children']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._field_indexes = {name: index for index, name in enumerate(self.fields)}
+        self._children = {}
+
+    @classmethod
+    def from_tree(cls, tree: Tree, source: bytes) -> 'NodeTable':
+        types, type_indexes = [], {}
+        fields, field_indexes = [], {}
+        kinds, start_bytes, end_bytes = array('I'), array('I'), array('I')
+        start_rows, start_columns, end_rows, end_columns = array('I'), array('I'), array('I'), array('I')
+        parents, field_ids, flags = array('i'), array('i'), array('B')
+
+        # Pre-order traversal, keeping the stack of ancestors to set parents and count descendants
+        ancestors = []
+        cursor = tree.walk()
+        visited_children = False
+        while True:
+            if not visited_children:
+                node = cursor.node
+                index = len(kinds)
+
+                node_type = node.type
+                type_index = type_indexes.get(node_type)
+                if type_index is None:
+                    type_index = type_indexes[node_type] = len(types)
+                    types.append(node_type)
+                kinds.append(type_index)
+
+                field_name = cursor.field_name
+                if field_name is None:
+                    field_ids.append(-1)
+                else:
+                    field_index = field_indexes.get(field_name)
+                    if field_index is None:
+                        field_index = field_indexes[field_name] = len(fields)
+                        fields.append(field_name)
+                    field_ids.append(field_index)
+
+                start_bytes.append(node.start_byte)
+                end_bytes.append(node.end_byte)
+                start_row, start_column = node.start_point
+                end_row, end_column = node.end_point
+                start_rows.append(start_row)
+                start_columns.append(start_column)
+                end_rows.append(end_row)
+                end_columns.append(end_column)
+                parents.append(ancestors[-1] if ancestors else -1)
+                flags.append((NAMED if node.is_named else 0) | (ERROR if node.is_error else 0) |
+                             (MISSING if node.is_missing else 0) | (EXTRA if node.is_extra else 0) |
+                             (HAS_ERROR if node.has_error else 0))
+
+                if cursor.goto_first_child():
+                    ancestors.append(index)
+                else:
+                    visited_children = True
+            elif cursor.goto_next_sibling():
+                visited_children = False
+            elif cursor.goto_parent():
+                ancestors.pop()
+            else:
+                break
+
+        # Nodes are in pre-order, so the descendants of a node are the rows up to the next node that is not below it
+        size = len(kinds)
+        descendants = array('I', [0]) * size
+        for index in range(size - 1, 0, -1):
+            parent = parents[index]
+            descendants[parent] += descendants[index] + 1
+
+        return cls(source, types, fields, kinds, start_bytes, end_bytes, start_rows, start_columns,
+                   end_rows, end_columns, parents, descendants, field_ids, flags)
+
+    def node(self, index: int) -> 'TableNode':
+        return TableNode(self, index)
+
+    def nodes(self) -> list['TableNode']:
+        return [TableNode(self, index) for index in range(len(self.kinds))]
+
+    def type_of(self, index: int) -> str:
+        return self.types[self.kinds[index]]
+
+    def children_of(self, index: int) -> list[int]:
+        children = self._children.get(index)
+        if children is None:
+            children = []
+            descendants = self.descendants
+            child = index + 1
+            end = index + 1 + descendants[index]
+            while child < end:
+                children.append(child)
+                child += descendants[child] + 1
+            self._children[index] = children
+        return children
+
+    def field_index(self, name: str) -> int:
+        return self._field_indexes.get(name, -2)
+
+class TableNode:
+
+    """
+    Read-only tree-sitter node backed by a NodeTable.
+    """
+
+    __slots__ = ('_table', '_index')
+
+    def __init__(self, table: NodeTable, index: int):
+        self._table = table
+        self._index = index
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, TableNode) and self._table is other._table and self._index == other._index
+
+    def __hash__(self) -> int:
+        return hash((id(self._table), self._index))
+
+    def __repr__(self) -> str:
+        return f'<Node type={self.type}, start_point={tuple(self.start_point)}, end_point={tuple(self.end_point)}>'
+
+    @property
+    def id(self) -> tuple[int, int]:
+        # Unique across the tables of a commit, as tree-sitter node ids, while the table is alive
+        return (id(self._table), self._index)
+
+    @property
+    def type(self) -> str:
+        return self._table.types[self._table.kinds[self._index]]
+
+    @property
+    def text(self) -> bytes:
+        return self._table.source[self.start_byte:self.end_byte]
+
+    @property
+    def start_byte(self) -> int:
+        return self._table.start_bytes[self._index]
+
+    @property
+    def end_byte(self) -> int:
+        return self._table.end_bytes[self._index]
+
+    @property
+    def byte_range(self) -> tuple[int, int]:
+        return self.start_byte, self.end_byte
+
+    @property
+    def start_point(self) -> Point:
+        return Point(self._table.start_rows[self._index], self._table.start_columns[self._index])
+
+    @property
+    def end_point(self) -> Point:
+        return Point(self._table.end_rows[self._index], self._table.end_columns[self._index])
+
+    @property
+    def is_named(self) -> bool:
+        return bool(self._table.flags[self._index] & NAMED)
+
+    @property
+    def is_error(self) -> bool:
+        return bool(self._table.flags[self._index] & ERROR)
+
+    @property
+    def is_missing(self) -> bool:
+        return bool(self._table.flags[self._index] & MISSING)
+
+    @property
+    def is_extra(self) -> bool:
+        return bool(self._table.flags[self._index] & EXTRA)
+
+    @property
+    def has_error(self) -> bool:
+        return bool(self._table.flags[self._index] & HAS_ERROR)
+
+    @property
+    def parent(self) -> 'TableNode | None':
+        parent = self._table.parents[self._index]
+        if parent < 0:
+            return None
+        return TableNode(self._table, parent)
+
+    @property
+    def descendant_count(self) -> int:
+        return self._table.descendants[self._index] + 1
+
+    @property
+    def children(self) -> list['TableNode']:
+        return [TableNode(self._table, child) for child in self._table.children_of(self._index)]
+
+    @property
+    def child_count(self) -> int:
+        return len(self._table.children_of(self._index))
+
+    @property
+    def named_children(self) -> list['TableNode']:
+        return [child for child in self.children if child.is_named]
+
+    @property
+    def named_child_count(self) -> int:
+        return len(self.named_children)
+
+    @property
+    def next_sibling(self) -> 'TableNode | None':
+        return self._sibling(1, named=False)
+
+    @property
+    def prev_sibling(self) -> 'TableNode | None':
+        return self._sibling(-1, named=False)
+
+    @property
+    def next_named_sibling(self) -> 'TableNode | None':
+        return self._sibling(1, named=True)
+
+    @property
+    def prev_named_sibling(self) -> 'TableNode | None':
+        return self._sibling(-1, named=True)
+
+    def walk(self) -> 'TableCursor':
+        return TableCursor(self._table, self._index)
+
+    def child(self, index: int) -> 'TableNode | None':
+        children = self._table.children_of(self._index)
+        if 0 <= index < len(children):
+            return TableNode(self._table, children[index])
+        return None
+
+    def named_child(self, index: int) -> 'TableNode | None':
+        named_children = self.named_children
+        if 0 <= index < len(named_children):
+            return named_children[index]
+        return None
+
+    def child_by_field_name(self, name: str) -> 'TableNode | None':
+        field_index = self._table.field_index(name)
+        for child in self._table.children_of(self._index):
+            if self._table.field_ids[child] == field_index:
+                return TableNode(self._table, child)
+        return None
+
+    def children_by_field_name(self, name: str) -> list['TableNode']:
+        field_index = self._table.field_index(name)
+        return [TableNode(self._table, child) for child in self._table.children_of(self._index)
+                if self._table.field_ids[child] == field_index]
+
+    def field_name_for_child(self, index: int) -> str | None:
+        children = self._table.children_of(self._index)
+        if not 0 <= index < len(children):
+            return None
+        field_id = self._table.field_ids[children[index]]
+        if field_id < 0:
+            return None
+        return self._table.fields[field_id]
+
+    def _sibling(self, step: int, named: bool) -> 'TableNode | None':
+        parent = self._table.parents[self._index]
+        if parent < 0:
+            return None
+        siblings = self._table.children_of(parent)
+        position = siblings.index(self._index) + step
+        while 0 <= position < len(siblings):
+            sibling = TableNode(self._table, siblings[position])
+            if not named or sibling.is_named:
+                return sibling
+            position += step
+        return None
+
+class TableCursor:
+
+    """
+    Cursor over a NodeTable, with the tree_sitter.TreeCursor moves used by traversals.
+    As in tree-sitter, the cursor never moves above or beside the node it started from.
+    """
+
+    def __init__(self, table: NodeTable, index: int):
+        self._table = table
+        self._path = [index]
+
+    @property
+    def node(self) -> TableNode:
+        return TableNode(self._table, self._path[-1])
+
+    @property
+    def field_name(self) -> str | None:
+        if len(self._path) == 1:
+            return None
+        field_id = self._table.field_ids[self._path[-1]]
+        if field_id < 0:
+            return None
+        return self._table.fields[field_id]
+
+    @property
+    def depth(self) -> int:
+        return len(self._path) - 1
+
+    def goto_first_child(self) -> bool:
+        index = self._path[-1]
+        if self._table.descendants[index] == 0:
+            return False
+        self._path.append(index + 1)
+        return True
+
+    def goto_next_sibling(self) -> bool:
+        if len(self._path) == 1:
+            return False
+        index, parent = self._path[-1], self._path[-2]
+        sibling = index + self._table.descendants[index] + 1
+        if sibling > parent + self._table.descendants[parent]:
+            return False
+        self._path[-1] = sibling
+        return True
+
+    def goto_parent(self) -> bool:
+        if len(self._path) == 1:
+            return False
+        self._path.pop()
+        return True
@@ -0,0 +1,67 @@
+import os
+import pickle
+import zlib
+
+from tree_sitter import Language
+from treeminer.miners import BaseMiner
+
+from gitevo.nodes import NodeTable
+from gitevo.utils import write_file_atomic
+
+
+class ParseCache:
+
+    """
+    On-disk cache of parsed files, stored as compact node tables keyed by blob SHA plus grammar name and version.
+    Reruns over the same repository only parse the blobs that are not in the cache.
+
+    Args:
+        directory (str): Cache directory, created if it does not exist
+    """
+
+    FORMAT_VERSION = 1
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._grammar_keys: dict[str, str] = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def get(self, sha: str, miner: BaseMiner) -> tuple[NodeTable, int] | None:
+        path = self._path(sha, miner)
+        try:
+            with open(path, 'rb') as file:
+                data = file.read()
+        except FileNotFoundError:
+            return None
+        try:
+            version, table, loc = pickle.loads(zlib.decompress(data))
+        except Exception:
+            # Truncated or corrupted entry, it is parsed again
+            return None
+        if version != self.FORMAT_VERSION:
+            return None
+        return table, loc
+
+    def put(self, sha: str, miner: BaseMiner, table: NodeTable, loc: int):
+        path = self._path(sha, miner)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = zlib.compress(pickle.dumps((self.FORMAT_VERSION, table, loc), protocol=pickle.HIGHEST_PROTOCOL))
+        # Concurrent workers never read a partial entry
+        write_file_atomic(path, data)
+
+    def _path(self, sha: str, miner: BaseMiner) -> str:
+        return os.path.join(self.directory, self._grammar_key(miner), sha[:2], sha[2:])
+
+    def _grammar_key(self, miner: BaseMiner) -> str:
+        grammar_key = self._grammar_keys.get(miner.extension)
+        if grammar_key is None:
+            language = Language(miner.tree_sitter_language)
+            grammar_key = self._grammar_keys[miner.extension] = grammar_key_for(language, miner.extension.lstrip('.'))
+        return grammar_key
+
+def grammar_key_for(language: Language, default_name: str) -> str:
+    # name and semantic_version are only available in recent grammars, the shape of the grammar tells older ones apart
+    name = getattr(language, 'name', None) or default_name
+    semantic_version = getattr(language, 'semantic_version', None)
+    version = '.'.join(str(part) for part in semantic_version) if semantic_version else 'unknown'
+    return f'{name}-{version}-abi{language.abi_version}-{language.node_kind_count}-{language.field_count}'
@@ -0,0 +1,83 @@
+from tree_sitter import Language, Parser, Node, Tree, Query, QueryError
+from treeminer.miners import BaseMiner, buildin_miners
+
+from gitevo.exceptions import BadQuery
+
+
+class CodeParser:
+
+    """
+    Parses source code with the tree-sitter grammar of the file extension.
+    A single tree-sitter parser is created per grammar and reused for every file.
+    """
+
+    def __init__(self, miners: list[BaseMiner] = buildin_miners):
+        self._miners = miners
+        self._parsers: dict[str, Parser] = {}
+
+    def miner_for(self, filename: str) -> BaseMiner | None:
+        for miner in self._miners:
+            if filename.endswith(miner.extension):
+                return miner
+        return None
+
+    def parse(self, source_code: bytes, miner: BaseMiner) -> Tree:
+        parser = self._parsers.get(miner.extension)
+        if parser is None:
+            parser = Parser(Language(miner.tree_sitter_language))
+            self._parsers[miner.extension] = parser
+        return parser.parse(source_code)
+
+def tree_nodes(tree: Tree) -> list[Node]:
+    # Pre-order traversal, as in treeminer
+    nodes = []
+    cursor = tree.walk()
+    visited_children = False
+    while True:
+        if not visited_children:
+            nodes.append(cursor.node)
+            if not cursor.goto_first_child():
+                visited_children = True
+        elif cursor.goto_next_sibling():
+            visited_children = False
+        elif not cursor.goto_parent():
+            break
+    return nodes
+
+def select_nodes(tree: Tree, node_types: frozenset[str]) -> tuple[dict[str, list[int]], dict[str, list[Node]]]:
+    # Pre-order traversal keeping only the nodes of the given types, with their pre-order positions
+    positions, nodes = {}, {}
+    position = 0
+    cursor = tree.walk()
+    visited_children = False
+    while True:
+        if not visited_children:
+            node = cursor.node
+            if node.type in node_types:
+                if node.type in positions:
+                    positions[node.type].append(position)
+                    nodes[node.type].append(node)
+                else:
+                    positions[node.type] = [position]
+                    nodes[node.type] = [node]
+            position += 1
+            if not cursor.goto_first_child():
+                visited_children = True
+        elif cursor.goto_next_sibling():
+            visited_children = False
+        elif not cursor.goto_parent():
+            break
+    return positions, nodes
+
+# Compiled queries, keyed by grammar and pattern, shared by all files and commits of the process
+_queries: dict[tuple[Language, str], Query] = {}
+
+def compile_query(language: Language, pattern: str) -> Query:
+    query = _queries.get((language, pattern))
+    if query is None:
+        try:
+            query = Query(language, pattern)
+        except QueryError as e:
+            raise BadQuery(f'invalid query: {e}')
+        _queries[(language, pattern)] = query
+    return query
@@ -9,9 +9,10 @@ class TableReport:
     
     def __init__(self, result: GitEvoResult):
         self.report_filename = self._ensure_filename(result)
-        self.metric_names = result.metric_names
-        self.metric_dates = result.metric_dates
-        self.evolutions = result.metric_evolutions()
+        matrix = result.evolution_matrix
+        self.metric_names = matrix.names
+        self.metric_dates = matrix.dates
+        self.evolutions = matrix.evolutions()
 
     def export_csv(self):
         data = self.generate_table()
@@ -17,12 +17,13 @@ class HtmlReport:
         self.report_filename = self._ensure_filename(result)
         self.report_title = self._ensure_title(result)
 
-        self.metric_dates = result.metric_dates
+        matrix = result.evolution_matrix
+        self.metric_dates = matrix.dates
         self.metric_groups = result.metric_groups
         self.metric_version_chart_types = result.metric_version_chart_types
         self.metric_show_version_charts = result.metric_show_version_charts
         self.metric_tops_n = result.metric_tops_n
-        self.metric_evolutions = result.metric_evolutions()
+        self.metric_evolutions = matrix.evolutions()
 
     def export_html(self) -> str:
         json_data = self._json_data()
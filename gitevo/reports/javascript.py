@@ -1,54 +1,58 @@
-from gitevo import GitEvo, ParsedCommit
+from gitevo import GitEvo, MetricSet, ParsedCommit
 
 
 extension = '.js'
 
+report = MetricSet()
+
 def metrics(evo: GitEvo):
+    report.register(evo)
+
+
+@report.metric('Lines of code (LOC)', show_version_chart=False)
+def loc(commit: ParsedCommit):
+    return commit.loc
+
+@report.metric('JavaScript files', show_version_chart=False)
+def files(commit: ParsedCommit):
+    return len(commit.parsed_files)
+
+@report.metric('LOC / JavaScript files', show_version_chart=False)
+def loc_per_file(commit: ParsedCommit):
+    parsed_files = len(commit.parsed_files)
+    if parsed_files == 0: return 0
+    return commit.loc / parsed_files
+
+@report.metric('Classes', categorical=True, node_types=['class_declaration'])
+def classes(commit: ParsedCommit):
+    return commit.count_node_types(['class_declaration'])
+
+@report.metric('Variable declarations', categorical=True, node_types=['const', 'let', 'var'])
+def variable_declarations(commit: ParsedCommit):
+    return commit.count_node_types(['const', 'let', 'var'])
+
+@report.metric('Functions', categorical=True, node_types=['function_declaration', 'method_definition', 'generator_function_declaration', 'arrow_function', 'generator_function', 'function_expression'])
+def functions(commit: ParsedCommit):
+    method_nodes = ['function_declaration', 'method_definition', 'generator_function_declaration', 
+                    'arrow_function', 'generator_function', 'function_expression']
+    return commit.count_node_types(method_nodes)
+
+@report.metric('Conditionals', categorical=True, node_types=['if_statement', 'switch_statement', 'ternary_expression'])
+def conditionals(commit: ParsedCommit):
+    return commit.count_node_types(['if_statement', 'switch_statement', 'ternary_expression'])
+
+@report.metric('Loops', categorical=True, node_types=['for_statement', 'while_statement', 'for_in_statement', 'do_statement'])
+def loops(commit: ParsedCommit):
+    return commit.count_node_types(['for_statement', 'while_statement', 'for_in_statement', 'do_statement'])
+
+@report.metric('Exception statements', categorical=True, node_types=['try_statement', 'throw_statement'])
+def expections(commit: ParsedCommit):
+    return commit.count_node_types(['try_statement', 'throw_statement'])
+
+@report.metric('Await expression', categorical=True, show_version_chart=False, node_types=['await_expression'])
+def await_expression(commit: ParsedCommit):
+    return commit.count_node_types(['await_expression'])
 
-    @evo.metric('Lines of code (LOC)', show_version_chart=False)
-    def loc(commit: ParsedCommit):
-        return commit.loc
-
-    @evo.metric('JavaScript files', show_version_chart=False)
-    def files(commit: ParsedCommit):
-        return len(commit.parsed_files)
-    
-    @evo.metric('LOC / JavaScript files', show_version_chart=False)
-    def loc_per_file(commit: ParsedCommit):
-        parsed_files = len(commit.parsed_files)
-        if parsed_files == 0: return 0
-        return commit.loc / parsed_files
-
-    @evo.metric('Classes', categorical=True)
-    def classes(commit: ParsedCommit):
-        return commit.find_node_types(['class_declaration'])
-
-    @evo.metric('Variable declarations', categorical=True)
-    def variable_declarations(commit: ParsedCommit):
-        return commit.find_node_types(['const', 'let', 'var'])
-
-    @evo.metric('Functions', categorical=True)
-    def functions(commit: ParsedCommit):
-        method_nodes = ['function_declaration', 'method_definition', 'generator_function_declaration', 
-                        'arrow_function', 'generator_function', 'function_expression']
-        return commit.find_node_types(method_nodes)
-
-    @evo.metric('Conditionals', categorical=True)
-    def conditionals(commit: ParsedCommit):
-        return commit.find_node_types(['if_statement', 'switch_statement', 'ternary_expression'])
-
-    @evo.metric('Loops', categorical=True)
-    def loops(commit: ParsedCommit):
-        return commit.find_node_types(['for_statement', 'while_statement', 'for_in_statement', 'do_statement'])
-
-    @evo.metric('Exception statements', categorical=True)
-    def expections(commit: ParsedCommit):
-        return commit.find_node_types(['try_statement', 'throw_statement'])
-
-    @evo.metric('Await expression', categorical=True, show_version_chart=False)
-    def await_expression(commit: ParsedCommit):
-        return commit.find_node_types(['await_expression'])
-
-    @evo.metric('Comments', categorical=True, show_version_chart=False)
-    def comments(commit: ParsedCommit):
-        return commit.find_node_types(['comment'])
\ No newline at end of file
+@report.metric('Comments', categorical=True, show_version_chart=False, node_types=['comment'])
+def comments(commit: ParsedCommit):
+    return commit.count_node_types(['comment'])
\ No newline at end of file
@@ -1,96 +1,100 @@
-from gitevo import GitEvo, ParsedCommit
+from gitevo import GitEvo, MetricSet, ParsedCommit
 from gitevo.utils import as_str
 
 
 extension = '.py'
 
-def metrics(evo: GitEvo):
+report = MetricSet()
 
-    @evo.metric('Lines of code (LOC)', show_version_chart=False)
-    def loc(commit: ParsedCommit):
-        return commit.loc
-
-    @evo.metric('Python files', show_version_chart=False)
-    def files(commit: ParsedCommit):
-        return len(commit.parsed_files)
-
-    @evo.metric('LOC / Python files', show_version_chart=False)
-    def loc_per_file(commit: ParsedCommit):
-        parsed_files = len(commit.parsed_files)
-        if parsed_files == 0: return 0
-        return commit.loc / parsed_files
-    
-    @evo.metric('production file', show_version_chart=False, group='Production and test files')
-    def production_files(commit: ParsedCommit):
-        return len([file for file in commit.parsed_files if 'test' not in file.name.lower()])
-    
-    @evo.metric('test file', show_version_chart=False, group='Production and test files')
-    def test_files(commit: ParsedCommit):
-        return len([file for file in commit.parsed_files if 'test' in file.name.lower()])
-    
-    @evo.metric('Data structures', categorical=True)
-    def data_structures(commit: ParsedCommit):
-        return commit.find_node_types(['dictionary', 'list', 'set', 'tuple'])
-    
-    @evo.metric('Functions and classes', categorical=True)
-    def definitions(commit: ParsedCommit):
-        return commit.find_node_types(['class_definition', 'function_definition'])
-
-    @evo.metric('class', group='LOC of functions and classes (mean)')
-    def class_loc(commit: ParsedCommit):
-        return commit.loc_by_type('class_definition', 'mean')
-
-    @evo.metric('function', group='LOC of functions and classes (mean)')
-    def function_loc(commit: ParsedCommit):
-        return commit.loc_by_type('function_definition', 'mean')
-
-    @evo.metric('Functions: def vs. async def', categorical=True)
-    def sync_async(commit: ParsedCommit):
-        function_definitions = commit.find_nodes_by_type(['function_definition'])
-        return ['async def' if as_str(func.child(0).text) == 'async' else 'def' for func in function_definitions]
-
-    @evo.metric('Function parameters', categorical=True, version_chart_type='hbar', top_n=5)
-    def parameter_types(commit: ParsedCommit):
-        function_definitions = commit.find_nodes_by_type(['function_definition'])
-        func_def_parameters = [func.child_by_field_name('parameters') for func in function_definitions if func.child_by_field_name('parameters')]
-        return [named_param.type for parameters in func_def_parameters for named_param in commit.named_children_for(parameters)]
-
-    @evo.metric('Function return type', categorical=True)
-    def return_types(commit: ParsedCommit):
-        function_definitions = commit.find_nodes_by_type(['function_definition'])
-        return ['yes' if func.child_by_field_name('return_type') else 'no' for func in function_definitions]
-
-    @evo.metric('Functions: return vs. yield', categorical=True)
-    def return_yield(commit: ParsedCommit):
-        return commit.find_node_types(['return_statement', 'yield'])
-
-    @evo.metric('@dataclass', show_version_chart=False)
-    def definitions(commit: ParsedCommit):
-        decorated_definitions = commit.find_nodes_by_type(['decorated_definition'])
-        decorated_classes = [decorated_definition for decorated_definition in decorated_definitions if decorated_definition.child_by_field_name('definition').type == 'class_definition']
-        dataclasses = [decorated_class for decorated_class in decorated_classes if as_str(decorated_class.child(0).text).startswith('@dataclass')]
-        return len(dataclasses)
-
-    @evo.metric('Control flows', categorical=True)
-    def control_flow(commit: ParsedCommit):
-        return commit.find_node_types(['for_statement', 'while_statement', 'if_statement', 'try_statement', 'match_statement', 'with_statement'])
-
-    @evo.metric('Conditionals', categorical=True)
-    def conditionals(commit: ParsedCommit):
-        return commit.find_node_types(['if_statement', 'conditional_expression'])
-    
-    @evo.metric('Comprehensions', categorical=True)
-    def comprehensions(commit: ParsedCommit):
-        return commit.find_node_types(['dictionary_comprehension', 'list_comprehension', 'set_comprehension'])
-
-    @evo.metric('Loops', categorical=True)
-    def for_while(commit: ParsedCommit):
-        return commit.find_node_types(['for_statement', 'while_statement', 'for_in_clause'])
-
-    @evo.metric('Exception statements', categorical=True)
-    def exceptions(commit: ParsedCommit):
-        return commit.find_node_types(['try_statement', 'raise_statement'])
-
-    @evo.metric('Import statements', categorical=True)
-    def imports(commit: ParsedCommit):
-        return commit.find_node_types(['import_statement', 'import_from_statement', 'future_import_statement'])
\ No newline at end of file
+def metrics(evo: GitEvo):
+    report.register(evo)
+
+
+@report.metric('Lines of code (LOC)', show_version_chart=False)
+def loc(commit: ParsedCommit):
+    return commit.loc
+
+@report.metric('Python files', show_version_chart=False)
+def files(commit: ParsedCommit):
+    return len(commit.parsed_files)
+
+@report.metric('LOC / Python files', show_version_chart=False)
+def loc_per_file(commit: ParsedCommit):
+    parsed_files = len(commit.parsed_files)
+    if parsed_files == 0: return 0
+    return commit.loc / parsed_files
+
+@report.metric('production file', show_version_chart=False, group='Production and test files')
+def production_files(commit: ParsedCommit):
+    return len([file for file in commit.parsed_files if 'test' not in file.name.lower()])
+
+@report.metric('test file', show_version_chart=False, group='Production and test files')
+def test_files(commit: ParsedCommit):
+    return len([file for file in commit.parsed_files if 'test' in file.name.lower()])
+
+@report.metric('Data structures', categorical=True, node_types=['dictionary', 'list', 'set', 'tuple'])
+def data_structures(commit: ParsedCommit):
+    return commit.count_node_types(['dictionary', 'list', 'set', 'tuple'])
+
+@report.metric('Functions and classes', categorical=True, node_types=['class_definition', 'function_definition'])
+def definitions(commit: ParsedCommit):
+    return commit.count_node_types(['class_definition', 'function_definition'])
+
+@report.metric('class', group='LOC of functions and classes (mean)', node_types=['class_definition'])
+def class_loc(commit: ParsedCommit):
+    return commit.loc_by_type('class_definition', 'mean')
+
+@report.metric('function', group='LOC of functions and classes (mean)', node_types=['function_definition'])
+def function_loc(commit: ParsedCommit):
+    return commit.loc_by_type('function_definition', 'mean')
+
+@report.metric('Functions: def vs. async def', categorical=True, node_types=['function_definition'])
+def sync_async(commit: ParsedCommit):
+    function_definitions = commit.find_nodes_by_type(['function_definition'])
+    return ['async def' if as_str(func.child(0).text) == 'async' else 'def' for func in function_definitions]
+
+@report.metric('Function parameters', categorical=True, version_chart_type='hbar', top_n=5, node_types=['function_definition'])
+def parameter_types(commit: ParsedCommit):
+    function_definitions = commit.find_nodes_by_type(['function_definition'])
+    func_def_parameters = [func.child_by_field_name('parameters') for func in function_definitions if func.child_by_field_name('parameters')]
+    return [named_param.type for parameters in func_def_parameters for named_param in commit.named_children_for(parameters)]
+
+@report.metric('Function return type', categorical=True, node_types=['function_definition'])
+def return_types(commit: ParsedCommit):
+    function_definitions = commit.find_nodes_by_type(['function_definition'])
+    return ['yes' if func.child_by_field_name('return_type') else 'no' for func in function_definitions]
+
+@report.metric('Functions: return vs. yield', categorical=True, node_types=['return_statement', 'yield'])
+def return_yield(commit: ParsedCommit):
+    return commit.count_node_types(['return_statement', 'yield'])
+
+@report.metric('@dataclass', show_version_chart=False, node_types=['decorated_definition'])
+def dataclasses(commit: ParsedCommit):
+    decorated_definitions = commit.find_nodes_by_type(['decorated_definition'])
+    decorated_classes = [decorated_definition for decorated_definition in decorated_definitions if decorated_definition.child_by_field_name('definition').type == 'class_definition']
+    dataclasses = [decorated_class for decorated_class in decorated_classes if as_str(decorated_class.child(0).text).startswith('@dataclass')]
+    return len(dataclasses)
+
+@report.metric('Control flows', categorical=True, node_types=['for_statement', 'while_statement', 'if_statement', 'try_statement', 'match_statement', 'with_statement'])
+def control_flow(commit: ParsedCommit):
+    return commit.count_node_types(['for_statement', 'while_statement', 'if_statement', 'try_statement', 'match_statement', 'with_statement'])
+
+@report.metric('Conditionals', categorical=True, node_types=['if_statement', 'conditional_expression'])
+def conditionals(commit: ParsedCommit):
+    return commit.count_node_types(['if_statement', 'conditional_expression'])
+
+@report.metric('Comprehensions', categorical=True, node_types=['dictionary_comprehension', 'list_comprehension', 'set_comprehension'])
+def comprehensions(commit: ParsedCommit):
+    return commit.count_node_types(['dictionary_comprehension', 'list_comprehension', 'set_comprehension'])
+
+@report.metric('Loops', categorical=True, node_types=['for_statement', 'while_statement', 'for_in_clause'])
+def for_while(commit: ParsedCommit):
+    return commit.count_node_types(['for_statement', 'while_statement', 'for_in_clause'])
+
+@report.metric('Exception statements', categorical=True, node_types=['try_statement', 'raise_statement'])
+def exceptions(commit: ParsedCommit):
+    return commit.count_node_types(['try_statement', 'raise_statement'])
+
+@report.metric('Import statements', categorical=True, node_types=['import_statement', 'import_from_statement', 'future_import_statement'])
+def imports(commit: ParsedCommit):
+    return commit.count_node_types(['import_statement', 'import_from_statement', 'future_import_statement'])
\ No newline at end of file
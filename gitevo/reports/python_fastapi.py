@@ -1,108 +1,114 @@
-from gitevo import GitEvo, ParsedCommit
+from gitevo import GitEvo, MetricSet, ParsedCommit
 
 
 extension = '.py'
+
+IMPORT_NODE_TYPES = ['import_statement', 'import_from_statement', 'future_import_statement']
     
+report = MetricSet()
+
 def metrics(evo: GitEvo):
+    report.register(evo)
 
-    @evo.metric('Number of endpoints', show_version_chart=False)
-    def endpoints(commit: ParsedCommit):
-        fastapi = FastAPICommit(commit)
-        return len(fastapi.endpoints())
 
-    @evo.metric('Endpoints: mean LOC', show_version_chart=False)
-    def mean_parameters(commit: ParsedCommit):
-        fastapi = FastAPICommit(commit)
-        
-        endpoints = fastapi.endpoints()
-        number_of_endpoints = len(endpoints)
-        if number_of_endpoints == 0:
-            return 0
-        
-        sum_loc = sum([endpoint.function.loc for endpoint in endpoints])
-        return round(sum_loc/number_of_endpoints, 2)
-
-    @evo.metric('Endpoints: HTTP methods', categorical=True, top_n=5)
-    def http_method(commit: ParsedCommit):
-        fastapi = FastAPICommit(commit)
-        return [endpoint.decorator.http_method for endpoint in fastapi.endpoints()]
-
-    @evo.metric('Endpoints: sync vs. async', categorical=True)
-    def sync_async(commit: ParsedCommit):
-        fastapi = FastAPICommit(commit)
-        return [endpoint.function.sync_async() for endpoint in fastapi.endpoints()]
-
-    @evo.metric('Endpoints: return type in function?', categorical=True)
-    def has_return_type(commit: ParsedCommit):
-        fastapi = FastAPICommit(commit)
-        return [str(endpoint.function.has_return_type()) for endpoint in fastapi.endpoints()]
-
-    @evo.metric('Endpoints: typed vs. untyped parameters', categorical=True, show_version_chart=False)
-    def typed_untyped(commit: ParsedCommit):
-        fastapi = FastAPICommit(commit)
-        return [typed_untyped for endpoint in fastapi.endpoints() for typed_untyped in endpoint.function.typed_untyped()]
-
-    @evo.metric('Endpoints: default parameters?', categorical=True)
-    def defaults(commit: ParsedCommit):
-        fastapi = FastAPICommit(commit)
-        return [str(has_default) for endpoint in fastapi.endpoints() for has_default in endpoint.function.defaults()]
-
-    @evo.metric('Endpoints: common parameter names', categorical=True, version_chart_type='hbar', top_n=5)
-    def parameter_names(commit: ParsedCommit):
-        fastapi = FastAPICommit(commit)
-        return [param_name for endpoint in fastapi.endpoints() for param_name in endpoint.function.parameter_names()]
-
-    @evo.metric('Endpoints: common parameter types', categorical=True, version_chart_type='hbar', top_n=5)
-    def parameter_types(commit: ParsedCommit):
-        fastapi = FastAPICommit(commit)
-        return [param_type for endpoint in fastapi.endpoints() for param_type in endpoint.function.parameter_types()]
-
-    @evo.metric('Endpoints: mean number of parameters', show_version_chart=False)
-    def mean_parameters(commit: ParsedCommit):
-        fastapi = FastAPICommit(commit)
-
-        endpoints = fastapi.endpoints()
-        number_of_endpoints = len(endpoints)
-        if number_of_endpoints == 0:
-            return 0
-        
-        sum_of_parameters = sum([len(endpoint.function.parameters) for endpoint in endpoints])
-        return round(sum_of_parameters/number_of_endpoints, 2)
-
-    @evo.metric('Security imports', categorical=True, version_chart_type='hbar', top_n=5)
-    def security_imports(commit: ParsedCommit):
-        fastapi = FastAPICommit(commit)
-        return fastapi.security_imports()
-
-    @evo.metric('Response imports', categorical=True, version_chart_type='hbar', show_version_chart=False, top_n=5)
-    def response_imports(commit: ParsedCommit):
-        fastapi = FastAPICommit(commit)
-        return fastapi.response_imports()
-
-    @evo.metric('FastAPI imports', show_version_chart=False)
-    def fastapi_imports(commit: ParsedCommit):
-        fastapi = FastAPICommit(commit)
-        return len(fastapi.fastapi_imports())
-
-    @evo.metric('APIRouter imports', show_version_chart=False)
-    def apirouter_imports(commit: ParsedCommit):
-        fastapi = FastAPICommit(commit)
-        return len(fastapi.apirouter_imports())
-
-    @evo.metric('UploadFile imports', show_version_chart=False)
-    def upload_file_imports(commit: ParsedCommit):
-        fastapi = FastAPICommit(commit)
-        return len(fastapi.upload_file_imports())
-
-    @evo.metric('BackgroundTasks imports', show_version_chart=False)
-    def background_tasks_imports(commit: ParsedCommit):
-        fastapi = FastAPICommit(commit)
-        return len(fastapi.background_tasks_imports())
-
-    @evo.metric('WebSocket imports', show_version_chart=False)
-    def websocket_imports(commit: ParsedCommit):
-        fastapi = FastAPICommit(commit)
-        return len(fastapi.websocket_imports())
+@report.metric('Number of endpoints', show_version_chart=False, node_types=['decorated_definition'])
+def endpoints(commit: ParsedCommit):
+    fastapi = FastAPICommit.of(commit)
+    return len(fastapi.endpoints())
+
+@report.metric('Endpoints: mean LOC', show_version_chart=False, node_types=['decorated_definition'])
+def mean_loc(commit: ParsedCommit):
+    fastapi = FastAPICommit.of(commit)
+    
+    endpoints = fastapi.endpoints()
+    number_of_endpoints = len(endpoints)
+    if number_of_endpoints == 0:
+        return 0
+    
+    sum_loc = sum([endpoint.function.loc for endpoint in endpoints])
+    return round(sum_loc/number_of_endpoints, 2)
+
+@report.metric('Endpoints: HTTP methods', categorical=True, top_n=5, node_types=['decorated_definition'])
+def http_method(commit: ParsedCommit):
+    fastapi = FastAPICommit.of(commit)
+    return [endpoint.decorator.http_method for endpoint in fastapi.endpoints()]
+
+@report.metric('Endpoints: sync vs. async', categorical=True, node_types=['decorated_definition'])
+def sync_async(commit: ParsedCommit):
+    fastapi = FastAPICommit.of(commit)
+    return [endpoint.function.sync_async() for endpoint in fastapi.endpoints()]
+
+@report.metric('Endpoints: return type in function?', categorical=True, node_types=['decorated_definition'])
+def has_return_type(commit: ParsedCommit):
+    fastapi = FastAPICommit.of(commit)
+    return [str(endpoint.function.has_return_type()) for endpoint in fastapi.endpoints()]
+
+@report.metric('Endpoints: typed vs. untyped parameters', categorical=True, show_version_chart=False, node_types=['decorated_definition'])
+def typed_untyped(commit: ParsedCommit):
+    fastapi = FastAPICommit.of(commit)
+    return [typed_untyped for endpoint in fastapi.endpoints() for typed_untyped in endpoint.function.typed_untyped()]
+
+@report.metric('Endpoints: default parameters?', categorical=True, node_types=['decorated_definition'])
+def defaults(commit: ParsedCommit):
+    fastapi = FastAPICommit.of(commit)
+    return [str(has_default) for endpoint in fastapi.endpoints() for has_default in endpoint.function.defaults()]
+
+@report.metric('Endpoints: common parameter names', categorical=True, version_chart_type='hbar', top_n=5, node_types=['decorated_definition'])
+def parameter_names(commit: ParsedCommit):
+    fastapi = FastAPICommit.of(commit)
+    return [param_name for endpoint in fastapi.endpoints() for param_name in endpoint.function.parameter_names()]
+
+@report.metric('Endpoints: common parameter types', categorical=True, version_chart_type='hbar', top_n=5, node_types=['decorated_definition'])
+def parameter_types(commit: ParsedCommit):
+    fastapi = FastAPICommit.of(commit)
+    return [param_type for endpoint in fastapi.endpoints() for param_type in endpoint.function.parameter_types()]
+
+@report.metric('Endpoints: mean number of parameters', show_version_chart=False, node_types=['decorated_definition'])
+def mean_parameters(commit: ParsedCommit):
+    fastapi = FastAPICommit.of(commit)
+
+    endpoints = fastapi.endpoints()
+    number_of_endpoints = len(endpoints)
+    if number_of_endpoints == 0:
+        return 0
+    
+    sum_of_parameters = sum([len(endpoint.function.parameters) for endpoint in endpoints])
+    return round(sum_of_parameters/number_of_endpoints, 2)
+
+@report.metric('Security imports', categorical=True, version_chart_type='hbar', top_n=5, node_types=IMPORT_NODE_TYPES)
+def security_imports(commit: ParsedCommit):
+    fastapi = FastAPICommit.of(commit)
+    return fastapi.security_imports()
+
+@report.metric('Response imports', categorical=True, version_chart_type='hbar', show_version_chart=False, top_n=5, node_types=IMPORT_NODE_TYPES)
+def response_imports(commit: ParsedCommit):
+    fastapi = FastAPICommit.of(commit)
+    return fastapi.response_imports()
+
+@report.metric('FastAPI imports', show_version_chart=False, node_types=IMPORT_NODE_TYPES)
+def fastapi_imports(commit: ParsedCommit):
+    fastapi = FastAPICommit.of(commit)
+    return len(fastapi.fastapi_imports())
+
+@report.metric('APIRouter imports', show_version_chart=False, node_types=IMPORT_NODE_TYPES)
+def apirouter_imports(commit: ParsedCommit):
+    fastapi = FastAPICommit.of(commit)
+    return len(fastapi.apirouter_imports())
+
+@report.metric('UploadFile imports', show_version_chart=False, node_types=IMPORT_NODE_TYPES)
+def upload_file_imports(commit: ParsedCommit):
+    fastapi = FastAPICommit.of(commit)
+    return len(fastapi.upload_file_imports())
+
+@report.metric('BackgroundTasks imports', show_version_chart=False, node_types=IMPORT_NODE_TYPES)
+def background_tasks_imports(commit: ParsedCommit):
+    fastapi = FastAPICommit.of(commit)
+    return len(fastapi.background_tasks_imports())
+
+@report.metric('WebSocket imports', show_version_chart=False, node_types=IMPORT_NODE_TYPES)
+def websocket_imports(commit: ParsedCommit):
+    fastapi = FastAPICommit.of(commit)
+    return len(fastapi.websocket_imports())
     
 
 from tree_sitter import Node
@@ -171,8 +177,20 @@ class FastAPICommit:
     
     def __init__(self, parsed_commit: ParsedCommit):
         self.parsed_commit = parsed_commit
+        self._endpoints = None
+        self._import_names = None
+
+    @classmethod
+    def of(cls, parsed_commit: ParsedCommit) -> 'FastAPICommit':
+        # Shared by all metrics of the commit, so endpoints are found once per date
+        return parsed_commit.memo(cls, cls)
   
     def endpoints(self) -> list[FastAPIEndpoint]:
+        if self._endpoints is None:
+            self._endpoints = self._find_endpoints()
+        return self._endpoints
+
+    def _find_endpoints(self) -> list[FastAPIEndpoint]:
         result = []
         for decorated_definition_node in self.parsed_commit.find_nodes_by_type(['decorated_definition']):
             for node in decorated_definition_node.children:
@@ -293,7 +311,7 @@ class FastAPICommit:
         return EndpointFunction(name, params, return_type, is_async, loc)
     
     def _loc(self, node: Node) -> int:
-        return len(as_str(node.text).split('\n'))
+        return node.end_point[0] - node.start_point[0] + 1
     
     def _is_fastapi_decorator(self, node: Node):
 
@@ -314,14 +332,10 @@ class FastAPICommit:
         return False
     
     def _find_imports(self, import_classes):
-        imports = []
-        for imp in self._imports():
-            for imp_element in imp.children_by_field_name('name'):
-                for import_class in import_classes:
-                    if import_class == as_str(imp_element.text):
-                        imports.append(import_class)
-        return imports
+        if self._import_names is None:
+            # Names of the import nodes, which also come from the node tables of the parse cache
+            self._import_names = [as_str(name.text) for imp in self._imports() for name in imp.children_by_field_name('name')]
+        return [name for name in self._import_names if name in import_classes]
     
     def _imports(self) -> list[Node]:
-        nodes = ['import_statement', 'import_from_statement', 'future_import_statement']
-        return self.parsed_commit.find_nodes_by_type(nodes)
\ No newline at end of file
+        return self.parsed_commit.find_nodes_by_type(IMPORT_NODE_TYPES)
@@ -0,0 +1,260 @@
+import os
+import asyncio
+import shutil
+import subprocess
+import tempfile
+
+from datetime import datetime
+from pathlib import Path
+
+from git import Repo, GitCommandError
+
+"""
+This module contains GitRepository, the access layer between GitEvo and Git.
+It resolves the commits to be analyzed (one per date bucket) without walking
+the whole history through Python objects, and reads file contents straight from
+the Git object database through a persistent git cat-file process.
+"""
+
+class SelectedCommit:
+
+    """
+    Represents the commit selected for a date bucket, ie, the first commit of a year or month.
+    """
+
+    def __init__(self, hash: str, committer_date: datetime, bucket: int | tuple[int, int]):
+        self.hash = hash
+        self.committer_date = committer_date
+        self.bucket = bucket
+
+class GitFile:
+
+    """
+    Represents a file (blob) in the tree of a commit.
+    """
+
+    def __init__(self, path: str, sha: str):
+        self.path = path
+        self.sha = sha
+
+    @property
+    def name(self) -> str:
+        return Path(self.path).name
+
+class BlobReader:
+
+    """
+    Reads blob contents by SHA through a single long-lived git cat-file --batch process,
+    with no working tree checkout and no per-file process.
+    """
+
+    def __init__(self, path: str):
+        self._process = subprocess.Popen(['git', 'cat-file', '--batch'], cwd=path,
+                                         stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+    def read(self, sha: str) -> bytes:
+        self._process.stdin.write(sha.encode() + b'\n')
+        self._process.stdin.flush()
+        header = self._process.stdout.readline().split()
+        if len(header) != 3:
+            raise KeyError(f'blob {sha} not found')
+        size = int(header[2])
+        data = self._process.stdout.read(size)
+        # Skip the trailing newline
+        self._process.stdout.read(1)
+        return data
+
+    def close(self):
+        self._process.stdin.close()
+        self._process.stdout.close()
+        self._process.wait()
+
+class GitRepository:
+
+    """
+    Local Git repository to be analyzed. Remote repositories are cloned into a temporary folder,
+    which is removed on close().
+
+    Args:
+        repo (str): Git repository URL or local path
+    """
+
+    def __init__(self, repo: str):
+        self.repo = repo
+        self._tmp_dir = None
+        self.path = str(Path(self._ensure_local_path(repo)).expanduser().resolve())
+        self._blob_reader = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def name(self) -> str:
+        return Path(self.path).name
+
+    @property
+    def location(self) -> str:
+        # Remote repositories are identified by their URL, as they are cloned into temporary folders
+        if self._tmp_dir is not None:
+            return self.repo
+        return self.path
+
+    @property
+    def remote_url(self) -> str | None:
+        """
+        URL of the remote repository (origin), which identifies the repository across machines.
+        """
+        if self._tmp_dir is not None:
+            url = self.repo
+        else:
+            process = subprocess.run(['git', 'config', '--get', 'remote.origin.url'], cwd=self.path,
+                                     stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+            url = process.stdout.strip()
+        if not url:
+            return None
+        url = url.rstrip('/')
+        return url[:-len('.git')] if url.endswith('.git') else url
+
+    def select_commits(self, from_year: int, to_year: int, date_unit: str) -> list[SelectedCommit]:
+        """
+        Resolves one commit per date bucket (year or month) between from_year and to_year.
+        The first commit of each bucket is selected, following the order of git rev-list --reverse.
+        Returns:
+            list[SelectedCommit]: The selected commits, in date bucket order.
+        """
+        return _select_commits(self._log(_log_since(from_year)), from_year, to_year, date_unit)
+
+    async def select_commits_async(self, from_year: int, to_year: int, date_unit: str) -> list[SelectedCommit]:
+        """
+        Resolves the commits like select_commits, reading git log through an asyncio subprocess.
+        """
+        args = _log_args(_log_since(from_year))
+        process = await asyncio.create_subprocess_exec(*args, cwd=self.path,
+                                                       stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        output, stderr = await process.communicate()
+        if process.returncode != 0 and not self._is_empty():
+            raise GitCommandError(args, process.returncode, stderr.decode())
+        log = (_parse_log_line(line) for line in output.decode().splitlines())
+        return _select_commits(log, from_year, to_year, date_unit)
+
+    @classmethod
+    async def open_async(cls, repo: str) -> 'GitRepository':
+        """
+        Opens a repository like the constructor, cloning remote repositories through an asyncio subprocess.
+        """
+        if not _is_git_remote(repo):
+            return cls(repo)
+        tmp_dir = tempfile.mkdtemp()
+        repo_folder = os.path.join(tmp_dir, _repo_name_from_url(repo))
+        try:
+            process = await asyncio.create_subprocess_exec('git', 'clone', '--quiet', repo, repo_folder, cwd=tmp_dir,
+                                                           stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE)
+            _, stderr = await process.communicate()
+            if process.returncode != 0:
+                raise subprocess.CalledProcessError(process.returncode, ['git', 'clone', repo], stderr=stderr)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        repository = cls(repo_folder)
+        repository.repo = repo
+        repository._tmp_dir = tmp_dir
+        return repository
+
+    def files(self, hash: str) -> list[GitFile]:
+        """
+        Lists the files of a commit, in the same breadth-first order as GitPython tree traversal.
+        Returns:
+            list[GitFile]: The files of the commit.
+        """
+        args = ['git', 'ls-tree', '-r', '-z', hash]
+        output = subprocess.run(args, cwd=self.path, stdout=subprocess.PIPE, check=True).stdout
+        files = []
+        for entry in output.split(b'\0'):
+            if not entry:
+                continue
+            info, path = entry.split(b'\t', 1)
+            _, object_type, sha = info.split()
+            if object_type == b'blob':
+                files.append(GitFile(path.decode('utf-8', 'surrogateescape'), sha.decode()))
+        # git ls-tree lists files depth-first, a stable sort by depth makes it breadth-first
+        return sorted(files, key=lambda file: file.path.count('/'))
+
+    def read_blob(self, sha: str) -> bytes:
+        """
+        Returns the contents of a blob.
+        """
+        if self._blob_reader is None:
+            self._blob_reader = BlobReader(self.path)
+        return self._blob_reader.read(sha)
+
+    def close(self):
+        if self._blob_reader is not None:
+            self._blob_reader.close()
+            self._blob_reader = None
+        if self._tmp_dir is not None:
+            shutil.rmtree(self._tmp_dir, ignore_errors=True)
+            self._tmp_dir = None
+
+    def _log(self, since: str):
+        args = _log_args(since)
+        with subprocess.Popen(args, cwd=self.path, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True) as process:
+            for line in process.stdout:
+                yield _parse_log_line(line)
+            stderr = process.stderr.read()
+        if process.returncode != 0 and not self._is_empty():
+            raise GitCommandError(args, process.returncode, stderr)
+
+    def _is_empty(self) -> bool:
+        # A repository without commits has no HEAD to log, which is not an error
+        process = subprocess.run(['git', 'rev-parse', '--verify', '--quiet', 'HEAD'], cwd=self.path,
+                                 stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        return process.returncode == 1 and not process.stderr
+
+    def _ensure_local_path(self, repo: str) -> str:
+        if not _is_git_remote(repo):
+            return repo
+        self._tmp_dir = tempfile.mkdtemp()
+        repo_folder = os.path.join(self._tmp_dir, _repo_name_from_url(repo))
+        try:
+            Repo.clone_from(url=repo, to_path=repo_folder)
+        except BaseException:
+            # The constructor fails before close() can be called
+            shutil.rmtree(self._tmp_dir, ignore_errors=True)
+            self._tmp_dir = None
+            raise
+        return repo_folder
+
+def _log_since(from_year: int) -> str:
+    # Committer dates are bucketed in the committer's timezone, so the git-side
+    # bound is one day earlier than the first bucket; the exact filter happens in _select_commits
+    return f'{from_year - 1}-12-31'
+
+def _log_args(since: str) -> list[str]:
+    return ['git', 'log', '--reverse', '--format=%H %cI', f'--since={since}', 'HEAD']
+
+def _parse_log_line(line: str) -> tuple[str, datetime]:
+    hash, iso_date = line.split()
+    return hash, datetime.fromisoformat(iso_date)
+
+def _select_commits(log, from_year: int, to_year: int, date_unit: str) -> list[SelectedCommit]:
+    selected_commits = {}
+    for hash, committer_date in log:
+        if committer_date.year < from_year or committer_date.year > to_year:
+            continue
+        bucket = (committer_date.year, committer_date.month) if date_unit == 'month' else committer_date.year
+        if bucket in selected_commits:
+            continue
+        selected_commits[bucket] = SelectedCommit(hash, committer_date, bucket)
+    return list(selected_commits.values())
+
+def _is_git_remote(repo: str) -> bool:
+    return repo.startswith(("git@", "https://", "http://", "git://"))
+
+def _repo_name_from_url(url: str) -> str:
+    name = url.rstrip('/').rsplit('/', 1)[-1]
+    if name.endswith('.git'):
+        return name[:-len('.git')]
+    return name
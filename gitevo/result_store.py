@@ -0,0 +1,81 @@
+import json
+import sqlite3
+
+
+class ResultStore:
+
+    """
+    SQLite store of metric values, keyed by repository, date bucket, commit hash, metric name, and metric fingerprint.
+    Reruns only compute the values that are not in the store, eg, of new dates or of metrics whose code changed.
+
+    Args:
+        path (str): SQLite database file, created if it does not exist
+    """
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS metric_values (
+            repository TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            hash TEXT NOT NULL,
+            metric TEXT NOT NULL,
+            fingerprint TEXT NOT NULL,
+            value TEXT NOT NULL,
+            PRIMARY KEY (repository, bucket, hash, metric, fingerprint)
+        )
+    '''
+
+    def __init__(self, path: str):
+        self.path = path
+        # Repositories analyzed in parallel processes may write to the same store
+        self._connection = sqlite3.connect(path, timeout=60)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute(self.SCHEMA)
+        self._connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self._connection.close()
+
+    def get(self, repository: str, bucket, hash: str, metrics: list[tuple[str, str]]) -> dict[int, int | float | list[tuple[str, int]]]:
+        """
+        Values of the given (metric name, fingerprint) pairs that are in the store, by index in metrics.
+        """
+        rows = self._connection.execute(
+            'SELECT metric, fingerprint, value FROM metric_values WHERE repository = ? AND bucket = ? AND hash = ?',
+            (repository, _bucket_key(bucket), hash))
+        stored = {(metric, fingerprint): value for metric, fingerprint, value in rows}
+
+        values = {}
+        for index, metric in enumerate(metrics):
+            value = stored.get(metric)
+            if value is not None:
+                values[index] = _decode(value)
+        return values
+
+    def put(self, repository: str, bucket, hash: str, values: list[tuple[str, str, int | float | list[tuple[str, int]]]]):
+        """
+        Stores the values of (metric name, fingerprint, value) triples.
+        """
+        with self._connection:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO metric_values VALUES (?, ?, ?, ?, ?, ?)',
+                [(repository, _bucket_key(bucket), hash, metric, fingerprint, json.dumps(value)) for metric, fingerprint, value in values])
+
+def _bucket_key(bucket: int | tuple[int, int]) -> str:
+    # Years are stored as 2024, months as 2024-03
+    if isinstance(bucket, tuple):
+        year, month = bucket
+        return f'{year}-{month:02d}'
+    return str(bucket)
+
+def _decode(value: str) -> int | float | list[tuple[str, int]]:
+    value = json.loads(value)
+    # Categories are stored as JSON arrays of [name, count]
+    if isinstance(value, list):
+        return [(name, count) for name, count in value]
+    return value
@@ -0,0 +1,371 @@
+import os
+import json
+import contextlib
+import uuid
+import queue
+import hashlib
+import threading
+import subprocess
+
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+from gitevo.application import GitEvo, _ParsedFileCache, _USER_ERRORS
+from gitevo.model import GitEvoResult
+from gitevo.report_html import HtmlReport
+from gitevo.report_csv import TableReport
+from gitevo.repository import GitRepository, _is_git_remote, _repo_name_from_url
+from gitevo.reports import report_mappings
+from gitevo.exceptions import BadAnalysisJob, JobQueueFull
+
+"""
+This module contains the GitEvo service (gitevo serve), a local HTTP service that runs analysis jobs.
+Imports and grammars are loaded once, remote repositories are cloned once and fetched by the next jobs,
+and all jobs share a parse cache and a result store, so jobs on repositories already seen only compute the new dates.
+Each repository is opened once, keeping its blob reader and parsed files in memory for the next jobs on it.
+"""
+
+class AnalysisJob:
+
+    """
+    Analysis of a repository, with the same options as the command line.
+    """
+
+    def __init__(self, repo: str, report: str = 'python', from_year: int | None = None, to_year: int | None = None, date_unit: str = 'year'):
+        self.id = uuid.uuid4().hex
+        self.repo = repo
+        self.report = report
+        self.from_year = from_year
+        self.to_year = to_year
+        self.date_unit = date_unit
+        self.status = 'queued'
+        self.error = None
+        self.results: list[dict] = []
+        self.done = threading.Event()
+
+    @classmethod
+    def from_json(cls, data) -> 'AnalysisJob':
+        if not isinstance(data, dict) or not isinstance(data.get('repo'), str) or not data['repo']:
+            raise BadAnalysisJob('job must be a JSON object with a repo')
+        unknown = set(data) - {'repo', 'report', 'from_year', 'to_year', 'date_unit'}
+        if unknown:
+            raise BadAnalysisJob(f'unknown job fields: {sorted(unknown)}')
+        if data.get('report', 'python') not in report_mappings:
+            raise BadAnalysisJob(f'report must be one of {list(report_mappings)}')
+        if data.get('date_unit', 'year') not in ['year', 'month']:
+            raise BadAnalysisJob('date_unit must be year or month')
+        for year in ['from_year', 'to_year']:
+            if data.get(year) is not None and not isinstance(data[year], int):
+                raise BadAnalysisJob(f'{year} must be an integer')
+        return cls(**data)
+
+    def to_json(self) -> dict:
+        return {'id': self.id,
+                'status': self.status,
+                'repo': self.repo,
+                'report': self.report,
+                'from_year': self.from_year,
+                'to_year': self.to_year,
+                'date_unit': self.date_unit,
+                'error': self.error,
+                'results': self.results}
+
+class AnalysisService:
+
+    """
+    Runs analysis jobs in a bounded queue, with at most `workers` jobs running at a time.
+    Remote repositories are cloned into the work directory and fetched again by the next jobs.
+
+    Args:
+        workdir (str): Directory of the clones, parse cache, result store, and reports
+        workers (int): Number of jobs running at a time (default: 1)
+        queue_size (int): Number of jobs waiting to run, new jobs are rejected when the queue is full (default: 16)
+        jobs (int): Number of processes to analyze the dates of each job, spawned as jobs run in threads (default: 1)
+        max_finished (int): Number of finished jobs kept in memory (default: 100)
+        max_repositories (int): Number of repositories kept open with their parsed files, the least recently used are closed (default: 8)
+    """
+
+    def __init__(self, workdir: str, workers: int = 1, queue_size: int = 16, jobs: int = 1, max_finished: int = 100, max_repositories: int = 8):
+        self.workdir = os.path.abspath(workdir)
+        self.jobs = jobs
+        self.max_finished = max_finished
+        self.max_repositories = max_repositories
+        os.makedirs(self.workdir, exist_ok=True)
+
+        self.queue_size = queue_size
+        # The queue is bounded by submit, so that closing always has room for the worker sentinels
+        self._queue: queue.Queue[AnalysisJob | None] = queue.Queue()
+        self._closed = False
+        self._jobs: OrderedDict[str, AnalysisJob] = OrderedDict()
+        self._lock = threading.Lock()
+        # Jobs on the same remote repository share its clone, which is fetched by one job at a time
+        self._clone_locks: dict[str, threading.Lock] = {}
+        # Repositories kept open in least recently used order, see _warm_repository
+        self._repositories: OrderedDict[str, _WarmRepository] = OrderedDict()
+        self._workers = [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, job: AnalysisJob) -> AnalysisJob:
+        """
+        Queues a job.
+
+        Raises:
+            JobQueueFull: If the queue is full, or the service is closed
+        """
+        with self._lock:
+            if self._closed:
+                raise JobQueueFull('service is closed')
+            if self._queue.qsize() >= self.queue_size:
+                raise JobQueueFull(f'job queue is full ({self.queue_size} jobs), try again later')
+            self._queue.put_nowait(job)
+            self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> AnalysisJob | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def all_jobs(self) -> list[AnalysisJob]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize()
+
+    def close(self):
+        """
+        Cancels the queued jobs, and waits for the running ones to finish.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            while True:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                job.status = 'cancelled'
+                job.error = 'service closed before the job started'
+                job.done.set()
+            for _ in self._workers:
+                self._queue.put_nowait(None)
+        for worker in self._workers:
+            worker.join()
+        for warm_repository in self._repositories.values():
+            warm_repository.close()
+        self._repositories.clear()
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            job.status = 'running'
+            try:
+                job.results = self._run(job)
+                job.status = 'done'
+            except Exception as e:
+                job.error = str(e)
+                job.status = 'failed'
+            finally:
+                job.done.set()
+                self._forget_finished()
+
+    def _run(self, job: AnalysisJob) -> list[dict]:
+        report = report_mappings[job.report]
+        evo = GitEvo(repo=self._local_repo(job.repo),
+                     extension=report.extension,
+                     from_year=job.from_year,
+                     to_year=job.to_year,
+                     date_unit=job.date_unit,
+                     export_html=False,
+                     export_csv=False,
+                     jobs=self.jobs,
+                     cache_dir=os.path.join(self.workdir, 'parse-cache'),
+                     result_store=os.path.join(self.workdir, 'results.db'))
+        report.metrics(evo)
+        evo._prepare_registered_metrics()
+
+        # Reports and checkpoints of each job are written to its own folder
+        folder = os.path.join(self.workdir, 'reports', job.id)
+        os.makedirs(folder, exist_ok=True)
+        results = []
+        failed_repos = {}
+        for git_repo in evo.git_repos:
+            try:
+                results.append(self._analyze(evo, job, git_repo, folder))
+            except _USER_ERRORS:
+                raise
+            except Exception as e:
+                failed_repos[git_repo] = str(e)
+        if not results and failed_repos:
+            raise RuntimeError('; '.join(f'{repo}: {error}' for repo, error in failed_repos.items()))
+        return [self._export(result) for result in results]
+
+    def _analyze(self, evo: GitEvo, job: AnalysisJob, git_repo: str, folder: str) -> GitEvoResult:
+        # Jobs on the same repository run one at a time, as they share its blob reader and parsed files
+        with self._warm_repository(git_repo) as warm_repository, warm_repository.lock:
+            repository = warm_repository.repository
+            evo.report_filename = os.path.join(folder, f'report_{repository.name}')
+            selected_commits = repository.select_commits(evo.from_year, evo.to_year, evo.date_unit)
+            return evo._process_commits(repository, selected_commits, warm_repository.parsed_file_cache(job.report, evo))
+
+    def _export(self, result: GitEvoResult) -> dict:
+        matrix = result.evolution_matrix
+        return {'repository': result.project_result.name,
+                'html': HtmlReport(result).export_html(),
+                'csv': TableReport(result).export_csv(),
+                'dates': matrix.dates,
+                'metrics': dict(zip(matrix.names, matrix.columns))}
+
+    def _local_repo(self, repo: str) -> str:
+        if not _is_git_remote(repo):
+            return repo
+        digest = hashlib.sha1(repo.encode()).hexdigest()[:12]
+        path = os.path.join(self.workdir, 'repos', digest, _repo_name_from_url(repo))
+        with self._lock:
+            lock = self._clone_locks.setdefault(repo, threading.Lock())
+        with lock:
+            if os.path.isdir(os.path.join(path, '.git')):
+                # Only HEAD is analyzed, there is no working tree to update
+                _git(['fetch', '--quiet', 'origin'], path)
+                _git(['update-ref', 'HEAD', 'refs/remotes/origin/HEAD'], path)
+            else:
+                _git(['clone', '--quiet', '--no-checkout', repo, path], self.workdir)
+        return path
+
+    @contextlib.contextmanager
+    def _warm_repository(self, git_repo: str):
+        # Repositories evicted while jobs use them are closed when the last of these jobs is done
+        path = os.path.abspath(git_repo)
+        with self._lock:
+            warm_repository = self._repositories.get(path)
+            if warm_repository is None:
+                warm_repository = self._repositories[path] = _WarmRepository(path)
+            self._repositories.move_to_end(path)
+            warm_repository.users += 1
+            evicted = []
+            while len(self._repositories) > self.max_repositories:
+                _, evicted_repository = self._repositories.popitem(last=False)
+                evicted_repository.evicted = True
+                if evicted_repository.users == 0:
+                    evicted.append(evicted_repository)
+        for evicted_repository in evicted:
+            evicted_repository.close()
+
+        try:
+            yield warm_repository
+        finally:
+            with self._lock:
+                warm_repository.users -= 1
+                unused = warm_repository.evicted and warm_repository.users == 0
+            if unused:
+                warm_repository.close()
+
+    def _forget_finished(self):
+        with self._lock:
+            finished = [job_id for job_id, job in self._jobs.items() if job.done.is_set()]
+            for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+                del self._jobs[job_id]
+
+class _WarmRepository:
+
+    # Repository opened once by the service, with the parsed files of each report kept for the next jobs
+
+    def __init__(self, path: str):
+        self.lock = threading.Lock()
+        self.repository = GitRepository(path)
+        # Jobs using the repository, and whether it was evicted from the service, guarded by the service lock
+        self.users = 0
+        self.evicted = False
+        self._parsed_file_caches: dict[str, _ParsedFileCache] = {}
+
+    def close(self):
+        self.repository.close()
+        self._parsed_file_caches.clear()
+
+    def parsed_file_cache(self, report: str, evo: GitEvo) -> _ParsedFileCache:
+        # Reports declare different node types, each one keeps its own parsed files
+        parsed_file_cache = self._parsed_file_caches.get(report)
+        if parsed_file_cache is None:
+            parsed_file_cache = evo._parsed_file_cache(self.repository)
+            self._parsed_file_caches[report] = parsed_file_cache
+        return parsed_file_cache
+
+class _ServiceHandler(BaseHTTPRequestHandler):
+
+    # GET /health, GET /jobs, GET /jobs/<id>, and POST /jobs, which waits for the job with ?wait=<seconds>
+
+    server: '_ServiceServer'
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parts = url.path.strip('/').split('/')
+        service = self.server.service
+        if parts == ['health']:
+            return self._send(200, {'status': 'ok', 'queued': service.queued, 'jobs': len(service.all_jobs())})
+        if parts == ['jobs']:
+            return self._send(200, [job.to_json() for job in service.all_jobs()])
+        if len(parts) == 2 and parts[0] == 'jobs':
+            job = service.get(parts[1])
+            if job is None:
+                return self._send(404, {'error': f'job {parts[1]} not found'})
+            return self._wait_and_send(job, parse_qs(url.query), 200)
+        return self._send(404, {'error': f'{url.path} not found'})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path.strip('/') != 'jobs':
+            return self._send(404, {'error': f'{url.path} not found'})
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            job = AnalysisJob.from_json(json.loads(self.rfile.read(length) or b'null'))
+            self.server.service.submit(job)
+        except (ValueError, BadAnalysisJob) as e:
+            return self._send(400, {'error': str(e)})
+        except JobQueueFull as e:
+            return self._send(503, {'error': str(e)})
+        return self._wait_and_send(job, parse_qs(url.query), 202)
+
+    def _wait_and_send(self, job: AnalysisJob, query: dict, status: int):
+        wait = query.get('wait')
+        if wait:
+            try:
+                job.done.wait(float(wait[0]))
+            except ValueError:
+                return self._send(400, {'error': 'wait must be a number of seconds'})
+        if job.done.is_set():
+            status = 200
+        return self._send(status, job.to_json())
+
+    def _send(self, status: int, data):
+        body = json.dumps(data, default=str).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        print(f'{self.address_string()} - {format % args}')
+
+class _ServiceServer(ThreadingHTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], service: AnalysisService):
+        super().__init__(address, _ServiceHandler)
+        self.service = service
+
+def create_server(service: AnalysisService, host: str = '127.0.0.1', port: int = 8765) -> _ServiceServer:
+    """
+    Creates the HTTP server of a service, to be run with serve_forever(). Port 0 picks a free port.
+    """
+    return _ServiceServer((host, port), service)
+
+def _git(args: list[str], cwd: str):
+    subprocess.run(['git'] + args, cwd=cwd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
@@ -0,0 +1,81 @@
+import pickle
+
+from gitevo.exceptions import BadShard
+from gitevo.utils import write_file_atomic
+
+# Shards split the dates of an analysis across processes or machines, eg, gitevo --shard 2/4.
+# Each shard writes the metric values of its dates to a partial result file, and gitevo merge builds the reports from all of them.
+
+FORMAT_VERSION = 2
+
+# Options of MetricInfo stored in shards, the callbacks are not needed to merge them
+METRIC_OPTIONS = ['file_extension', 'categorical', 'version_chart_type', 'show_version_chart', 'top_n', 'node_types', 'heavy_hitters']
+
+# Settings that must be the same in all the shards of a repository
+SETTINGS = ['metrics', 'date_unit', 'from_year', 'to_year']
+
+def parse_shard(shard: str) -> tuple[int, int]:
+    index, separator, count = str(shard).partition('/')
+    if not separator or not index.strip().isdigit() or not count.strip().isdigit() or not 1 <= int(index) <= int(count):
+        raise BadShard(f'shard must be i/n, with 1 <= i <= n, not {shard}')
+    return int(index), int(count)
+
+def write_shard(path: str, shard: tuple[int, int], repository, gitevo_result, values: list, from_year: int, to_year: int) -> str:
+    metrics = [dict({option: getattr(metric_info, option) for option in METRIC_OPTIONS},
+                    name=metric_info.name, group=metric_info.group) for metric_info in gitevo_result.registered_metrics]
+    data = {'version': FORMAT_VERSION,
+            'shard': shard,
+            'repository': repository.name,
+            # Shards of the same repository are analyzed in clones of other machines, whose paths differ
+            'repository_key': repository.remote_url or repository.name,
+            'from_year': from_year,
+            'to_year': to_year,
+            'date_unit': gitevo_result.date_unit,
+            'report_title': gitevo_result.report_title,
+            'report_filename': gitevo_result.report_filename,
+            'metrics': metrics,
+            'values': values}
+    write_file_atomic(path, pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL))
+    return path
+
+def read_shard(path: str) -> dict:
+    try:
+        with open(path, 'rb') as file:
+            data = pickle.load(file)
+    except FileNotFoundError:
+        raise BadShard(f'{path} does not exist')
+    except Exception:
+        raise BadShard(f'{path} is not a shard result file')
+    if not isinstance(data, dict) or data.get('version') != FORMAT_VERSION:
+        raise BadShard(f'{path} is not a shard result file')
+    return data
+
+def group_shards(shards: list[dict]) -> list[list[dict]]:
+    """
+    Groups the shards by repository, sorted by shard index, checking that all the shards of each repository are present.
+    """
+    groups: dict[str, list[dict]] = {}
+    for shard in shards:
+        groups.setdefault(shard['repository_key'], []).append(shard)
+
+    for repository, group in groups.items():
+        counts = {shard['shard'][1] for shard in group}
+        if len(counts) > 1:
+            raise BadShard(f'shards of {repository} have different counts: {sorted(counts)}')
+        count = counts.pop()
+        indexes = sorted(shard['shard'][0] for shard in group)
+        if indexes != list(range(1, count + 1)):
+            missing = sorted(set(range(1, count + 1)) - set(indexes))
+            duplicated = sorted({index for index in indexes if indexes.count(index) > 1})
+            raise BadShard(f'shards of {repository} should be 1 to {count}, missing: {missing}, duplicated: {duplicated}')
+        for setting in SETTINGS:
+            if any(shard[setting] != group[0][setting] for shard in group):
+                raise BadShard(f'shards of {repository} have different {setting}')
+        group.sort(key=lambda shard: shard['shard'][0])
+
+        # Shards hold contiguous dates of the same history, so their dates increase across shards
+        buckets = [selected_commit.bucket for shard in group for selected_commit, _ in shard['values']]
+        if any(previous >= bucket for previous, bucket in zip(buckets, buckets[1:])):
+            raise BadShard(f'shards of {repository} have overlapping dates, they may come from other histories')
+
+    return list(groups.values())
@@ -0,0 +1,45 @@
+from typing import Callable, Iterator
+
+from tree_sitter import Node
+
+"""
+This module contains iterative, cursor-based traversal helpers for tree-sitter nodes.
+They are generators, so callers can stop at the first match, and never recurse,
+so deep trees do not hit the recursion limit.
+"""
+
+def iter_descendants(node: Node, max_depth: int | None = None) -> Iterator[Node]:
+    """
+    Yields the node and its descendants in pre-order, optionally down to max_depth (the node is at depth 0).
+    """
+    cursor = node.walk()
+    depth = 0
+    while True:
+        yield cursor.node
+        if (max_depth is None or depth < max_depth) and cursor.goto_first_child():
+            depth += 1
+            continue
+        while depth > 0 and not cursor.goto_next_sibling():
+            cursor.goto_parent()
+            depth -= 1
+        if depth == 0:
+            return
+
+def first_descendant(node: Node, predicate: Callable[[Node], bool], max_depth: int | None = None) -> Node | None:
+    """
+    Returns the first node in pre-order (starting at the node itself) that satisfies the predicate.
+    """
+    for descendant in iter_descendants(node, max_depth):
+        if predicate(descendant):
+            return descendant
+    return None
+
+def descendant_by_field_name(node: Node, name: str, max_depth: int | None = None) -> Node | None:
+    """
+    Returns the child with the given field name of the first node in pre-order (starting at the node itself) that has one.
+    """
+    for descendant in iter_descendants(node, max_depth):
+        target_node = descendant.child_by_field_name(name)
+        if target_node is not None:
+            return target_node
+    return None
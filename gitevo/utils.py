@@ -1,11 +1,20 @@
 import sys
+import heapq
 import statistics
 import os
 import os.path as osp
+import tempfile
 
 from datetime import date
+from typing import Iterable
+from collections import OrderedDict
 from gitevo.exceptions import BadGitRepo
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 def is_git_dir(project_path):
     git_path = os.path.join(project_path, '.git')
     return _is_git_dir(git_path)
@@ -49,33 +58,261 @@ def aggregate_basic(values: list[int|float], measure: str) -> int | float:
     return round(sum(values), 1)
 
 def aggregate_stat(values: list[int|float], measure: str) -> int | float:
+    if np is not None and isinstance(values, np.ndarray):
+        return round(_aggregate_array(values, measure), 1)
+    if percentile_of(measure) is not None:
+        return round(Distribution(values).percentile(percentile_of(measure)), 1)
     operation = getattr(statistics, measure)
     result = operation(values)
     return round(result, 1)
 
+def _aggregate_array(values, measure: str) -> int | float:
+    # Vectorized median, mean, and mode of integer arrays, with the same results (and types) as the statistics module
+    if measure == 'median':
+        size = len(values)
+        middle = np.partition(values, [(size - 1) // 2, size // 2])
+        if size % 2 == 1:
+            return middle[size // 2].item()
+        return (middle[size // 2 - 1].item() + middle[size // 2].item()) / 2
+    if measure == 'mean':
+        total, size = int(values.sum()), len(values)
+        return total // size if total % size == 0 else total / size
+    if measure == 'mode':
+        # The first value to appear among the most common ones, as in statistics.mode
+        unique_values, first_positions, counts = np.unique(values, return_index=True, return_counts=True)
+        most_common = np.flatnonzero(counts == counts.max())
+        return unique_values[most_common[np.argmin(first_positions[most_common])]].item()
+    if percentile_of(measure) is not None:
+        return np.percentile(values, percentile_of(measure)).item()
+    return getattr(statistics, measure)(values.tolist())
+
+def percentile_of(measure: str | None) -> int | None:
+    # Percentiles are named p<percent>, eg, p90 or p99
+    if measure and measure[0] == 'p' and measure[1:].isdigit() and int(measure[1:]) <= 100:
+        return int(measure[1:])
+    return None
+
+def write_file_atomic(path: str, data: bytes):
+    # Write and rename, so that readers (eg, concurrent workers) never see a partial file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
 def ensure_file_extension(extension: str | None):
     if extension is None:
         return None
     if not extension.startswith('.'):
         return f'.{extension}'
     return extension
+
+
+class Distribution:
+
+    """
+    Distribution of a stream of numbers, stored as the count of each distinct value.
+    Memory is bounded by the number of distinct values (eg, the distinct LOC of functions), not by the number of values.
+    Median, mean, and mode are exact, with the same results as the statistics module,
+    and percentiles interpolate linearly between the closest ranks.
+    """
+
+    def __init__(self, values: Iterable[int | float] = ()):
+        # Values are kept in order of first occurrence, which breaks ties in mode
+        self.counts: dict[int | float, int] = {}
+        self.size = 0
+        self.total = 0
+        self.update(values)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(self, value: int | float, count: int = 1):
+        self.counts[value] = self.counts.get(value, 0) + count
+        self.size += count
+        self.total += value * count
+
+    def update(self, values: Iterable[int | float]):
+        counts = self.counts
+        size, total = 0, 0
+        for value in values:
+            counts[value] = counts.get(value, 0) + 1
+            size += 1
+            total += value
+        self.size += size
+        self.total += total
+
+    def aggregate(self, measure: str) -> int | float:
+        percent = percentile_of(measure)
+        if percent is not None:
+            return self.percentile(percent)
+        if measure not in ['median', 'mean', 'mode']:
+            raise ValueError(f'unknown aggregate {measure}')
+        return getattr(self, measure)()
+
+    def median(self) -> int | float:
+        middle = self.size // 2
+        if self.size % 2 == 1:
+            return self._values_at(middle)[0]
+        lower, upper = self._values_at(middle - 1)
+        return (lower + upper) / 2
+
+    def mean(self) -> int | float:
+        if isinstance(self.total, int) and self.total % self.size == 0:
+            return self.total // self.size
+        return self.total / self.size
+
+    def mode(self) -> int | float:
+        return max(self.counts, key=self.counts.get)
+
+    def percentile(self, percent: int | float) -> float:
+        # Position of the percentile between ranks, computed as numpy.percentile does
+        position = (self.size - 1) * (percent / 100)
+        rank = int(position)
+        fraction = position - rank
+        lower, upper = self._values_at(rank)
+        # Linear interpolation, as in numpy.percentile
+        if fraction >= 0.5:
+            return float(upper - (upper - lower) * (1 - fraction))
+        return float(lower + (upper - lower) * fraction)
+
+    def _values_at(self, rank: int) -> tuple[int | float, int | float]:
+        # Values at rank and rank + 1 (or rank, at the end) in sorted order
+        if not self.size:
+            raise statistics.StatisticsError('no values')
+        seen = 0
+        lower = None
+        for value in sorted(self.counts):
+            seen += self.counts[value]
+            if lower is None and seen > rank:
+                lower = value
+            if seen > rank + 1:
+                return lower, value
+        return lower, lower if lower is not None else value
+
+class SpaceSaving:
+
+    """
+    Space-Saving sketch of the most frequent items of a weighted stream, with at most capacity counters.
+    The count of an item is overestimated by at most its error, and any item
+    whose frequency is greater than total / capacity is monitored.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.counts: dict = {}
+        self.errors: dict = {}
+        self.total = 0
+        # Min-heap of (count, order, item), with stale entries skipped on pop
+        self._heap: list = []
+        self._order = 0
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def __contains__(self, item) -> bool:
+        return item in self.counts
+
+    def add(self, item, weight: int = 1):
+        assert weight > 0
+        self.total += weight
+        if item in self.counts:
+            self.counts[item] += weight
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = weight
+            self.errors[item] = 0
+        else:
+            # The item with the smallest count is replaced, and its count becomes the error of the new item
+            evicted, minimum = self._pop_min()
+            del self.counts[evicted]
+            del self.errors[evicted]
+            self.counts[item] = minimum + weight
+            self.errors[item] = minimum
+        self._push(item)
+
+    def top(self, n: int) -> list:
+        """
+        Items that may be among the n most frequent ones, from the most to the least frequent.
+        """
+        items = sorted(self.counts, key=self.counts.get, reverse=True)
+        if len(items) <= n:
+            return items
+        # An item may be in the top n if its count reaches the n-th largest guaranteed count
+        threshold = sorted((self.counts[item] - self.errors[item] for item in items), reverse=True)[n - 1]
+        return [item for item in items if self.counts[item] >= threshold]
+
+    def _push(self, item):
+        self._order += 1
+        heapq.heappush(self._heap, (self.counts[item], self._order, item))
+        # Keep the heap bounded, dropping the stale entries
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(count, order, item) for count, order, item in self._heap if self.counts.get(item) == count]
+            heapq.heapify(self._heap)
+
+    def _pop_min(self) -> tuple:
+        while True:
+            count, _, item = heapq.heappop(self._heap)
+            # Counts only grow, so an entry is current only if it has the current count
+            if self.counts.get(item) == count:
+                return item, count
+
+class LRUCache:
+
+    """
+    Least recently used cache bounded by the total weight of its values.
+    """
+
+    def __init__(self, max_weight: int):
+        self.max_weight = max_weight
+        self.weight = 0
+        self._items: OrderedDict = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key, default=None):
+        item = self._items.get(key)
+        if item is None:
+            return default
+        self._items.move_to_end(key)
+        return item[0]
+
+    def pop(self, key, default=None):
+        item = self._items.pop(key, None)
+        if item is None:
+            return default
+        self.weight -= item[1]
+        return item[0]
+
+    def put(self, key, value, weight: int = 1):
+        if key in self._items:
+            self.weight -= self._items.pop(key)[1]
+        self._items[key] = (value, weight)
+        self.weight += weight
+        while self.weight > self.max_weight and len(self._items) > 1:
+            _, (_, evicted_weight) = self._items.popitem(last=False)
+            self.weight -= evicted_weight
     
 
 class DateUtils:
 
-    date_unit: str = 'year'
-    
+    # The date unit is passed by each result, so analyses with other units can run at the same time
+
     @staticmethod
-    def date_range(start_date: date, end_date: date) -> list[date]:
+    def date_range(start_date: date, end_date: date, date_unit: str = 'year') -> list[date]:
         assert end_date >= start_date
-        if DateUtils.date_unit == 'month':
+        if date_unit == 'month':
             return DateUtils._generate_months(start_date, end_date)
         # Default is year
         return DateUtils._generate_years(start_date, end_date)
 
     @staticmethod
-    def formatted_dates(dates: list[date]) -> list[str]:
-        if DateUtils.date_unit == 'month':
+    def formatted_dates(dates: list[date], date_unit: str = 'year') -> list[str]:
+        if date_unit == 'month':
             return [each.strftime('%m/%Y') for each in dates]
         # Default is year
         return [each.strftime('%Y') for each in dates]
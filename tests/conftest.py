@@ -27,6 +27,9 @@ def remove_report_if_exists():
     remove_file_if_exists('report_library.html')
     remove_file_if_exists('report_testrepo.csv')
     remove_file_if_exists('report_library.csv')
+    remove_file_if_exists('report_testrepo.checkpoint')
+    for index in (1, 2):
+        remove_file_if_exists(f'report_testrepo.shard-{index}-of-2.pickle')
 
 def remove_folder_if_exists(folder_name):
     if os.path.exists(folder_name):
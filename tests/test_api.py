@@ -1,10 +1,51 @@
 import pytest
 import os
+import asyncio
+import contextlib
+import multiprocessing
 
 from datetime import date
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from git import Repo
 from gitevo import GitEvo, ParsedCommit
-from gitevo.exceptions import BadReturnType, BadLOCAggregate, FileExtensionNotFound
+from gitevo.application import merge_shards, _ParsedCommitCache, _ParsedFileCache
+from gitevo.repository import GitRepository
+from gitevo.reports import python
+from gitevo.exceptions import BadReturnType, BadLOCAggregate, BadHeavyHitters, FileExtensionNotFound, BadExecutor
+
+
+def evo_with_metrics(repo: str, calls: list | None = None, fail_year: int | None = None, only_for_loops: bool = False,
+                     top_n: int | None = None, heavy_hitters: int | None = None, **options) -> GitEvo:
+    # Python files and loops by month, the computed metrics are appended to calls
+    calls = [] if calls is None else calls
+    evo = GitEvo(repo=repo, extension='.py', date_unit='month', **{'export_html': False, 'export_csv': False, **options})
+
+    @evo.metric('Python files')
+    def files(commit: ParsedCommit):
+        calls.append('files')
+        if commit.date.year == fail_year:
+            raise RuntimeError('crash')
+        return len(commit.parsed_files)
 
+    if only_for_loops:
+        @evo.metric('Loops', categorical=True, top_n=top_n, heavy_hitters=heavy_hitters)
+        def loops(commit: ParsedCommit):
+            calls.append('loops')
+            return commit.count_node_types(['for_statement'])
+    else:
+        @evo.metric('Loops', categorical=True, top_n=top_n, heavy_hitters=heavy_hitters)
+        def loops(commit: ParsedCommit):
+            calls.append('loops')
+            return commit.count_node_types(['for_statement', 'while_statement'])
+
+    return evo
+
+def assert_same_result(result, expected):
+    assert [commit.hash for commit in result.project_result.commit_results] == [commit.hash for commit in expected.project_result.commit_results]
+    assert result.metric_names == expected.metric_names
+    assert result.metric_dates == expected.metric_dates
+    assert [evolution.values for evolution in result.metric_evolutions()] == [evolution.values for evolution in expected.metric_evolutions()]
 
 def test_register_single_metric(local_repo):
 
@@ -232,6 +273,29 @@ def test_categorical_metric(local_repo):
     assert evolutions[1].values == [2, 2, 2, 2, 2, 2]
     assert evolutions[2].values == [1, 1, 1, 1, 1, 1]
 
+def test_categorical_counter_metric(local_repo):
+
+    evo = GitEvo(repo=local_repo, extension='.py')
+
+    @evo.metric('m1', categorical=True)
+    def m1(commit: ParsedCommit):
+        return Counter({'c': 1, 'a': 3, 'b': 2})
+
+    @evo.metric('m2', categorical=True)
+    def m2(commit: ParsedCommit):
+        return {'d': 4}
+    
+    result = evo.run()
+    result = result[0]
+    evolutions = result.metric_evolutions()
+
+    assert len(evolutions) == 4
+    assert evolutions[0].name == 'a'
+    assert evolutions[0].values == [3, 3, 3, 3, 3, 3]
+    assert evolutions[1].values == [2, 2, 2, 2, 2, 2]
+    assert evolutions[2].values == [1, 1, 1, 1, 1, 1]
+    assert evolutions[3].values == [4, 4, 4, 4, 4, 4]
+
 def test_empty_categorical_metric(local_repo):
 
     evo = GitEvo(repo=local_repo, extension='.py')
@@ -403,6 +467,25 @@ def test_loc_by_type(local_repo):
     assert evolutions[0].values[0:6] == [0, 2, 2, 2, 2.5, 2.5]
     assert evolutions[1].values[0:6] == [0, 2, 2, 2, 2, 2]
 
+def test_loc_by_type_percentiles(local_repo):
+
+    evo = GitEvo(repo=local_repo, extension='.py', date_unit='month')
+
+    @evo.metric('m1')
+    def m1(commit: ParsedCommit):
+        return commit.loc_by_type('function_definition', 'p50')
+    
+    @evo.metric('m2')
+    def m2(commit: ParsedCommit):
+        return commit.loc_by_type('function_definition', 'p99')
+    
+    result = evo.run()
+    result = result[0]
+    evolutions = result.metric_evolutions()
+
+    assert evolutions[0].values[0:6] == [0, 2, 2, 2, 2, 2]
+    assert all(p99 >= p50 for p50, p99 in zip(evolutions[0].values, evolutions[1].values))
+
 def test_invalid_loc_by_type(local_repo):
 
     evo = GitEvo(repo=local_repo, extension='.py')
@@ -414,6 +497,41 @@ def test_invalid_loc_by_type(local_repo):
     with pytest.raises(BadLOCAggregate):
         evo.run()
 
+def test_heavy_hitters(local_repo):
+
+    def identifiers(commit: ParsedCommit):
+        return [node.text.decode() for node in commit.find_nodes_by_type('identifier')]
+
+    evo = GitEvo(repo=local_repo, extension='.py', date_unit='month')
+    evo.metric('Identifiers', categorical=True, top_n=2)(identifiers)
+    all_categories = evo.run()[0]
+
+    evo = GitEvo(repo=local_repo, extension='.py', date_unit='month')
+    evo.metric('Identifiers', categorical=True, top_n=2, heavy_hitters=100)(identifiers)
+    heavy_hitters = evo.run()[0]
+
+    # Only the categories that may reach the top 2 are kept, the others are in 'Identifiers: other'
+    assert 'Identifiers: other' in heavy_hitters.metric_names
+    assert len(heavy_hitters.metric_names) < len(all_categories.metric_names)
+    assert heavy_hitters.metric_groups['Identifiers'] == set(heavy_hitters.metric_names)
+
+    evolutions = {evolution.name: evolution.values for evolution in all_categories.metric_evolutions()}
+    for evolution in heavy_hitters.metric_evolutions():
+        if evolution.name != 'Identifiers: other':
+            assert evolution.values == evolutions[evolution.name]
+
+def test_invalid_heavy_hitters(local_repo):
+
+    evo = GitEvo(repo=local_repo, extension='.py')
+
+    @evo.metric('m1', categorical=True, heavy_hitters=10)
+    def m1(commit: ParsedCommit):
+        return ['a']
+    
+    with pytest.raises(BadHeavyHitters) as e:
+        evo.run()
+    assert str(e.value) == 'heavy_hitters in m1 requires a categorical metric with top_n'
+
 def test_count_nodes_all(local_repo):
 
     evo = GitEvo(repo=local_repo, extension='.py', date_unit='month')
@@ -480,6 +598,246 @@ def test_find_node_types_all(local_repo):
 
     assert len(evolutions) > 20
 
+def test_count_node_types(local_repo):
+
+    evo = GitEvo(repo=local_repo, extension='.py', date_unit='month')
+    
+    @evo.metric('all types', categorical=True)
+    def all_types(commit: ParsedCommit):
+        node_types = commit.count_node_types()
+        assert node_types == Counter(commit.find_node_types())
+        assert list(node_types) == list(Counter(commit.find_node_types()))
+        return node_types
+    
+    @evo.metric('functions and and classes', categorical=True)
+    def functions_and_classes(commit: ParsedCommit):
+        return commit.count_node_types(['function_definition', 'class_definition'])
+
+    result = evo.run()
+    result = result[0]
+    evolutions = result.metric_evolutions()
+
+    assert len(evolutions) > 20
+
+def test_declared_node_types(local_repo):
+
+    evo = GitEvo(repo=local_repo, extension='.py', date_unit='month')
+
+    @evo.metric('functions and and classes', categorical=True, node_types=['function_definition', 'class_definition'])
+    def functions_and_classes(commit: ParsedCommit):
+        return commit.count_node_types(['function_definition', 'class_definition'])
+
+    @evo.metric('function LOC', node_types='function_definition')
+    def function_loc(commit: ParsedCommit):
+        return commit.loc_by_type('function_definition', 'median')
+    
+    @evo.metric('undeclared functions')
+    def undeclared_functions(commit: ParsedCommit):
+        return len(commit.find_nodes_by_type('function_definition'))
+    
+    result = evo.run()
+    result = result[0]
+    evolutions = result.metric_evolutions()
+
+    assert evo.registered_metrics[1].node_types == ['function_definition']
+    assert evolutions[2].name == 'function LOC'
+    assert evolutions[2].values[0:6] == [0, 2, 2, 2, 2, 2]
+    assert evolutions[3].values == evolutions[0].values
+
+def test_memo(local_repo):
+
+    evo = GitEvo(repo=local_repo, extension='.py', date_unit='month')
+    calls = []
+
+    def functions(commit: ParsedCommit):
+        calls.append(commit.hash)
+        return commit.find_nodes_by_type('function_definition')
+
+    @evo.metric('functions')
+    def m1(commit: ParsedCommit):
+        return len(commit.memo('functions', functions))
+    
+    @evo.metric('function lines')
+    def m2(commit: ParsedCommit):
+        return sum(node.end_point[0] - node.start_point[0] + 1 for node in commit.memo('functions', functions))
+    
+    result = evo.run()
+    result = result[0]
+
+    # Computed once per date, shared by both metrics
+    assert len(calls) == len(result.project_result.commit_results)
+    assert len(set(calls)) == len(calls)
+
+def test_add_metric_reference(local_repo):
+
+    evo = GitEvo(repo=local_repo, extension='.py', date_unit='month')
+    evo.add_metric('gitevo.reports.python:files', 'Python files')
+
+    result = evo.run()
+    result = result[0]
+
+    assert result.registered_metrics[0].name == 'Python files'
+    assert result.registered_metrics[0].callback == python.files
+    commit_result = result.project_result.commit_results[0]
+    assert commit_result.metric_results[0].value > 0
+
+def test_spawn_jobs(local_repo, monkeypatch):
+
+    def metrics(evo: GitEvo):
+        python.metrics(evo)
+        return evo.run()[0]
+
+    forked = metrics(GitEvo(repo=local_repo, extension='.py', date_unit='month', jobs=2))
+    # Workers are spawned when fork is not available, they import the metrics by reference
+    monkeypatch.setattr(multiprocessing, 'get_all_start_methods', lambda: ['spawn'])
+    spawned = metrics(GitEvo(repo=local_repo, extension='.py', date_unit='month', jobs=2))
+
+    assert_same_result(spawned, forked)
+
+def test_resume(local_repo, clear_reports):
+
+    expected = evo_with_metrics(local_repo).run()[0]
+    dates = len(expected.project_result.commit_results)
+    last_year = expected.project_result.commit_results[-1].date.year
+
+    # Without resume, no checkpoint is saved
+    evo = evo_with_metrics(local_repo, fail_year=last_year)
+    assert evo.run() == []
+    assert not os.path.exists('report_testrepo.checkpoint')
+
+    # The analysis fails in its last year, after the checkpoint of the previous dates is saved
+    calls = []
+    evo = evo_with_metrics(local_repo, calls, fail_year=last_year, resume=True)
+    assert evo.run() == []
+    assert os.path.exists('report_testrepo.checkpoint')
+    finished = calls.count('files') - 1
+
+    calls = []
+    result = evo_with_metrics(local_repo, calls, resume=True).run()[0]
+
+    assert calls.count('files') == dates - finished
+    assert_same_result(result, expected)
+    assert not os.path.exists('report_testrepo.checkpoint')
+
+def test_result_store(local_repo, tmp_path):
+
+    store = os.path.join(tmp_path, 'results.db')
+
+    calls = []
+    expected = evo_with_metrics(local_repo, calls, result_store=store).run()[0]
+    dates = len(expected.project_result.commit_results)
+    assert calls.count('files') == dates
+
+    # Stored values are not computed again
+    calls = []
+    result = evo_with_metrics(local_repo, calls, result_store=store).run()[0]
+    assert calls == []
+    assert_same_result(result, expected)
+
+    # Only the metric whose code changed is computed again
+    calls = []
+    evo_with_metrics(local_repo, calls, only_for_loops=True, result_store=store).run()
+    assert calls == ['loops'] * dates
+
+def test_shard_and_merge(local_repo, clear_reports):
+
+    expected = evo_with_metrics(local_repo, top_n=1, heavy_hitters=2).run()[0]
+
+    paths = []
+    for shard in ['2/2', '1/2']:
+        evo_with_metrics(local_repo, top_n=1, heavy_hitters=2, shard=shard).run()
+        paths.append(f'report_testrepo.shard-{shard[0]}-of-2.pickle')
+        assert os.path.exists(paths[-1])
+
+    result = merge_shards(paths, export_html=False, export_csv=False)[0]
+
+    assert_same_result(result, expected)
+
+def test_run_async(local_repo, clear_reports):
+
+    expected = evo_with_metrics(local_repo).run()[0]
+    result = asyncio.run(evo_with_metrics(local_repo).run_async())[0]
+
+    assert_same_result(result, expected)
+
+def test_iter_results_async(local_repo, clear_reports):
+
+    evo = GitEvo(repo=local_repo, extension='.py', export_html=False, export_csv=False)
+
+    @evo.metric('LOC')
+    def loc(commit: ParsedCommit):
+        return commit.loc
+
+    async def names():
+        return [result.project_result.name async for result in evo.iter_results_async()]
+
+    assert asyncio.run(names()) == ['testrepo']
+
+def test_iter_results_async_stop(local_repo, tmp_path, monkeypatch):
+
+    for name in ['a', 'b']:
+        Repo.clone_from(local_repo, tmp_path / name).close()
+    evo = GitEvo(repo=str(tmp_path), extension='.py', date_unit='month', repo_jobs=2, export_html=False, export_csv=False)
+
+    @evo.metric('LOC')
+    def loc(commit: ParsedCommit):
+        return commit.loc
+
+    closed, reads_after_close = [], []
+    close, read_blob = GitRepository.close, GitRepository.read_blob
+    monkeypatch.setattr(GitRepository, 'close', lambda self: closed.append(self.path) or close(self))
+    monkeypatch.setattr(GitRepository, 'read_blob', lambda self, sha: (self.path in closed and reads_after_close.append(sha)) or read_blob(self, sha))
+
+    async def first_result():
+        async with contextlib.aclosing(evo.iter_results_async()) as results:
+            async for result in results:
+                return result
+
+    # The repository still being analyzed is closed after its analysis is done
+    assert asyncio.run(first_result()) is not None
+    assert sorted(closed) == [str(tmp_path / 'a'), str(tmp_path / 'b')]
+    assert reads_after_close == []
+
+def test_run_async_user_error(local_repo, clear_reports):
+
+    evo = GitEvo(repo=local_repo, extension='.py', export_html=False, export_csv=False)
+
+    @evo.metric('Bad metric')
+    def bad_metric(commit: ParsedCommit):
+        return 'bad'
+
+    with pytest.raises(BadReturnType):
+        asyncio.run(evo.run_async())
+
+def test_run_async_process_executor(local_repo, clear_reports):
+
+    evo = GitEvo(repo=local_repo, extension='.py', export_html=False, export_csv=False)
+
+    @evo.metric('LOC')
+    def loc(commit: ParsedCommit):
+        return commit.loc
+
+    with ProcessPoolExecutor(1) as executor:
+        with pytest.raises(BadExecutor):
+            asyncio.run(evo.run_async(executor))
+
+def test_run_async_jobs(local_repo, clear_reports, monkeypatch):
+
+    def metrics(evo: GitEvo):
+        python.metrics(evo)
+        return evo
+
+    expected = metrics(GitEvo(repo=local_repo, extension='.py', date_unit='month', export_html=False, export_csv=False)).run()[0]
+    # The dates are parsed in processes started from the executor threads, which are spawned rather than forked
+    contexts = []
+    get_context = multiprocessing.get_context
+    monkeypatch.setattr(multiprocessing, 'get_context', lambda method=None: contexts.append(method) or get_context(method))
+    evo = metrics(GitEvo(repo=local_repo, extension='.py', date_unit='month', export_html=False, export_csv=False, jobs=2))
+    result = asyncio.run(evo.run_async())[0]
+
+    assert contexts == ['spawn']
+    assert_same_result(result, expected)
+
 def test_export_html(local_repo, clear_reports):
     evo = GitEvo(repo=local_repo, extension='.py', date_unit='month', export_html=True, export_csv=False)
 
@@ -539,6 +897,47 @@ def test_export_html_and_csv_with_report_custom(local_repo):
     remove_file_if_exists(html_filename)
     remove_file_if_exists(csv_filename)
 
+def test_parallel_jobs(local_repo):
+
+    result = evo_with_metrics(local_repo).run()[0]
+    parallel_result = evo_with_metrics(local_repo, jobs=4).run()[0]
+
+    assert_same_result(parallel_result, result)
+
+def test_parsed_files_of_previous_date(local_repo):
+
+    with GitRepository(local_repo) as repository:
+        # Without room for older dates, the files of the previous date are still reused
+        parsed_file_cache = _ParsedFileCache(repository, max_source_bytes=0)
+        selected_commits = repository.select_commits(2020, 2025, 'month')
+        parsed_commits = [_ParsedCommitCache(selected_commit, ['.py'], parsed_file_cache).get_parsed_commit_for('.py')
+                          for selected_commit in selected_commits]
+
+    for previous, current in zip(parsed_commits, parsed_commits[1:]):
+        previous_files = {id(parsed_file) for parsed_file in previous.parsed_files}
+        reused = [parsed_file for parsed_file in current.parsed_files if id(parsed_file) in previous_files]
+        assert len(reused) > 0
+    assert len(parsed_file_cache) >= len(parsed_commits[-1].parsed_files)
+
+def test_lazy_parsing(local_repo):
+
+    evo = GitEvo(repo=local_repo, extension='.py')
+
+    @evo.metric('LOC')
+    def loc(commit: ParsedCommit):
+        return commit.loc
+
+    @evo.metric('Parsed files')
+    def parsed_files(commit: ParsedCommit):
+        return len([file for file in commit.parsed_files if file.is_parsed])
+
+    result = evo.run()
+    result = result[0]
+    evolutions = result.metric_evolutions()
+
+    assert evolutions[0].values[-1] > 0
+    assert evolutions[1].values == [0, 0, 0, 0, 0, 0]
+
 def report_exists(report_name):
     return os.path.exists(report_name)
 
@@ -0,0 +1,37 @@
+import os
+
+from gitevo.checkpoint import Checkpoint
+
+
+def test_checkpoint(tmp_path):
+
+    path = os.path.join(tmp_path, 'report.checkpoint')
+    checkpoint = Checkpoint(path, ('repo', 'year'), interval=3600)
+
+    assert checkpoint.load() is None
+
+    # Saved at most once per interval, unless forced
+    assert not checkpoint.save({'finished': {2020: 'abc'}})
+    assert checkpoint.load() is None
+    assert checkpoint.save({'finished': {2020: 'abc'}}, force=True)
+    assert checkpoint.load() == {'finished': {2020: 'abc'}}
+
+    checkpoint.remove()
+    assert not os.path.exists(path)
+    checkpoint.remove()
+
+def test_checkpoint_other_settings(tmp_path):
+
+    path = os.path.join(tmp_path, 'report.checkpoint')
+    Checkpoint(path, ('repo', 'year'), interval=0).save({'finished': {2020: 'abc'}})
+
+    assert Checkpoint(path, ('repo', 'month')).load() is None
+    assert Checkpoint(path, ('repo', 'year')).load() == {'finished': {2020: 'abc'}}
+
+def test_corrupted_checkpoint(tmp_path):
+
+    path = os.path.join(tmp_path, 'report.checkpoint')
+    with open(path, 'wb') as file:
+        file.write(b'not a checkpoint')
+
+    assert Checkpoint(path, ('repo', 'year')).load() is None
@@ -1,9 +1,11 @@
 import pytest
 import os
+import pickle
 
 from datetime import date
-from gitevo import GitEvo
-from gitevo.exceptions import BadGitRepo, BadDateUnit, BadYearRange
+from gitevo import GitEvo, info
+from gitevo.exceptions import BadGitRepo, BadDateUnit, BadYearRange, BadJobs, BadMetricReference, BadMemoryCache
+from gitevo.reports import python
 from tests.conftest import remove_folder_if_exists
 
 testrepo = 'https://github.com/andrehora/testrepo'
@@ -83,4 +85,83 @@ def test_default_year_range():
     
     evo = GitEvo(repo=testrepo)
     assert evo.from_year == date.today().year - 5
-    assert evo.to_year == date.today().year
\ No newline at end of file
+    assert evo.to_year == date.today().year
+
+def test_invalid_jobs():
+
+    with pytest.raises(BadJobs) as e:
+        GitEvo(repo=testrepo, jobs=0)
+    assert str(e.value) == 'jobs must be equal or greater than 1'
+
+    with pytest.raises(BadJobs) as e:
+        GitEvo(repo=testrepo, jobs=None)
+    assert str(e.value) == 'jobs must be equal or greater than 1'
+
+def test_invalid_repo_jobs():
+
+    with pytest.raises(BadJobs) as e:
+        GitEvo(repo=testrepo, repo_jobs=0)
+    assert str(e.value) == 'repo_jobs must be equal or greater than 1'
+
+def test_invalid_memory_cache():
+
+    with pytest.raises(BadMemoryCache) as e:
+        GitEvo(repo=testrepo, memory_cache=-1)
+    assert str(e.value) == 'memory_cache must be equal or greater than 0'
+
+def test_add_metric_reference():
+
+    evo = GitEvo(repo=testrepo)
+    evo.add_metric('gitevo.reports.python:loc', 'LOC')
+    metric_info = evo.registered_metrics[0]
+    assert metric_info.name == 'LOC'
+    assert metric_info.callback is python.loc
+    assert metric_info.is_importable
+
+def test_invalid_metric_reference():
+
+    evo = GitEvo(repo=testrepo)
+
+    with pytest.raises(BadMetricReference) as e:
+        evo.add_metric('gitevo.reports.python.loc')
+    assert str(e.value) == 'metric reference should be module:function, not gitevo.reports.python.loc'
+
+    with pytest.raises(BadMetricReference) as e:
+        evo.add_metric('gitevo.reports.python:unknown')
+    assert str(e.value).startswith('metric reference gitevo.reports.python:unknown cannot be imported')
+
+def test_pickle_report_metrics():
+
+    evo = GitEvo(repo=testrepo)
+    python.metrics(evo)
+    metric_infos = pickle.loads(pickle.dumps(evo.registered_metrics))
+    assert [metric_info.name for metric_info in metric_infos] == [metric_info.name for metric_info in evo.registered_metrics]
+    assert [metric_info.callback for metric_info in metric_infos] == [metric_info.callback for metric_info in evo.registered_metrics]
+
+def test_pickle_nested_metric():
+
+    evo = GitEvo(repo=testrepo)
+
+    @evo.metric('Nested metric')
+    def nested_metric(commit):
+        return 0
+
+    assert not evo.registered_metrics[0].is_importable
+    with pytest.raises(pickle.PicklingError):
+        pickle.dumps(evo.registered_metrics[0])
+
+def test_metric_fingerprint(monkeypatch):
+
+    evo = GitEvo(repo=testrepo)
+    evo.add_metric('gitevo.reports.python:loc', 'LOC', extension='.py')
+    evo.add_metric('gitevo.reports.python:loc', 'LOC', extension='.java')
+    python_loc, java_loc = evo.registered_metrics
+
+    fingerprint = python_loc.fingerprint
+    assert fingerprint == python_loc.fingerprint
+    # Grammars of other extensions give other values
+    assert fingerprint != java_loc.fingerprint
+
+    # Values of other GitEvo versions are not reused
+    monkeypatch.setattr(info, '_gitevo_version', lambda: '0.0.1')
+    assert fingerprint != python_loc.fingerprint
@@ -0,0 +1,108 @@
+import pytest
+
+from datetime import date
+
+from gitevo.model import CommitResult, MetricResult, ProjectResult, MetricSeries, MetricData, GitEvoResult
+
+
+def commit_result(hash: str, commit_date: date, **values) -> CommitResult:
+    commit_result = CommitResult(hash, commit_date)
+    for name, value in values.items():
+        commit_result.add_metric_result(MetricResult(name, value, commit_date))
+    return commit_result
+
+def test_metric_series():
+
+    series = MetricSeries()
+    series.add(date(2021, 3, 10), 3)
+    series.add(date(2020, 5, 20), 1)
+    series.add(date(2021, 3, 25), 5)
+
+    assert series.months == [date(2020, 5, 1), date(2021, 3, 1)]
+    assert series.value_at(date(2020, 4, 1)) == 0
+    assert series.value_at(date(2020, 5, 1)) == 1
+    assert series.value_at(date(2021, 2, 1)) == 1
+    assert series.value_at(date(2025, 1, 1)) == 3
+
+def test_metric_evolution_forward_fill():
+
+    project_result = ProjectResult('project')
+    project_result.add_commit_result(commit_result('a', date(2020, 6, 1), loc=10, ifs=1))
+    project_result.add_commit_result(commit_result('b', date(2021, 6, 1), loc=20))
+    project_result.add_commit_result(commit_result('c', date(2023, 6, 1), loc=30, fors=2))
+
+    assert project_result.metric_evolution('loc').values == [10, 20, 20, 30]
+    assert project_result.metric_evolution('ifs').values == [1, 1, 1, 1]
+    assert project_result.metric_evolution('fors').values == [0, 0, 0, 2]
+    assert project_result.metric_evolution('unknown').values == [0, 0, 0, 0]
+    assert project_result.metric_evolution('loc').dates == ['2020', '2021', '2022', '2023']
+
+    # Commits added later are indexed on the next evolution
+    project_result.add_commit_result(commit_result('d', date(2024, 6, 1), loc=40))
+    assert project_result.metric_evolution('loc').values == [10, 20, 20, 30, 40]
+
+def test_metric_data_names():
+
+    metric_data = MetricData()
+    for name in ['def', 'async def', 'def', 'lambda', 'async def']:
+        metric_data.add_metric_name(name)
+    assert metric_data.names == ['def', 'async def', 'lambda']
+
+def gitevo_result() -> GitEvoResult:
+    result = GitEvoResult('title', 'report', 'year', [])
+    result.project_result = ProjectResult('project')
+    result.project_result.add_commit_result(commit_result('a', date(2020, 6, 1), loc=10, ifs=1))
+    result.project_result.add_commit_result(commit_result('b', date(2022, 6, 1), loc=20.5))
+    for name in ['loc', 'ifs']:
+        result.add_metric_name(name)
+    return result
+
+def test_evolution_matrix():
+
+    result = gitevo_result()
+    matrix = result.evolution_matrix
+
+    assert matrix.dates == ['2020', '2021', '2022']
+    assert matrix.names == ['loc', 'ifs']
+    assert matrix.columns == [[10, 10, 20.5], [1, 1, 1]]
+    assert result.metric_dates == matrix.dates
+    assert [evolution.values for evolution in result.metric_evolutions()] == matrix.columns
+
+    # Built once, and rebuilt when metrics are added
+    assert result.evolution_matrix is matrix
+    result.add_metric_name('fors')
+    assert result.evolution_matrix is not matrix
+    assert result.evolution_matrix.columns == [[10, 10, 20.5], [1, 1, 1], [0, 0, 0]]
+
+def test_to_numpy():
+
+    np = pytest.importorskip('numpy')
+    array = gitevo_result().to_numpy()
+    assert array.shape == (3, 2)
+    assert np.array_equal(array, np.array([[10, 1], [10, 1], [20.5, 1]]))
+
+def test_to_pandas():
+
+    pytest.importorskip('pandas')
+    df = gitevo_result().to_pandas()
+    assert list(df.index) == ['2020', '2021', '2022']
+    assert df.index.name == 'date'
+    assert list(df.columns) == ['loc', 'ifs']
+    assert df['loc'].tolist() == [10, 10, 20.5]
+
+def test_date_units_per_result():
+
+    # Results with other date units can be built at the same time
+    yearly = GitEvoResult('title', 'yearly', 'year', [])
+    monthly = GitEvoResult('title', 'monthly', 'month', [])
+    yearly.project_result = ProjectResult('project', 'year')
+    monthly.project_result = ProjectResult('project', 'month')
+    for result in [yearly, monthly]:
+        result.project_result.add_commit_result(commit_result('a', date(2020, 11, 1), loc=10))
+        result.project_result.add_commit_result(commit_result('b', date(2021, 2, 1), loc=20))
+        result.add_metric_name('loc')
+
+    assert yearly.metric_dates == ['2020', '2021']
+    assert monthly.metric_dates == ['11/2020', '12/2020', '01/2021', '02/2021']
+    assert yearly.evolution_matrix.columns == [[10, 20]]
+    assert monthly.evolution_matrix.columns == [[10, 10, 10, 20]]
@@ -0,0 +1,325 @@
+import pytest
+import tree_sitter_python
+
+from collections import Counter
+
+from tree_sitter import Language, Parser
+from treeminer.miners import buildin_miners
+from gitevo.nodes import NodeTable
+from gitevo.parse_cache import ParseCache
+from gitevo.parser import tree_nodes
+from gitevo.traversal import iter_descendants, first_descendant, descendant_by_field_name
+from gitevo.application import ParsedFile, ParsedCommit
+from gitevo.exceptions import BadQuery
+from gitevo.columns import np
+from gitevo.reports.python_fastapi import FastAPICommit
+
+source_code = b'''
+import os
+from fastapi import FastAPI, APIRouter
+
+@app.get("/items/{item_id}")
+async def read_item(item_id: int, q: str = None) -> dict:
+    return {"item_id": item_id}
+
+class Foo(Bar):
+    def bar(self, a, b=2, *args, **kw):
+        if a:
+            return [x for x in args]
+        return (1, 2)
+'''
+
+def parse(source: bytes):
+    return Parser(Language(tree_sitter_python.language())).parse(source)
+
+def assert_same_node(node, table_node):
+    assert table_node.type == node.type
+    assert table_node.text == node.text
+    assert table_node.start_byte == node.start_byte
+    assert table_node.end_byte == node.end_byte
+    assert tuple(table_node.start_point) == tuple(node.start_point)
+    assert tuple(table_node.end_point) == tuple(node.end_point)
+    assert table_node.is_named == node.is_named
+    assert table_node.child_count == node.child_count
+    assert [child.type for child in table_node.children] == [child.type for child in node.children]
+    assert [child.type for child in table_node.named_children] == [child.type for child in node.named_children]
+
+def test_node_table():
+    tree = parse(source_code)
+    nodes = tree_nodes(tree)
+    table = NodeTable.from_tree(tree, source_code)
+
+    assert len(table) == len(nodes)
+    for node, table_node in zip(nodes, table.nodes()):
+        assert_same_node(node, table_node)
+
+def test_node_ids():
+    tables = [NodeTable.from_tree(parse(source_code), source_code) for _ in range(2)]
+    ids = [node.id for table in tables for node in table.nodes()]
+    assert len(set(ids)) == len(ids)
+    assert tables[0].nodes()[1].id == tables[0].nodes()[1].id
+
+def test_node_table_navigation():
+    tree = parse(source_code)
+    nodes = tree_nodes(tree)
+    table = NodeTable.from_tree(tree, source_code)
+
+    for node, table_node in zip(nodes, table.nodes()):
+        if node.parent is None:
+            assert table_node.parent is None
+        else:
+            assert table_node.parent.start_byte == node.parent.start_byte
+            assert table_node.parent.type == node.parent.type
+        for field_name in ['name', 'parameters', 'return_type', 'body', 'definition', 'object', 'attribute', 'arguments']:
+            child = node.child_by_field_name(field_name)
+            table_child = table_node.child_by_field_name(field_name)
+            if child is None:
+                assert table_child is None
+            else:
+                assert_same_node(child, table_child)
+        assert [n.text for n in table_node.children_by_field_name('name')] == [n.text for n in node.children_by_field_name('name')]
+
+def test_parse_cache(tmp_path):
+    miner = buildin_miners[0]
+    tree = parse(source_code)
+    table = NodeTable.from_tree(tree, source_code)
+
+    parse_cache = ParseCache(str(tmp_path))
+    assert parse_cache.get('a1b2c3', miner) is None
+
+    parse_cache.put('a1b2c3', miner, table, 14)
+    cached_table, loc = parse_cache.get('a1b2c3', miner)
+    assert loc == 14
+    assert len(cached_table) == len(table)
+    for table_node, cached_node in zip(table.nodes(), cached_table.nodes()):
+        assert cached_node.type == table_node.type
+        assert cached_node.text == table_node.text
+        assert cached_node.descendant_count == table_node.descendant_count
+
+def naive_find_nodes_by_type(nodes, node_types):
+    return [node for node in nodes if node.type in node_types]
+
+def test_find_nodes_by_type():
+    tree = parse(source_code)
+    table = NodeTable.from_tree(tree, source_code)
+    node_types = ['function_definition', 'identifier', 'return_statement', 'identifier']
+
+    for parsed_file in [ParsedFile('a.py', 'a.py', None, 14, parse=lambda: tree_nodes(tree)),
+                        ParsedFile('a.py', 'a.py', None, 14, parse=lambda: table)]:
+        
+        commit = ParsedCommit('hash', None, '.py', [parsed_file, parsed_file])
+        expected_nodes = naive_find_nodes_by_type(commit.nodes, node_types)
+
+        assert commit.find_nodes_by_type(node_types) == expected_nodes
+        assert commit.find_node_types(node_types) == [node.type for node in expected_nodes]
+        assert commit.count_nodes(node_types) == len(expected_nodes)
+        assert commit.count_nodes('identifier') == len(naive_find_nodes_by_type(commit.nodes, ['identifier']))
+        assert commit.find_nodes_by_type('class_definition')[0].type == 'class_definition'
+        assert commit.count_nodes('foo') == 0
+
+def test_query():
+    tree = parse(source_code)
+    table = NodeTable.from_tree(tree, source_code)
+    pattern = '(function_definition name: (identifier) @name parameters: (parameters) @parameters)'
+
+    for parsed_file in [ParsedFile('a.py', 'a.py', None, 14, parse=lambda: tree),
+                        ParsedFile('a.py', 'a.py', None, 14, parse=lambda: table, parse_tree=lambda: parse(table.source))]:
+
+        commit = ParsedCommit('hash', None, '.py', [parsed_file, parsed_file, ParsedFile('b.txt', 'b.txt', [], 0)])
+        matches = commit.query(pattern)
+        captures = commit.captures(pattern)
+
+        assert [match['name'][0].text for match in matches] == [b'read_item', b'bar', b'read_item', b'bar']
+        assert [node.text for node in captures['name']] == [b'read_item', b'bar', b'read_item', b'bar']
+        assert len(captures['parameters']) == 4
+        assert len(commit.captures('((identifier) @name (#eq? @name "args"))')['name']) == 4
+        assert commit.captures('(lambda) @lambda') == {}
+
+def test_query_does_not_build_nodes():
+    tree = parse(source_code)
+    parsed_file = ParsedFile('a.py', 'a.py', None, 14, parse=lambda: tree)
+
+    assert len(parsed_file.captures('(decorator) @decorator')['decorator']) == 1
+    assert parsed_file._nodes is None
+    assert len(parsed_file.nodes) == len(tree_nodes(tree))
+
+def test_bad_query():
+    tree = parse(source_code)
+    commit = ParsedCommit('hash', None, '.py', [ParsedFile('a.py', 'a.py', None, 14, parse=lambda: tree)])
+
+    with pytest.raises(BadQuery):
+        commit.query('(foo) @foo')
+    with pytest.raises(BadQuery):
+        commit.captures('(function_definition')
+
+def iter_ancestors(node):
+    while node.parent is not None:
+        node = node.parent
+        yield node
+
+def test_node_columns():
+    np = pytest.importorskip('numpy')
+    from gitevo.columns import NodeColumns
+
+    other_source = b'x = [1, 2]\nwhile x:\n    x.pop()\n'
+    tables = [NodeTable.from_tree(parse(source), source) for source in [source_code, other_source, source_code]]
+    nodes = [node for table in tables for node in tree_nodes(parse(table.source))]
+    columns = NodeColumns.from_tables(tables)
+
+    assert len(columns) == len(nodes)
+    assert columns.find_node_types() == [node.type for node in nodes]
+    assert columns.files.tolist() == [file for file, table in enumerate(tables) for _ in range(len(table))]
+
+    node_indexes = {(file, node.start_byte, node.end_byte, node.type): index for index, (file, node) in
+                    enumerate(zip(columns.files.tolist(), nodes))}
+    for index, node in enumerate(nodes):
+        assert columns.depths[index] == len(list(iter_ancestors(node)))
+        parent = columns.parents[index]
+        if node.parent is None:
+            assert parent == -1
+        else:
+            key = (columns.files[index], node.parent.start_byte, node.parent.end_byte, node.parent.type)
+            assert parent == node_indexes[key]
+
+    locs = [len(node.text.split(b'\n')) for node in nodes if node.type == 'function_definition']
+    assert columns.locs(['function_definition']).tolist() == locs
+
+def test_columnar_commit():
+    pytest.importorskip('numpy')
+    other_source = b'def foo():\n    pass\n\n\ndef bar(a):\n    return a\n'
+    node_types = ['function_definition', 'identifier', 'return_statement', 'identifier']
+
+    def parsed_files(use_tables: bool):
+        files = []
+        for source in [source_code, other_source]:
+            tree = parse(source)
+            table = NodeTable.from_tree(tree, source)
+            files.append(ParsedFile('a.py', 'a.py', None, 14, parse=(lambda table=table: table) if use_tables else (lambda tree=tree: tree)))
+        return files + [ParsedFile('b.txt', 'b.txt', [], 0)]
+
+    commit = ParsedCommit('hash', None, '.py', parsed_files(use_tables=False))
+    columnar_commit = ParsedCommit('hash', None, '.py', parsed_files(use_tables=True), columnar=True)
+
+    assert columnar_commit.count_nodes() == commit.count_nodes()
+    assert columnar_commit.count_nodes(node_types) == commit.count_nodes(node_types)
+    assert columnar_commit.count_nodes('foo') == 0
+    assert columnar_commit.find_node_types() == commit.find_node_types()
+    assert columnar_commit.find_node_types(node_types) == commit.find_node_types(node_types)
+    assert [node.text for node in columnar_commit.find_nodes_by_type(node_types)] == [node.text for node in commit.find_nodes_by_type(node_types)]
+    assert not any(file.is_parsed and file._nodes is not None for file in columnar_commit.parsed_files[:2])
+    for aggregate in ['median', 'mean', 'mode']:
+        assert columnar_commit.loc_by_type('function_definition', aggregate) == commit.loc_by_type('function_definition', aggregate)
+    assert columnar_commit.loc_by_type('lambda') == 0
+
+def test_node_locs():
+    tree = parse(source_code)
+    table = NodeTable.from_tree(tree, source_code)
+    node_types = ['function_definition', 'class_definition', 'string', 'return_statement']
+    expected_locs = [len(node.text.split(b'\n')) for node in naive_find_nodes_by_type(tree_nodes(tree), node_types)]
+
+    for parsed_file in [ParsedFile('a.py', 'a.py', None, 14, parse=lambda: tree),
+                        ParsedFile('a.py', 'a.py', None, 14, parse=lambda: table)]:
+        assert list(parsed_file.node_locs(node_types)) == expected_locs
+        commit = ParsedCommit('hash', None, '.py', [parsed_file])
+        function_locs = list(parsed_file.node_locs('function_definition'))
+        assert commit.loc_by_type('function_definition', 'p100') == max(function_locs)
+        assert commit.loc_by_type('function_definition', 'p0') == min(function_locs)
+
+def test_declared_node_types():
+    tree = parse(source_code)
+    table = NodeTable.from_tree(tree, source_code)
+    declared_node_types = frozenset(['function_definition', 'identifier', 'return_statement'])
+    node_types = ['return_statement', 'function_definition']
+    expected_nodes = naive_find_nodes_by_type(tree_nodes(tree), node_types)
+
+    for parse_file in [lambda: tree, lambda: table, lambda: tree_nodes(tree)]:
+        parsed_file = ParsedFile('a.py', 'a.py', None, 14, parse=parse_file, declared_node_types=declared_node_types)
+        commit = ParsedCommit('hash', None, '.py', [parsed_file, parsed_file])
+
+        assert [node.text for node in commit.find_nodes_by_type(node_types)] == [node.text for node in expected_nodes * 2]
+        assert commit.find_node_types(node_types) == [node.type for node in expected_nodes * 2]
+        assert commit.count_node_types(node_types) == Counter(node.type for node in expected_nodes * 2)
+        assert commit.count_nodes('identifier') == 2 * len(naive_find_nodes_by_type(tree_nodes(tree), ['identifier']))
+        assert commit.loc_by_type('function_definition', 'p100') == 4
+        # Declared types are selected without the full list of nodes or the index of all types
+        assert parsed_file._type_index is None
+        if parse_file() is tree:
+            assert parsed_file._nodes is None
+
+        # Other types are looked up in the index of all types
+        assert commit.count_nodes('class_definition') == 2
+        assert parsed_file._type_index is not None
+
+def test_fastapi_imports_on_table():
+    table = NodeTable.from_tree(parse(source_code), source_code)
+
+    def parse_tree():
+        raise AssertionError('the tree should not be parsed again')
+
+    parsed_file = ParsedFile('a.py', 'a.py', None, 14, parse=lambda: table, parse_tree=parse_tree)
+    fastapi = FastAPICommit.of(ParsedCommit('hash', None, '.py', [parsed_file]))
+
+    assert fastapi.fastapi_imports() == ['FastAPI']
+    assert fastapi.apirouter_imports() == ['APIRouter']
+    assert fastapi.websocket_imports() == []
+
+def test_memo():
+    commit = ParsedCommit('hash', None, '.py', [])
+    assert commit.memo('key', lambda commit: [commit.hash]) == ['hash']
+    assert commit.memo('key', lambda commit: ['other']) is commit.memo('key', list)
+    assert commit.memo(ParsedFile, lambda commit: 1) == 1
+
+def test_count_node_types():
+    other_source = b'def foo():\n    pass\n\n\nclass Bar:\n    x = {}\n'
+    node_types = ['class_definition', 'identifier', 'function_definition', 'foo']
+    for use_tables in [False, True]:
+        parsed_files = []
+        for source in [other_source, source_code]:
+            tree = parse(source)
+            table = NodeTable.from_tree(tree, source)
+            parsed_files.append(ParsedFile('a.py', 'a.py', None, 14, parse=(lambda table=table: table) if use_tables else (lambda tree=tree: tree)))
+
+        commits = [ParsedCommit('hash', None, '.py', parsed_files)]
+        if use_tables and np is not None:
+            commits.append(ParsedCommit('hash', None, '.py', parsed_files, columnar=True))
+
+        for commit in commits:
+            for types in [None, node_types, 'identifier']:
+                counter = commit.count_node_types(types)
+                assert counter == Counter(commit.find_node_types(types))
+                assert list(counter) == list(Counter(commit.find_node_types(types)))
+                assert counter.most_common() == Counter(commit.find_node_types(types)).most_common()
+
+def test_iter_descendants():
+    tree = parse(source_code)
+    table = NodeTable.from_tree(tree, source_code)
+    root, table_root = tree.root_node, table.node(0)
+
+    assert [node.type for node in iter_descendants(root)] == [node.type for node in tree_nodes(tree)]
+    assert [node.type for node in iter_descendants(table_root)] == [node.type for node in tree_nodes(tree)]
+
+    for max_depth in [0, 1, 2]:
+        nodes = [node.type for node in iter_descendants(root, max_depth)]
+        table_nodes = [node.type for node in iter_descendants(table_root, max_depth)]
+        assert nodes == table_nodes
+    assert len(list(iter_descendants(root, 0))) == 1
+
+    class_definition = root.children[3]
+    assert len(list(iter_descendants(class_definition))) == class_definition.descendant_count
+    assert len(list(iter_descendants(table.node(0).children[3]))) == class_definition.descendant_count
+
+def test_descendant_by_field_name():
+    tree = parse(source_code)
+    table = NodeTable.from_tree(tree, source_code)
+
+    for root in [tree.root_node, table.node(0)]:
+        assert descendant_by_field_name(root, 'parameters').text == b'(item_id: int, q: str = None)'
+        assert descendant_by_field_name(root, 'superclasses').text == b'(Bar)'
+        assert descendant_by_field_name(root, 'parameters', max_depth=1) is None
+        assert descendant_by_field_name(root, 'foo') is None
+        assert first_descendant(root, lambda node: node.type == 'class_definition').child_by_field_name('name').text == b'Foo'
+
+def test_iter_descendants_deep_tree():
+    deep_source_code = b'x = ' + b'[' * 3000 + b']' * 3000
+    tree = parse(deep_source_code)
+    assert len(list(iter_descendants(tree.root_node))) > 6000
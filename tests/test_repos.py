@@ -1,8 +1,11 @@
 
 import pytest
+import os
+import asyncio
 
-from git import Repo
+from git import Repo, GitCommandError
 from gitevo import GitEvo
+from gitevo.repository import GitRepository
 from tests.conftest import remove_folder_if_exists
 
 
@@ -37,4 +40,113 @@ def test_local_git_repository(clear_reports):
     result = evo.run()
     assert len(result) == 2
 
-    remove_folder_if_exists(folder_name)
\ No newline at end of file
+    remove_folder_if_exists(folder_name)
+
+def test_parallel_local_git_repositories(clear_reports):
+
+    folder_name = 'projects'
+    remove_folder_if_exists(folder_name)
+    Repo.clone_from(url='https://github.com/andrehora/testrepo', to_path='projects/testrepo')
+    Repo.clone_from(url='https://github.com/andrehora/library', to_path='projects/library')
+    broken_repo('projects/broken')
+
+    evo = GitEvo(repo='projects', extension='.py', repo_jobs=2)
+    result = evo.run()
+    assert sorted([r.project_result.name for r in result]) == ['library', 'testrepo']
+    assert list(evo.failed_repos) == [os.path.abspath('projects/broken')]
+
+    remove_folder_if_exists(folder_name)
+
+def test_select_commits_by_year(local_repo):
+
+    with GitRepository(local_repo) as repository:
+        selected_commits = repository.select_commits(2020, 2025, 'year')
+
+    assert repository.name == 'testrepo'
+    assert [commit.bucket for commit in selected_commits] == [2020, 2021, 2022, 2023, 2024, 2025]
+    assert selected_commits[0].hash == '57a6ac0058bef51f396a4322c38db69d5c26c4ff'
+    assert selected_commits[1].hash == '93d736df57207320363124123487467ffdfa5122'
+
+def test_select_commits_by_month(local_repo):
+
+    with GitRepository(local_repo) as repository:
+        selected_commits = repository.select_commits(2020, 2020, 'month')
+
+    assert selected_commits[0].bucket == (2020, 1)
+    assert selected_commits[0].hash == '57a6ac0058bef51f396a4322c38db69d5c26c4ff'
+    assert selected_commits[1].bucket == (2020, 2)
+    assert selected_commits[1].hash == '1791c734a04c2984679f980183cf8e4615ea124e'
+
+def test_select_commits_async(local_repo):
+
+    async def select_commits():
+        repository = await GitRepository.open_async(local_repo)
+        with repository:
+            return await repository.select_commits_async(2020, 2025, 'month')
+
+    with GitRepository(local_repo) as repository:
+        expected = repository.select_commits(2020, 2025, 'month')
+
+    selected_commits = asyncio.run(select_commits())
+    assert [(commit.hash, commit.bucket) for commit in selected_commits] == [(commit.hash, commit.bucket) for commit in expected]
+
+def test_read_blobs(local_repo):
+
+    git_repo = Repo(local_repo)
+    commit = git_repo.commit('57a6ac0058bef51f396a4322c38db69d5c26c4ff')
+    expected_files = [item for item in commit.tree.traverse() if item.type == 'blob']
+
+    with GitRepository(local_repo) as repository:
+        files = repository.files(commit.hexsha)
+        assert [file.path for file in files] == [item.path for item in expected_files]
+        for file, item in zip(files, expected_files):
+            assert file.sha == item.hexsha
+            assert repository.read_blob(file.sha) == item.data_stream.read()
+
+def broken_repo(path: str) -> str:
+    # HEAD points to a missing commit
+    repo = Repo.init(path)
+    repo.index.commit('first commit')
+    with open(os.path.join(path, '.git', 'refs', 'heads', repo.active_branch.name), 'w') as file:
+        file.write('1' * 40 + '\n')
+    repo.close()
+    return path
+
+def test_select_commits_of_empty_repo(tmp_path):
+
+    Repo.init(tmp_path).close()
+    with GitRepository(str(tmp_path)) as repository:
+        assert repository.select_commits(2020, 2025, 'year') == []
+        assert asyncio.run(repository.select_commits_async(2020, 2025, 'year')) == []
+
+def test_select_commits_of_broken_repo(tmp_path):
+
+    with GitRepository(broken_repo(str(tmp_path))) as repository:
+        with pytest.raises(GitCommandError, match='bad object'):
+            repository.select_commits(2020, 2025, 'year')
+        with pytest.raises(GitCommandError, match='bad object'):
+            asyncio.run(repository.select_commits_async(2020, 2025, 'year'))
+
+def test_remote_url(local_repo, tmp_path):
+
+    with GitRepository(local_repo) as repository:
+        assert repository.remote_url == 'https://github.com/andrehora/testrepo'
+
+    Repo.init(tmp_path).close()
+    with GitRepository(str(tmp_path)) as repository:
+        assert repository.remote_url is None
+
+def test_failed_clone(tmp_path, monkeypatch):
+
+    def clone_from(url, to_path):
+        os.makedirs(to_path)
+        raise GitCommandError(['git', 'clone', url], 128)
+
+    tmp_dir = str(tmp_path / 'clone')
+    monkeypatch.setattr('tempfile.mkdtemp', lambda: os.makedirs(tmp_dir) or tmp_dir)
+    monkeypatch.setattr(Repo, 'clone_from', clone_from)
+
+    # The temporary folder is removed when the clone fails
+    with pytest.raises(GitCommandError):
+        GitRepository('https://github.com/andrehora/unknown')
+    assert not os.path.exists(tmp_dir)
@@ -0,0 +1,30 @@
+import os
+
+from gitevo.result_store import ResultStore
+
+
+def test_result_store(tmp_path):
+
+    path = os.path.join(tmp_path, 'results.db')
+    metrics = [('loc', 'f1'), ('loops', 'f2')]
+
+    with ResultStore(path) as store:
+        assert store.get('repo', 2024, 'abc', metrics) == {}
+        store.put('repo', 2024, 'abc', [('loc', 'f1', 120), ('loops', 'f2', [('for', 3), ('while', 1)])])
+        store.put('repo', (2024, 3), 'def', [('loc', 'f1', 10.5)])
+
+    with ResultStore(path) as store:
+        assert store.get('repo', 2024, 'abc', metrics) == {0: 120, 1: [('for', 3), ('while', 1)]}
+        assert store.get('repo', (2024, 3), 'def', metrics) == {0: 10.5}
+        # Other commits, repositories, and fingerprints are not found
+        assert store.get('repo', 2024, 'xyz', metrics) == {}
+        assert store.get('other', 2024, 'abc', metrics) == {}
+        assert store.get('repo', 2024, 'abc', [('loops', 'f3'), ('loc', 'f1')]) == {1: 120}
+
+def test_result_store_replace(tmp_path):
+
+    path = os.path.join(tmp_path, 'results.db')
+    with ResultStore(path) as store:
+        store.put('repo', 2024, 'abc', [('loc', 'f1', 120)])
+        store.put('repo', 2024, 'abc', [('loc', 'f1', 130)])
+        assert store.get('repo', 2024, 'abc', [('loc', 'f1')]) == {0: 130}
@@ -0,0 +1,149 @@
+import os
+import json
+import threading
+import pytest
+import urllib.request
+import urllib.error
+
+from git import Repo
+from gitevo.server import AnalysisJob, AnalysisService, create_server
+from gitevo.exceptions import BadAnalysisJob, JobQueueFull
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = AnalysisService(str(tmp_path), queue_size=1)
+    yield service
+    service.close()
+
+@pytest.fixture
+def service_url(service):
+    server = create_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+def request(url: str, method: str = 'GET', data=None) -> tuple[int, dict]:
+    body = json.dumps(data).encode() if data is not None else None
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=body, method=method)) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+def test_job_from_json():
+    job = AnalysisJob.from_json({'repo': 'flask', 'report': 'java', 'from_year': 2020, 'date_unit': 'month'})
+    assert (job.repo, job.report, job.from_year, job.to_year, job.date_unit) == ('flask', 'java', 2020, None, 'month')
+    assert job.status == 'queued'
+
+@pytest.mark.parametrize('data', [None, [], {}, {'repo': ''}, {'repo': 'flask', 'report': 'cobol'}, {'repo': 'flask', 'date_unit': 'week'},
+                                  {'repo': 'flask', 'from_year': '2020'}, {'repo': 'flask', 'jobs': 4}])
+def test_invalid_job_from_json(data):
+    with pytest.raises(BadAnalysisJob):
+        AnalysisJob.from_json(data)
+
+def test_failed_job(service):
+    job = service.submit(AnalysisJob('not_a_repo'))
+    assert job.done.wait(30)
+    assert job.status == 'failed'
+    assert 'not_a_repo' in job.error
+
+def test_job_queue_full(tmp_path):
+    # Without workers, jobs are not taken from the queue
+    service = AnalysisService(str(tmp_path), workers=0, queue_size=1)
+    service.submit(AnalysisJob('flask'))
+    with pytest.raises(JobQueueFull):
+        service.submit(AnalysisJob('flask'))
+    assert service.queued == 1
+
+def test_close_cancels_queued_jobs(tmp_path):
+    service = AnalysisService(str(tmp_path), queue_size=1)
+    started, release = threading.Event(), threading.Event()
+    service._run = lambda job: started.set() or release.wait(30) and []
+
+    running = service.submit(AnalysisJob('flask'))
+    assert started.wait(30)
+    queued = service.submit(AnalysisJob('flask'))
+
+    # Closing does not wait for the queued jobs, even when the queue is full
+    closing = threading.Thread(target=service.close)
+    closing.start()
+    assert queued.done.wait(30)
+    assert queued.status == 'cancelled'
+    with pytest.raises(JobQueueFull):
+        service.submit(AnalysisJob('flask'))
+
+    release.set()
+    closing.join(30)
+    assert not closing.is_alive()
+    assert running.status == 'done'
+
+def test_service_requests(service_url):
+    assert request(f'{service_url}/health')[0] == 200
+    assert request(f'{service_url}/jobs/unknown')[0] == 404
+    assert request(f'{service_url}/unknown')[0] == 404
+    assert request(f'{service_url}/jobs', 'POST', {'report': 'python'})[0] == 400
+
+    status, job = request(f'{service_url}/jobs?wait=30', 'POST', {'repo': 'not_a_repo'})
+    assert status == 200
+    assert job['status'] == 'failed'
+    assert request(f'{service_url}/jobs/{job["id"]}')[1]['status'] == 'failed'
+    assert [job['id']] == [job['id'] for job in request(f'{service_url}/jobs')[1]]
+
+def test_analysis_job(local_repo, service_url):
+    data = {'repo': local_repo, 'report': 'python', 'date_unit': 'month'}
+    status, job = request(f'{service_url}/jobs?wait=300', 'POST', data)
+    assert status == 200
+    assert job['status'] == 'done'
+
+    result = job['results'][0]
+    assert result['repository'] == 'testrepo'
+    assert result['html'].endswith('report_testrepo.html')
+    assert result['csv'].endswith('report_testrepo.csv')
+    assert len(result['metrics']['Lines of code (LOC)']) == len(result['dates'])
+
+    # Values of the dates already analyzed come from the result store
+    status, other_job = request(f'{service_url}/jobs?wait=300', 'POST', data)
+    assert other_job['results'][0]['metrics'] == result['metrics']
+
+def test_warm_repository(local_repo, service):
+    first = service.submit(AnalysisJob(local_repo, date_unit='month'))
+    assert first.done.wait(300)
+    warm_repository = service._repositories[os.path.abspath(local_repo)]
+    parsed_file_cache = warm_repository._parsed_file_caches['python']
+    assert len(parsed_file_cache) > 0
+
+    # The next jobs on the repository reuse its blob reader and parsed files
+    second = service.submit(AnalysisJob(local_repo, date_unit='month'))
+    assert second.done.wait(300)
+    assert second.status == 'done'
+    assert list(service._repositories.values()) == [warm_repository]
+    assert warm_repository._parsed_file_caches == {'python': parsed_file_cache}
+    assert second.results[0]['metrics'] == first.results[0]['metrics']
+    assert os.path.dirname(second.results[0]['html']) == os.path.join(service.workdir, 'reports', second.id)
+
+def test_warm_repositories_are_bounded(tmp_path):
+    service = AnalysisService(str(tmp_path / 'service'), workers=0, max_repositories=1)
+    blobs = []
+    for name in ['a', 'b']:
+        (tmp_path / name).mkdir()
+        (tmp_path / name / 'a.py').write_text('x = 1\n')
+        with Repo.init(tmp_path / name) as repo:
+            blobs.append(repo.git.hash_object('-w', 'a.py'))
+
+    with service._warm_repository(str(tmp_path / 'a')) as first:
+        first.repository.read_blob(blobs[0])
+        with service._warm_repository(str(tmp_path / 'b')) as second:
+            second.repository.read_blob(blobs[1])
+            # The least recently used repository is evicted, and closed when its job is done
+            assert list(service._repositories.values()) == [second]
+            assert first.repository._blob_reader is not None
+        assert first.repository._blob_reader is not None
+    assert first.repository._blob_reader is None
+
+    # Repositories not in use are closed when they are evicted
+    with service._warm_repository(str(tmp_path / 'a')):
+        assert second.repository._blob_reader is None
+    service.close()
@@ -0,0 +1,44 @@
+import pytest
+
+from datetime import datetime
+
+from gitevo.shard import parse_shard, group_shards
+from gitevo.repository import SelectedCommit
+from gitevo.exceptions import BadShard
+
+
+def test_parse_shard():
+    assert parse_shard('1/1') == (1, 1)
+    assert parse_shard('2/4') == (2, 4)
+
+@pytest.mark.parametrize('shard', ['0/2', '3/2', '2', '1/0', 'a/b', '-1/2', ''])
+def test_parse_invalid_shard(shard):
+    with pytest.raises(BadShard):
+        parse_shard(shard)
+
+def shard(index: int, count: int, repository: str = 'repo', metrics: list | None = None, from_year: int = 2020, buckets: list[int] = ()) -> dict:
+    values = [(SelectedCommit(f'hash{bucket}', datetime(bucket, 1, 1), bucket), {0: 1}) for bucket in buckets]
+    return {'shard': (index, count), 'repository_key': repository, 'date_unit': 'year', 'from_year': from_year, 'to_year': 2025,
+            'metrics': metrics or [{'name': 'LOC'}], 'values': values}
+
+def test_group_shards():
+    groups = group_shards([shard(2, 2, buckets=[2023, 2024]), shard(1, 1, 'other'), shard(1, 2, buckets=[2021, 2022])])
+    assert [[s['shard'] for s in group] for group in groups] == [[(1, 2), (2, 2)], [(1, 1)]]
+
+def test_group_missing_shards():
+    with pytest.raises(BadShard):
+        group_shards([shard(1, 3), shard(3, 3)])
+    with pytest.raises(BadShard):
+        group_shards([shard(1, 2), shard(1, 2)])
+    with pytest.raises(BadShard):
+        group_shards([shard(1, 2), shard(2, 3)])
+
+def test_group_shards_other_settings():
+    with pytest.raises(BadShard, match='metrics'):
+        group_shards([shard(1, 2), shard(2, 2, metrics=[{'name': 'Files'}])])
+    with pytest.raises(BadShard, match='from_year'):
+        group_shards([shard(1, 2), shard(2, 2, from_year=2021)])
+
+def test_group_shards_overlapping_dates():
+    with pytest.raises(BadShard, match='overlapping'):
+        group_shards([shard(1, 2, buckets=[2021, 2022]), shard(2, 2, buckets=[2022, 2023])])
@@ -1,32 +1,28 @@
 import os
+import statistics
 
 from datetime import date
-from gitevo.utils import DateUtils, is_git_dir
+from gitevo.utils import DateUtils, LRUCache, Distribution, SpaceSaving, aggregate_stat, is_git_dir
 
 def test_date_range_year():
-    DateUtils.date_unit = 'year'
     assert len(DateUtils.date_range(date(2000,1,1), date(2000,1,1))) == 1
     assert len(DateUtils.date_range(date(2000,1,1), date(2000,12,1))) == 1
     assert len(DateUtils.date_range(date(2000,1,1), date(2001,1,1))) == 2
     assert len(DateUtils.date_range(date(2000,1,1), date(2010,1,1))) == 11
 
 def test_date_range_month_same_year():
-    DateUtils.date_unit = 'month'
-    assert len(DateUtils.date_range(date(2000,1,1), date(2000,1,1))) == 1
-    assert len(DateUtils.date_range(date(2000,1,1), date(2000,7,1))) == 7
-    assert len(DateUtils.date_range(date(2000,1,1), date(2000,12,1))) == 12
+    assert len(DateUtils.date_range(date(2000,1,1), date(2000,1,1), 'month')) == 1
+    assert len(DateUtils.date_range(date(2000,1,1), date(2000,7,1), 'month')) == 7
+    assert len(DateUtils.date_range(date(2000,1,1), date(2000,12,1), 'month')) == 12
 
 def test_date_range_month_distinct_years():
-    DateUtils.date_unit = 'month'
-    assert len(DateUtils.date_range(date(2000,1,1), date(2001,1,1))) == 13
-    assert len(DateUtils.date_range(date(2000,1,1), date(2001,12,1))) == 24
+    assert len(DateUtils.date_range(date(2000,1,1), date(2001,1,1), 'month')) == 13
+    assert len(DateUtils.date_range(date(2000,1,1), date(2001,12,1), 'month')) == 24
 
-    assert len(DateUtils.date_range(date(2000,1,1), date(2002,6,1))) == 30
-    assert len(DateUtils.date_range(date(2000,1,1), date(2002,12,1))) == 36
+    assert len(DateUtils.date_range(date(2000,1,1), date(2002,6,1), 'month')) == 30
+    assert len(DateUtils.date_range(date(2000,1,1), date(2002,12,1), 'month')) == 36
 
 def test_formatted_dates_year():
-    DateUtils.date_unit = 'year'
-
     dates = DateUtils.date_range(date(2000,1,1), date(2000,1,1))
     assert DateUtils.formatted_dates(dates) == ['2000']
 
@@ -39,23 +35,114 @@ def test_formatted_dates_year():
     dates = DateUtils.date_range(date(2000,1,1), date(2005,1,1))
     assert DateUtils.formatted_dates(dates) == ['2000', '2001', '2002', '2003', '2004', '2005']
 
-def test_formatted_dates_month():
-    DateUtils.date_unit = 'month'
+def test_date_unit_default():
+    dates = DateUtils.date_range(date(2000,1,1), date(2000,7,1))
+    assert DateUtils.formatted_dates(dates) == ['2000']
+    assert DateUtils.formatted_dates(dates, 'month') == ['12/2000']
 
-    dates = DateUtils.date_range(date(2000,1,1), date(2000,1,1))
-    assert DateUtils.formatted_dates(dates) == ['01/2000']
+def test_formatted_dates_month():
+    dates = DateUtils.date_range(date(2000,1,1), date(2000,1,1), 'month')
+    assert DateUtils.formatted_dates(dates, 'month') == ['01/2000']
 
-    dates = DateUtils.date_range(date(2000,1,1), date(2000,2,1))
-    assert DateUtils.formatted_dates(dates) == ['01/2000', '02/2000']
+    dates = DateUtils.date_range(date(2000,1,1), date(2000,2,1), 'month')
+    assert DateUtils.formatted_dates(dates, 'month') == ['01/2000', '02/2000']
 
-    dates = DateUtils.date_range(date(2000,1,1), date(2001,4,1))
-    assert DateUtils.formatted_dates(dates) == ['01/2000', '02/2000', '03/2000', '04/2000', 
-                                                '05/2000', '06/2000', '07/2000', '08/2000', 
-                                                '09/2000', '10/2000', '11/2000', '12/2000', 
-                                                '01/2001', '02/2001', '03/2001', '04/2001']
+    dates = DateUtils.date_range(date(2000,1,1), date(2001,4,1), 'month')
+    assert DateUtils.formatted_dates(dates, 'month') == ['01/2000', '02/2000', '03/2000', '04/2000', 
+                                                         '05/2000', '06/2000', '07/2000', '08/2000', 
+                                                         '09/2000', '10/2000', '11/2000', '12/2000', 
+                                                         '01/2001', '02/2001', '03/2001', '04/2001']
     
 def test_is_git_dir(local_repo):
     assert is_git_dir(local_repo)
 
 def test_is_notgit_dir():
     assert not is_git_dir('gitevo')
+
+def test_lru_cache():
+    cache = LRUCache(max_weight=3)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.put('c', 3)
+    assert cache.get('a') == 1
+
+    # b is the least recently used
+    cache.put('d', 4)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.get('d') == 4
+
+def test_lru_cache_weight():
+    cache = LRUCache(max_weight=10)
+    cache.put('a', 1, weight=4)
+    cache.put('b', 2, weight=4)
+    assert len(cache) == 2
+    assert cache.weight == 8
+
+    cache.put('c', 3, weight=4)
+    assert len(cache) == 2
+    assert cache.weight == 8
+    assert cache.get('a') is None
+
+def test_lru_cache_pop():
+    cache = LRUCache(max_weight=10)
+    cache.put('a', 1, weight=4)
+    assert cache.pop('a') == 1
+    assert cache.pop('a') is None
+    assert len(cache) == 0
+    assert cache.weight == 0
+
+def test_distribution():
+    values = [3, 1, 4, 1, 5, 9, 2, 6, 5, 3, 5]
+    distribution = Distribution(values)
+
+    assert len(distribution) == len(values)
+    assert len(distribution.counts) == 7
+    for measure in ['median', 'mean', 'mode']:
+        assert distribution.aggregate(measure) == getattr(statistics, measure)(values)
+
+    distribution.add(8)
+    values.append(8)
+    assert distribution.median() == statistics.median(values) == 4.5
+    assert distribution.mean() == statistics.mean(values)
+
+def test_distribution_mode_ties():
+    # The first value to appear among the most common ones, as in statistics.mode
+    assert Distribution([2, 1, 1, 2]).mode() == statistics.mode([2, 1, 1, 2]) == 2
+
+def test_distribution_percentiles():
+    distribution = Distribution([1, 2, 3, 4, 5, 6, 7, 8, 9, 10])
+    assert distribution.percentile(0) == 1
+    assert distribution.percentile(50) == 5.5
+    assert distribution.percentile(90) == 9.1
+    assert distribution.percentile(100) == 10
+    assert Distribution([7]).percentile(99) == 7
+
+def test_aggregate_stat_percentiles():
+    assert aggregate_stat([1, 2, 3, 4, 5, 6, 7, 8, 9, 10], 'p90') == 9.1
+    assert aggregate_stat([1, 2, 3, 4, 5, 6, 7, 8, 9, 10], 'p99') == 9.9
+    assert aggregate_stat([1, 2, 3], 'median') == 2
+
+def test_space_saving():
+    sketch = SpaceSaving(3)
+    for item in 'aaaaabbbbccdefgaaa':
+        sketch.add(item)
+
+    assert len(sketch) == 3
+    assert sketch.total == 18
+    assert sketch.counts['a'] == 8
+    assert sketch.errors['a'] == 0
+    # Counts are overestimated by at most their error
+    assert all(sketch.counts[item] - sketch.errors[item] <= 'aaaaabbbbccdefgaaa'.count(item) <= sketch.counts[item] for item in sketch.counts)
+    assert sketch.top(1) == ['a']
+
+def test_space_saving_exact():
+    # With enough counters, counts are exact
+    sketch = SpaceSaving(10)
+    sketch.add('x', 5)
+    sketch.add('y', 2)
+    sketch.add('x', 1)
+    sketch.add('z', 4)
+    assert sketch.counts == {'x': 6, 'y': 2, 'z': 4}
+    assert sketch.top(2) == ['x', 'z']